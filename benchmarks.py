@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Benchmarks run headless under SDL's dummy drivers, without pygame's import
+# banner on stdout, where the JSON goes; this has to happen before pygame is
+# imported anywhere
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# Summarize per-iteration timings (seconds) as milliseconds
+def timing_stats(samples):
+    samples_ms = np.asarray(samples) * 1000
+    return {"mean_ms": float(samples_ms.mean()), "p99_ms": float(np.percentile(samples_ms, 99)),
+            "min_ms": float(samples_ms.min()), "runs": len(samples_ms), "better": "lower"}
+
+
+def time_calls(func, repeats, warmup=0):
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_screens(game, frames):
+    results = {}
+    game.reset_simulation()
+    game.paused = False
+    for name in ("show_simulation", "show_menu", "show_explanation"):
+        results[f"frame.{name}"] = timing_stats(time_calls(getattr(game, name), frames, warmup=30))
+    game.paused = True
+    return results
+
+
+def bench_energy_graph(game, sizes, frames):
+    results = {}
+    saved = game.graph_data
+    try:
+        for size in sizes:
+            history = game.EnergyHistory()
+            rng = np.random.default_rng(0)
+            for ke, pe in rng.uniform(0, 5000, (size, 2)):
+                history.append(ke, pe, ke + pe)
+            game.graph_data = history
+            # The newest samples at the default zoom, then the whole run
+            game.graph_view.reset()
+            results[f"draw_energy_graph.{size}"] = timing_stats(time_calls(game.draw_energy_graph, frames, warmup=5))
+            game.graph_view.span = size
+            results[f"draw_energy_graph.{size}.whole_run"] = timing_stats(
+                time_calls(game.draw_energy_graph, frames, warmup=5))
+    finally:
+        game.graph_data = saved
+        game.graph_view.reset()
+    return results
+
+
+# Simulation frames with a park of extra carts on the track, as independent
+# riders and as coupled trains, physics included
+def bench_park(game, counts, frames):
+    results = {}
+    game.reset_simulation()
+    game.paused = False
+    try:
+        for count in counts:
+            for cars in (1, 4):
+                game.build_park(count // cars, cars)
+                game.reset_simulation()
+                game.paused = False
+
+                def frame():
+                    game.step_physics()
+                    game.show_simulation()
+
+                results[f"frame.park.{count}_carts.{cars}_per_train"] = timing_stats(time_calls(frame, frames, warmup=5))
+    finally:
+        game.park = None
+        game.paused = True
+    return results
+
+
+# Routing one frame's worth of input from a high-polling mouse: a burst of
+# motion events across the simulation screen with a click in the middle
+def bench_event_dispatch(game, burst, frames):
+    pygame = game.pygame
+    game.ensure_screen("simulation")
+    dispatcher = game.dispatchers["simulation"]
+    rng = np.random.default_rng(0)
+    events = [pygame.event.Event(pygame.MOUSEMOTION, pos=(int(x), int(y)), rel=(1, 1), buttons=(0, 0, 0))
+              for x, y in rng.uniform((0, 0), (game.WIDTH, game.HEIGHT), (burst, 2))]
+    events.insert(burst // 2, pygame.event.Event(pygame.MOUSEBUTTONUP, pos=(10, 10), button=1))
+
+    def dispatch():
+        for event in game.coalesce_motion(events):
+            dispatcher.dispatch(event)
+
+    return {f"dispatch_events.{burst}": timing_stats(time_calls(dispatch, frames, warmup=5))}
+
+
+# Drawing the track while the view scrolls along it, for tracks of increasing
+# length; with culling and levels of detail this should not grow with length
+def bench_track_render(game, lengths, frames):
+    from coaster_track import default_cache_dir, generate_track
+
+    results = {}
+    saved = game.track_points, game.camera.zoom
+    surface = game.pygame.Surface((game.WIDTH, game.HEIGHT))
+    try:
+        for length in lengths:
+            game.set_track(generate_track("sine", cache_dir=default_cache_dir(), width=game.WIDTH,
+                                          height=game.HEIGHT, length=length))
+            points = len(game.track_points)
+            for zoom in (1.0, 0.01):
+                game.camera.zoom = zoom
+                positions = iter(np.linspace(0, game.simulation.track.length, frames + 5))
+
+                def draw():
+                    game.camera.follow(*game.simulation.point(next(positions)))
+                    game.draw_track(surface)
+
+                results[f"draw_track.{points}.zoom_{zoom}"] = timing_stats(time_calls(draw, frames, warmup=5))
+    finally:
+        game.set_track(saved[0])
+        game.camera.zoom = saved[1]
+    return results
+
+
+def bench_physics(duration):
+    import coaster_sim
+
+    results = {}
+    track = coaster_sim.create_track()
+
+    simulation = coaster_sim.CoasterSimulation(track)
+    steps, start = 0, time.perf_counter()
+    while time.perf_counter() - start < duration:
+        for _ in range(1000):
+            simulation.advance()
+        steps += 1000
+    results["physics.single_steps_per_sec"] = {"value": steps / (time.perf_counter() - start), "better": "higher"}
+
+    # The same motion read off the precomputed timetable, and seeking in it
+    simulation = coaster_sim.CoasterSimulation(track, tabulated=True)
+    steps, start = 0, time.perf_counter()
+    while time.perf_counter() - start < duration:
+        for _ in range(1000):
+            simulation.advance()
+        steps += 1000
+    results["physics.tabulated_steps_per_sec"] = {"value": steps / (time.perf_counter() - start), "better": "higher"}
+    targets = np.random.default_rng(0).uniform(0, simulation.track.length, 1000)
+    seeks, start = 0, time.perf_counter()
+    while time.perf_counter() - start < duration:
+        for target in targets:
+            simulation.seek_position(target)
+        seeks += len(targets)
+    results["physics.seeks_per_sec"] = {"value": seeks / (time.perf_counter() - start), "better": "higher"}
+
+    carts = 10000
+    rng = np.random.default_rng(0)
+    ensemble = coaster_sim.CoasterEnsemble(track, rng.uniform(1, 200, carts), rng.uniform(0.1, 20, carts))
+    steps, start = 0, time.perf_counter()
+    while time.perf_counter() - start < duration:
+        ensemble.step(10)
+        steps += 10
+    results["physics.ensemble_cart_steps_per_sec"] = {
+        "value": steps * carts / (time.perf_counter() - start), "better": "higher"}
+
+    # Adaptive integrator: simulated seconds per wall second, and how many
+    # acceleration evaluations each simulated second needs
+    dynamics = coaster_sim.TrackDynamics(track, drag=0.3)
+    simulated, start = 0.0, time.perf_counter()
+    position, velocity = 0.0, 8.0
+    while time.perf_counter() - start < duration:
+        position, velocity, _ = dynamics.advance(position, velocity, 1.0, 50.0)
+        simulated += 1.0
+    results["physics.dynamics_sim_seconds_per_sec"] = {
+        "value": simulated / (time.perf_counter() - start), "better": "higher"}
+    results["physics.dynamics_evaluations_per_sim_second"] = {
+        "value": dynamics.evaluations / simulated, "better": "lower"}
+    return results
+
+
+def bench_track_generation(sizes, repeats):
+    import coaster_sim
+    import coaster_track
+
+    results = {"create_track.default": timing_stats(time_calls(coaster_sim.create_track, repeats))}
+    for size in sizes:
+        def generate(size=size):
+            coaster_track.Track(coaster_track.generate_track("sine", length=size, step=1, integer=False))
+        results[f"generate_track.sine.{size}"] = timing_stats(time_calls(generate, repeats))
+    return results
+
+
+# Cold start of a fresh interpreter, measured from outside: importing each
+# module, and bringing the game up to its first rendered menu frame
+def bench_startup(repeats):
+    results = {}
+    env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy",
+               PYGAME_HIDE_SUPPORT_PROMPT="1")
+    scripts = {
+        "startup.import_coaster_sim": "import coaster_sim",
+        "startup.import_roller_coaster_game": "import roller_coaster_game",
+        "startup.first_frame": "import roller_coaster_game as g; g.init(); g.show_menu()",
+    }
+    for name, script in scripts.items():
+        samples = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, "-c", script], cwd=HERE, env=env, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            samples.append(time.perf_counter() - start)
+        results[name] = timing_stats(samples)
+    return results
+
+
+def run_benchmarks(quick=False):
+    frames = 60 if quick else 300
+    graph_sizes = (300, 30_000) if quick else (300, 30_000, 1_000_000)
+    track_sizes = (10_000, 100_000) if quick else (10_000, 100_000, 1_000_000)
+    # Track lengths in pixels; the sine track has a point every 3 pixels
+    track_lengths = (1_200, 1_200_000) if quick else (1_200, 1_200_000, 12_000_000)
+
+    sys.path.insert(0, HERE)
+    import roller_coaster_game as game
+    game.init()
+
+    results = {}
+    results.update(bench_screens(game, frames))
+    results.update(bench_energy_graph(game, graph_sizes, frames // 3))
+    results.update(bench_event_dispatch(game, 200, frames))
+    results.update(bench_park(game, (100, 1000), frames))
+    results.update(bench_track_render(game, track_lengths, frames))
+    results.update(bench_physics(0.5 if quick else 2.0))
+    results.update(bench_track_generation(track_sizes, 3 if quick else 10))
+    results.update(bench_startup(2 if quick else 5))
+
+    import pygame
+    return {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "numpy": np.__version__, "pygame": pygame.version.ver,
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+
+
+# The headline number of a result, used for comparisons
+def metric(result):
+    return result["value"] if "value" in result else result["mean_ms"]
+
+
+# Compare results against a baseline; a metric regresses when it is worse by
+# more than threshold (a fraction of the baseline value). The report goes to
+# stderr so that the JSON on stdout stays parseable.
+def compare(results, baseline, threshold, report=sys.stderr):
+    regressions = []
+    for name, result in sorted(results["results"].items()):
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"  {name:45s} {metric(result):14.4f}  (new)", file=report)
+            continue
+        old, new = metric(base), metric(result)
+        change = (new - old) / old if old else 0.0
+        worse = change > threshold if result["better"] == "lower" else change < -threshold
+        flag = "REGRESSION" if worse else ""
+        print(f"  {name:45s} {old:14.4f} -> {new:14.4f}  {change:+7.1%}  {flag}", file=report)
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Roller coaster simulator benchmarks")
+    parser.add_argument("--output", "-o", metavar="PATH", help="write results as JSON to PATH")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against a stored JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown that counts as a regression (default 0.10)")
+    parser.add_argument("--quick", action="store_true", help="fewer iterations and smaller sizes")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(quick=args.quick)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"Comparing against {args.compare} (threshold {args.threshold:.0%}):", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s): {', '.join(regressions)}", file=sys.stderr)
+            return 1
+        print("No regressions", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,649 @@
+import math
+
+import numpy as np
+
+from coaster_track import Track, generate_track
+
+# Headless roller coaster physics. Nothing in here touches pygame, so the
+# simulation can be imported and run on machines without a display.
+
+g = 9.81  # more precise gravity value
+PIXELS_PER_METRE = 50  # Track coordinates are screen pixels; 50 px of height is 1 m
+
+# Fixed physics timestep of the interactive UI, independent of any render frame rate
+PHYSICS_DT = 1 / 60
+
+# Simulated seconds per physics step for each unit of speed_factor. With this
+# scale a cart on flat track covers velocity * speed_factor * 3 px per step,
+# the same as the old model that moved velocity * speed_factor track points
+# (sampled every 3 px) per step.
+TIME_SCALE = 3 / PIXELS_PER_METRE
+
+
+# Create a more interesting track with multiple hills and loops
+def create_track(width=1200, height=700):
+    points = generate_track("sine", width=width, height=height).astype(int)
+    return [tuple(point) for point in points.tolist()]
+
+
+# Energy calculation, with heights measured up from ground_y
+def calculate_energies(mass, cart_y, velocity, ground_y=700):
+    height = ground_y - cart_y
+    PE = mass * g * (height / PIXELS_PER_METRE)
+    KE = 0.5 * mass * velocity * velocity
+    return KE, PE, KE + PE
+
+
+def as_track(track):
+    return track if isinstance(track, Track) else Track(track)
+
+
+# Dormand-Prince 5(4) tableau: stage times, stage weights, 5th order solution
+# weights and the difference between the 5th and embedded 4th order weights
+DP_C = (0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0)
+DP_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+)
+DP_B = (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84)
+DP_E = (71 / 57600, 0.0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+
+# Secant iterations when locating an event, and the distance (px) or speed
+# (m/s) within which an event counts as reached
+EVENT_ITERATIONS = 8
+EVENT_TOLERANCE = 1e-9
+
+
+# Equations of motion of a cart along the track, integrated with an adaptive
+# Dormand-Prince RK45 scheme. The state is the distance along the track (px)
+# and the signed velocity along it (m/s); gravity acts along the segment
+# tangent, with optional Coulomb rolling friction (coefficient `friction`) and
+# quadratic air drag (force drag * v^2, so drag is 1/2 rho Cd A in kg/m).
+#
+# The slope of a polyline jumps at every point, so each step stays within one
+# segment: a step that would leave it is cut short to end on the boundary, and
+# the next one continues on the neighbouring segment. Within a segment the
+# motion is smooth, so step sizes follow the local error (rtol/atol): long
+# steps on long, gentle segments and short ones where drag changes quickly.
+# Positions past the end of the track wrap to the start, keeping the cart's
+# mechanical energy (or at rest, if that can't lift it to the start's height);
+# a cart rolling back past the start bounces off it.
+class TrackDynamics:
+    def __init__(self, track, friction=0.0, drag=0.0, rtol=1e-6, atol=1e-6, max_step=0.5, min_step=1e-9):
+        self.track = as_track(track)
+        self.friction = friction
+        self.drag = drag
+        self.rtol = rtol
+        self.atol = atol
+        self.max_step = max_step
+        self.min_step = min_step
+
+        # Per-segment gravity along the tangent and normal to it, and heights
+        # in metres, as plain lists since they are read one element at a time
+        tangents = self.track.tangents
+        self.slope_accel = (g * tangents[:, 1]).tolist()
+        self.normal_accel = (g * np.abs(tangents[:, 0])).tolist()
+        self.heights = (-self.track.points[:, 1] / PIXELS_PER_METRE).tolist()
+        self.arc_length = self.track.arc_length.tolist()
+
+        self.step_size = 0.01
+        self.evaluations = 0
+        self.accepted = 0
+        self.rejected = 0
+
+    # The same dynamics on another track
+    def for_track(self, track):
+        return TrackDynamics(track, self.friction, self.drag, self.rtol, self.atol, self.max_step, self.min_step)
+
+    # Friction holds a cart at rest when gravity along the slope can't overcome it
+    def holds(self, i):
+        return abs(self.slope_accel[i]) <= self.friction * self.normal_accel[i]
+
+    # A cart at rest on a point where both neighbouring segments slope down
+    # towards it, more steeply than friction can hold, stays there: each
+    # segment pushes it back onto the other
+    def rests_on(self, position):
+        i, _ = self.track.locate(position)
+        return (0 < i and position == self.arc_length[i] and self.slope_accel[i - 1] > 0 > self.slope_accel[i]
+                and not self.holds(i - 1) and not self.holds(i))
+
+    # Segment the cart is on; on a boundary, the one it is heading into
+    def segment(self, position, velocity):
+        i, _ = self.track.locate(position)
+        if i > 0 and position <= self.arc_length[i]:
+            heading_back = velocity < 0 or (velocity == 0 and self.slope_accel[i] < 0 and not self.holds(i))
+            if heading_back:
+                i -= 1
+        return i
+
+    def acceleration(self, i, velocity, mass):
+        self.evaluations += 1
+        accel = self.slope_accel[i]
+        if self.friction:
+            # Friction opposes the motion, or the motion about to start
+            direction = velocity if velocity else accel
+            if velocity == 0 and self.holds(i):
+                return 0.0
+            accel -= math.copysign(self.friction * self.normal_accel[i], direction)
+        if self.drag:
+            accel -= self.drag / mass * velocity * abs(velocity)
+        return accel
+
+    # One Dormand-Prince step of length h on segment i, starting with
+    # acceleration `accel`; returns the new state and the error estimate
+    # relative to the tolerances (<= 1 is acceptable)
+    def try_step(self, i, position, velocity, h, mass, accel):
+        ks = [(velocity * PIXELS_PER_METRE, accel)]  # stages as (d position/dt, d velocity/dt)
+        for stage in range(1, 6):
+            v = velocity
+            for a, (_, dv) in zip(DP_A[stage], ks):
+                v += h * a * dv
+            ks.append((v * PIXELS_PER_METRE, self.acceleration(i, v, mass)))
+
+        new_s, new_v = position, velocity
+        for b, (ds, dv) in zip(DP_B, ks):
+            new_s += h * b * ds
+            new_v += h * b * dv
+
+        # The 7th stage at the new state closes the error estimate
+        ks.append((new_v * PIXELS_PER_METRE, self.acceleration(i, new_v, mass)))
+        err_s = err_v = 0.0
+        for e, (ds, dv) in zip(DP_E, ks):
+            err_s += h * e * ds
+            err_v += h * e * dv
+
+        # Position error is measured in metres like the velocity's
+        scale_s = self.atol + self.rtol * max(abs(position), abs(new_s)) / PIXELS_PER_METRE
+        scale_v = self.atol + self.rtol * max(abs(velocity), abs(new_v))
+        error = math.hypot(err_s / PIXELS_PER_METRE / scale_s, err_v / scale_v) / math.sqrt(2)
+        return new_s, new_v, error
+
+    # Time to cover `distance` px (signed) from `velocity` under a constant
+    # acceleration, or inf if the cart never gets there
+    @staticmethod
+    def crossing_time(distance, velocity, accel):
+        distance /= PIXELS_PER_METRE
+        if abs(accel) < 1e-12:
+            return distance / velocity if velocity and distance / velocity > 0 else math.inf
+        disc = velocity * velocity + 2 * accel * distance
+        if disc < 0:
+            return math.inf
+        root = math.sqrt(disc)
+        times = [t for t in ((-velocity + root) / accel, (-velocity - root) / accel) if t > 0]
+        return min(times, default=math.inf)
+
+    # Accepted steps over `duration` seconds, as (elapsed time, position,
+    # velocity, laps completed during the step)
+    def steps(self, position, velocity, duration, mass):
+        elapsed = 0.0
+        while duration - elapsed > 1e-12:
+            if velocity == 0 and self.rests_on(position):
+                # Any step would end where it started, so none could progress
+                self.accepted += 1
+                yield duration, position, velocity, 0
+                return
+
+            i = self.segment(position, velocity)
+            start, end = self.arc_length[i], self.arc_length[i + 1]
+            accel = self.acceleration(i, velocity, mass)
+            h = min(self.step_size, duration - elapsed)
+            truncated = h < self.step_size
+
+            # Events within the step: reaching either end of the segment, or
+            # stopping, where friction changes direction. The step is cut short
+            # to end on the first one, predicted from the starting acceleration.
+            event_times = [self.crossing_time(end - position, velocity, accel),
+                           self.crossing_time(start - position, velocity, accel)]
+            if self.friction and velocity and accel and (velocity > 0) != (accel > 0):
+                event_times.append(-velocity / accel)
+            if min(event_times) <= h:
+                h = min(event_times)
+                truncated = True
+            new_s, new_v, error = self.try_step(i, position, velocity, h, mass, accel)
+
+            # The prediction ignores how drag changes along the step, so a step
+            # that still leaves the segment or reverses under friction is
+            # shortened by secant iterations until it ends on the event; one
+            # that falls short is kept and the next step covers the rest
+            for _ in range(EVENT_ITERATIONS):
+                if new_s > end + EVENT_TOLERANCE or new_s < start - EVENT_TOLERANCE:
+                    boundary = end if new_s > end else start
+                    h *= (boundary - position) / (new_s - position)
+                elif self.friction and velocity and (new_v > 0) != (velocity > 0):
+                    h *= velocity / (velocity - new_v)
+                else:
+                    break
+                truncated = True
+                new_s, new_v, error = self.try_step(i, position, velocity, h, mass, accel)
+
+            # Land exactly on events reached to within rounding; a cart that
+            # was moving stops there, one starting from rest sets off
+            new_s = min(max(new_s, start), end)
+            if end - new_s <= EVENT_TOLERANCE:
+                new_s = end
+            elif new_s - start <= EVENT_TOLERANCE:
+                new_s = start
+            if self.friction and velocity and (abs(new_v) <= EVENT_TOLERANCE or (new_v > 0) != (velocity > 0)):
+                new_v = 0.0
+
+            accepted = error <= 1.0 or h <= self.min_step
+            if accepted:
+                self.accepted += 1
+                elapsed += h
+                position, velocity, wrapped = self.constrain(new_s, new_v)
+                yield elapsed, position, velocity, wrapped
+            else:
+                self.rejected += 1
+
+            # A step shortened to land on a boundary or on `duration` says
+            # little about the next one, so it only ever shrinks the step size
+            factor = 5.0 if error == 0 else min(5.0, max(0.2, 0.9 * error ** -0.2))
+            if not (truncated and accepted):
+                self.step_size = min(self.max_step, max(self.min_step, h * factor))
+
+    # Advance by `duration` seconds; returns the new position, velocity and
+    # the number of times the cart went past the end of the track
+    def advance(self, position, velocity, duration, mass):
+        laps = 0
+        for _, position, velocity, wrapped in self.steps(position, velocity, duration, mass):
+            laps += wrapped
+        return position, velocity, laps
+
+    def constrain(self, position, velocity):
+        length = self.track.length
+        if position >= length:
+            # Start the next lap with the same mechanical energy, if possible
+            drop = self.heights[-1] - self.heights[0]
+            position -= length
+            velocity = math.sqrt(max(0.0, velocity * velocity + 2 * g * drop))
+            return position, velocity, 1
+        if position <= 0 and velocity < 0:
+            return -position, -velocity, 0
+        return position, velocity, 0
+
+    # Integrate from (position, velocity) for `duration` seconds and return the
+    # state after every accepted step, without any fixed output interval
+    def solve(self, position, velocity, duration, mass):
+        times, positions, velocities = [0.0], [position], [velocity]
+        for elapsed, position, velocity, _ in self.steps(position, velocity, duration, mass):
+            times.append(elapsed)
+            positions.append(position)
+            velocities.append(velocity)
+        return {"time": np.array(times), "position": np.array(positions), "velocity": np.array(velocities)}
+
+
+# The energy-conservation model tabulated for one track, mass and total
+# energy: potential energy, speed and time of arrival at every track point.
+# Height, and with it the kinetic energy, changes linearly along a segment, so
+# the acceleration across it is constant and the crossing takes 2 L / (v0 + v1).
+# Where the cart is at any time, or when it reaches any position, is then a
+# binary search and a little algebra, with no stepping and no energy drift.
+class Timetable:
+    def __init__(self, track, mass, total_energy, ground_y=700):
+        self.track = track = as_track(track)
+        self.mass = mass
+        self.total_energy = total_energy
+        self.PE = mass * g * (ground_y - track.points[:, 1]) / PIXELS_PER_METRE
+        available_KE = np.maximum(0.01, total_energy - self.PE)  # Minimum KE to prevent stopping
+        self.velocity = np.sqrt(2 * available_KE / mass)
+
+        # Per segment, in track units: entry speed, constant acceleration and
+        # the time to cross it
+        self.speeds = self.velocity * PIXELS_PER_METRE
+        v0, v1 = self.speeds[:-1], self.speeds[1:]
+        self.accel = (v1 * v1 - v0 * v0) / (2 * track.segment_lengths)
+        self.arrival = np.concatenate(([0.0], np.cumsum(2 * track.segment_lengths / (v0 + v1))))
+        self.lap_time = float(self.arrival[-1])
+
+    def matches(self, track, mass, total_energy):
+        return self.track is track and self.mass == mass and self.total_energy == total_energy
+
+    # (laps completed, segment, position, velocity) t seconds after leaving the
+    # start; `segment` is a guess to try before searching, such as the last one
+    def state_at(self, t, segment=None):
+        laps, t = divmod(t, self.lap_time)
+        arrival = self.arrival
+        i = segment
+        if i is None or not arrival.item(i) <= t < arrival.item(i + 1):
+            i = max(0, min(int(arrival.searchsorted(t, side="right")) - 1, len(self.accel) - 1))
+        tau = t - arrival.item(i)
+        v0, a = self.speeds.item(i), self.accel.item(i)
+        along = min(v0 * tau + 0.5 * a * tau * tau, self.track.segment_lengths.item(i))
+        return int(laps), i, self.track.arc_length.item(i) + along, (v0 + a * tau) / PIXELS_PER_METRE
+
+    # (KE, PE, TE) on segment i at position s moving at velocity
+    def energies(self, i, s, velocity):
+        track = self.track
+        frac = (s - track.arc_length.item(i)) / track.segment_lengths.item(i)
+        PE = self.PE.item(i) + (self.PE.item(i + 1) - self.PE.item(i)) * frac
+        KE = 0.5 * self.mass * velocity * velocity
+        return KE, PE, KE + PE
+
+    # Time from the start of a lap to reach position s
+    def time_at(self, s):
+        i, frac = self.track.locate(s)
+        along = frac * float(self.track.segment_lengths[i])
+        v0 = float(self.speeds[i])
+        v = math.sqrt(max(0.0, v0 * v0 + 2 * float(self.accel[i]) * along))
+        return float(self.arrival[i]) + (2 * along / (v0 + v) if along else 0.0)
+
+
+# Single cart on a track, advanced by energy conservation. The cart position
+# is the distance travelled along the track in pixels, and each step lasts
+# speed_factor * TIME_SCALE simulated seconds. With a TrackDynamics the cart is
+# integrated from its equations of motion instead, and velocity is signed.
+class CoasterSimulation:
+    def __init__(self, track, mass=50.0, initial_velocity=8.0, speed_factor=0.03, ground_y=700, dynamics=None,
+                 tabulated=False):
+        self.track = as_track(track)
+        self.mass = mass
+        self.initial_velocity = initial_velocity
+        self.speed_factor = speed_factor
+        self.ground_y = ground_y
+        self.dynamics = dynamics
+        # Read the motion off a Timetable instead of stepping it
+        self.tabulated = tabulated
+        self.timetable = None
+        self.reset()
+
+    @property
+    def time_step(self):
+        return self.speed_factor * TIME_SCALE
+
+    def set_track(self, track):
+        self.track = as_track(track)
+        if self.dynamics is not None:
+            self.dynamics = self.dynamics.for_track(self.track)
+        self.reset()
+
+    def reset(self, initial_velocity=None):
+        if initial_velocity is not None:
+            self.initial_velocity = initial_velocity
+        self.position = self.previous_position = 0.0
+        self.segment = 0
+        self.velocity = self.initial_velocity
+        self.time = 0.0
+        self.steps = 0
+        self.laps = 0
+        # Time into the current lap, for the tabulated motion
+        self.lap_clock = 0.0
+
+        # Initial total energy, which the velocity update conserves
+        y0 = self.track.points[0, 1]
+        KE0, PE0, _ = calculate_energies(self.mass, y0, self.velocity, self.ground_y)
+        self.total_energy = KE0 + PE0
+        if self.tabulated and self.dynamics is None:
+            self.current_timetable()
+
+    # Timetable for the current track, mass and total energy, built again only
+    # when one of them changes; the lap clock is moved to match where the cart is
+    def current_timetable(self):
+        table = self.timetable
+        if table is None or not table.matches(self.track, self.mass, self.total_energy):
+            self.timetable = table = Timetable(self.track, self.mass, self.total_energy, self.ground_y)
+            self.lap_clock = table.time_at(self.position)
+        return table
+
+    @property
+    def seekable(self):
+        return self.tabulated and self.dynamics is None
+
+    def point(self, position=None):
+        return self.track.point_at(self.position if position is None else position)
+
+    def tangent(self):
+        return self.track.tangent_at(self.position)
+
+    def energies(self):
+        y = self.track.y_at(self.position)
+        return calculate_energies(self.mass, y, self.velocity, self.ground_y)
+
+    def conservation(self):
+        # Current total energy as a percentage of the initial total
+        _, _, TE = self.energies()
+        return (TE / self.total_energy * 100) if self.total_energy > 0 else 100
+
+    # Advance one physics step and return the (KE, PE, TE) used for it
+    def advance(self):
+        time_step = self.time_step
+        self.previous_position = self.position
+        if self.dynamics is not None:
+            return self.advance_dynamics(time_step)
+        if self.tabulated:
+            return self.advance_tabulated(time_step)
+        self.position += self.velocity * time_step * PIXELS_PER_METRE
+
+        if self.position >= self.track.length:
+            self.position = 0.0
+            self.laps += 1
+
+        # Physics calculation with energy conservation
+        track = self.track
+        self.segment, frac = track.locate(self.position)
+        y0, y1 = track.points[self.segment, 1], track.points[self.segment + 1, 1]
+        KE, PE, TE = calculate_energies(self.mass, y0 + (y1 - y0) * frac, self.velocity, self.ground_y)
+
+        # Update velocity based on energy conservation
+        available_KE = max(0.01, self.total_energy - PE)  # Minimum KE to prevent stopping
+        self.velocity = math.sqrt(2 * available_KE / self.mass)
+
+        self.time += time_step
+        self.steps += 1
+        return KE, PE, TE
+
+    def advance_dynamics(self, time_step):
+        self.position, self.velocity, laps = self.dynamics.advance(self.position, self.velocity, time_step,
+                                                                   self.mass)
+        self.laps += laps
+        self.segment, _ = self.track.locate(self.position)
+        self.time += time_step
+        self.steps += 1
+        return self.energies()
+
+    def advance_tabulated(self, time_step):
+        table = self.current_timetable()
+        self.lap_clock += time_step
+        laps, self.segment, self.position, self.velocity = table.state_at(self.lap_clock, self.segment)
+        if laps:
+            self.laps += laps
+            self.lap_clock -= laps * table.lap_time
+        self.time += time_step
+        self.steps += 1
+        return table.energies(self.segment, self.position, self.velocity)
+
+    # Jump to t seconds into the current lap; the lap time itself is the end
+    # of the track, where the next step starts a new lap
+    def seek_lap_time(self, t):
+        table = self.current_timetable()
+        self.lap_clock = min(max(0.0, t), table.lap_time)
+        if self.lap_clock < table.lap_time:
+            _, self.segment, self.position, self.velocity = table.state_at(self.lap_clock)
+        else:
+            self.segment, self.position = len(table.accel) - 1, self.track.length
+            self.velocity = table.velocity.item(-1)
+        self.time = self.laps * table.lap_time + self.lap_clock
+        self.previous_position = self.position
+
+    # Jump to t seconds after the start of the run
+    def seek_time(self, t):
+        table = self.current_timetable()
+        laps, lap_clock = divmod(max(0.0, t), table.lap_time)
+        self.laps = int(laps)
+        self.seek_lap_time(lap_clock)
+
+    # Jump to position s on the current lap
+    def seek_position(self, s):
+        self.seek_lap_time(self.current_timetable().time_at(min(max(0.0, s), self.track.length)))
+
+    # Advance n steps and return the per-step time, position, velocity and energies as arrays
+    def step(self, n=1):
+        trace = {name: np.empty(n) for name in ("time", "position", "velocity", "KE", "PE", "TE")}
+        for i in range(n):
+            trace["KE"][i], trace["PE"][i], trace["TE"][i] = self.advance()
+            trace["time"][i] = self.time
+            trace["position"][i] = self.position
+            trace["velocity"][i] = self.velocity
+        return trace
+
+    # Advance for duration seconds of simulated time
+    def run(self, duration):
+        return self.step(max(0, int(round(duration / self.time_step))))
+
+
+# Many independent carts on the same track, advanced together as NumPy arrays.
+# Each step is the same energy-conservation update as CoasterSimulation.advance,
+# applied to every cart at once.
+class CoasterEnsemble:
+    def __init__(self, track, masses, initial_velocities, speed_factor=0.03, ground_y=700, start_positions=0.0):
+        masses, initial_velocities, speed_factor, start_positions = np.broadcast_arrays(
+            np.asarray(masses, dtype=float), np.asarray(initial_velocities, dtype=float),
+            np.asarray(speed_factor, dtype=float), np.asarray(start_positions, dtype=float))
+        self.track = as_track(track)
+        self.masses = masses.copy()
+        self.initial_velocities = initial_velocities.copy()
+        self.speed_factor = speed_factor.copy()
+        self.time_steps = self.speed_factor * TIME_SCALE
+        self.start_positions = start_positions.copy()
+        self.ground_y = ground_y
+        self.reset()
+
+    def __len__(self):
+        return len(self.masses)
+
+    def reset(self):
+        n = len(self.masses)
+        self.positions = self.start_positions.copy()
+        self.velocities = self.initial_velocities.copy()
+        self.time = np.zeros(n)
+        self.steps = 0
+        # Per-cart step budget set by run(); carts that used theirs up stand still
+        self.steps_left = None
+
+        self.total_energy = 0.5 * self.masses * self.velocities ** 2 + self.potential_energy_at(self.positions)
+
+        # Running summary statistics
+        self.laps = np.zeros(n, dtype=int)
+        self.first_lap_time = np.full(n, np.nan)
+        self.min_speed = self.velocities.copy()
+        self.max_speed = self.velocities.copy()
+        self.max_conservation_error = np.zeros(n)
+
+    def potential_energy(self, y):
+        return self.masses * g * ((self.ground_y - y) / PIXELS_PER_METRE)
+
+    def potential_energy_at(self, positions):
+        return self.potential_energy(self.track.y_at_many(positions))
+
+    def set_speed_factor(self, speed_factor):
+        self.speed_factor[:] = speed_factor
+        self.time_steps = self.speed_factor * TIME_SCALE
+
+    # Advance every cart one step and return the per-cart (KE, PE, TE) arrays used for it
+    def advance(self):
+        time_steps = self.time_steps
+        if self.steps_left is not None:
+            time_steps = np.where(self.steps_left > 0, time_steps, 0.0)
+            np.maximum(self.steps_left - 1, 0, out=self.steps_left)
+        self.positions += self.velocities * time_steps * PIXELS_PER_METRE
+        self.time += time_steps
+
+        wrapped = self.positions >= self.track.length
+        if wrapped.any():
+            self.positions[wrapped] = 0.0
+            self.laps += wrapped
+            first = wrapped & np.isnan(self.first_lap_time)
+            self.first_lap_time[first] = self.time[first]
+
+        # Physics calculation with energy conservation
+        PE = self.potential_energy_at(self.positions)
+        KE = 0.5 * self.masses * self.velocities ** 2
+        TE = KE + PE
+
+        # Update velocity based on energy conservation
+        available_KE = np.maximum(0.01, self.total_energy - PE)  # Minimum KE to prevent stopping
+        self.velocities = np.sqrt(2 * available_KE / self.masses)
+
+        np.minimum(self.min_speed, self.velocities, out=self.min_speed)
+        np.maximum(self.max_speed, self.velocities, out=self.max_speed)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            conservation = np.where(self.total_energy > 0, TE / self.total_energy * 100, 100.0)
+        np.maximum(self.max_conservation_error, np.abs(conservation - 100), out=self.max_conservation_error)
+
+        self.steps += 1
+        return KE, PE, TE
+
+    # Advance n steps. With record_every set, also return (steps, carts) trajectories
+    # of time, position, velocity and energies sampled every record_every steps.
+    def step(self, n=1, record_every=None):
+        if not record_every:
+            for _ in range(n):
+                self.advance()
+            return None
+
+        rows = n // record_every
+        trace = {name: np.empty((rows, len(self))) for name in ("time", "position", "velocity", "KE", "PE", "TE")}
+        for i in range(n):
+            KE, PE, TE = self.advance()
+            if (i + 1) % record_every == 0:
+                row = (i + 1) // record_every - 1
+                trace["time"][row] = self.time
+                trace["position"][row] = self.positions
+                trace["velocity"][row] = self.velocities
+                trace["KE"][row], trace["PE"][row], trace["TE"][row] = KE, PE, TE
+        return trace
+
+    # Advance every cart by duration seconds of simulated time; carts with a
+    # larger speed_factor need fewer steps and stop once they get there
+    def run(self, duration, record_every=None):
+        self.steps_left = np.maximum(0, np.round(duration / self.time_steps)).astype(int)
+        try:
+            return self.step(int(self.steps_left.max(initial=0)), record_every)
+        finally:
+            self.steps_left = None
+
+    # Current total energy of each cart as a percentage of its initial total,
+    # like CoasterSimulation.conservation
+    def conservation(self):
+        TE = 0.5 * self.masses * self.velocities ** 2 + self.potential_energy_at(self.positions)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.total_energy > 0, TE / self.total_energy * 100, 100.0)
+
+    # Per-cart summary statistics
+    def summary(self):
+        return {
+            "mass": self.masses,
+            "initial_velocity": self.initial_velocities,
+            "speed_factor": self.speed_factor,
+            "laps": self.laps,
+            "lap_time": self.first_lap_time,
+            "min_speed": self.min_speed,
+            "max_speed": self.max_speed,
+            "conservation": self.conservation(),
+            "max_conservation_error": self.max_conservation_error,
+        }
+
+
+# Trains of `cars` coupled cars. The cars of a train keep `spacing` pixels of
+# track between them, so a train moves as one body with the lead car's
+# position and a single velocity, and each train is one entry of the ensemble
+# arrays; its potential energy is that of its whole mass at the mean height of
+# its cars. Positions behind the start of the track wrap round to its end, as
+# the carts do at a lap. With cars=1 these are independent riders.
+class CoasterTrain(CoasterEnsemble):
+    def __init__(self, track, masses, initial_velocities, cars=1, spacing=30.0, speed_factor=0.03, ground_y=700,
+                 start_positions=0.0):
+        self.cars = cars
+        self.spacing = spacing
+        super().__init__(track, masses, initial_velocities, speed_factor, ground_y, start_positions)
+
+    # (trains, cars) positions of every car, lead car first
+    def car_positions(self, positions=None):
+        positions = self.positions if positions is None else positions
+        return (np.asarray(positions)[:, None] - self.spacing * np.arange(self.cars)) % self.track.length
+
+    def potential_energy_at(self, positions):
+        return self.potential_energy(self.track.y_at_many(self.car_positions(positions)).mean(axis=1))
@@ -0,0 +1,253 @@
+import argparse
+import csv
+import importlib.util
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+
+import numpy as np
+
+from coaster_sim import CoasterEnsemble
+from coaster_track import Track, default_cache_dir, generate_track
+
+# Parameter sweeps over mass, initial velocity, speed_factor and track
+# generator parameters. Runs are grouped into chunks that share a track, each
+# chunk is simulated as one CoasterEnsemble in a worker process, and every
+# finished chunk is appended to the output straight away so an interrupted
+# sweep can be resumed.
+
+SUMMARY_COLUMNS = ["laps", "lap_time", "peak_speed", "min_speed", "conservation", "max_conservation_error"]
+
+
+# "a:b:n" is n evenly spaced values from a to b, "a,b,c" a list, "a" a single value
+def parse_values(spec):
+    if ":" in spec:
+        start, stop, num = spec.split(":")
+        return np.linspace(float(start), float(stop), int(num))
+    return np.array([float(value) for value in spec.split(",")])
+
+
+def parse_track_param(spec):
+    name, _, values = spec.partition("=")
+    if not values:
+        raise argparse.ArgumentTypeError(f"track parameters look like name=value[,value...], got {spec!r}")
+    return name, [json.loads(value) for value in values.split(",")]
+
+
+# All runs of the sweep as arrays indexed by run id, plus the distinct track
+# parameter sets. Grids enumerate every combination; random sweeps draw
+# `samples` runs uniformly from each range (and uniformly among the listed
+# track parameter values) with a fixed seed, so run ids are reproducible.
+def build_runs(masses, velocities, speed_factors, track_params, samples=None, seed=0):
+    names = [name for name, _ in track_params]
+    tracks = [dict(zip(names, combo)) for combo in itertools.product(*(values for _, values in track_params))]
+
+    if samples is None:
+        grid = np.meshgrid(np.arange(len(tracks)), masses, velocities, speed_factors, indexing="ij")
+        track_index, mass, velocity, speed_factor = (axis.ravel() for axis in grid)
+        track_index = track_index.astype(int)
+    else:
+        rng = np.random.default_rng(seed)
+        track_index = rng.integers(0, len(tracks), samples)
+        mass = rng.uniform(masses.min(), masses.max(), samples)
+        velocity = rng.uniform(velocities.min(), velocities.max(), samples)
+        speed_factor = rng.uniform(speed_factors.min(), speed_factors.max(), samples)
+
+    runs = {"track_index": track_index, "mass": mass, "initial_velocity": velocity, "speed_factor": speed_factor}
+    return runs, tracks
+
+
+# Run ids already present in the output, for resuming
+def completed_run_ids(output):
+    done = set()
+    if output.endswith(".parquet"):
+        if os.path.isdir(output):
+            import pyarrow.parquet as pq
+            for name in os.listdir(output):
+                if name.endswith(".parquet"):
+                    done.update(pq.read_table(os.path.join(output, name), columns=["run_id"])["run_id"].to_pylist())
+    elif os.path.exists(output):
+        with open(output, newline="") as f:
+            for row in csv.DictReader(f):
+                done.add(int(row["run_id"]))
+    return done
+
+
+@lru_cache(maxsize=8)
+def load_track(generator, params_json, cache_dir):
+    return Track(generate_track(generator, cache_dir=cache_dir, **json.loads(params_json)))
+
+
+# Worker: simulate one chunk of runs that share a track
+def run_chunk(generator, params_json, cache_dir, run_ids, masses, velocities, speed_factors, duration):
+    track = load_track(generator, params_json, cache_dir)
+    ensemble = CoasterEnsemble(track, masses, velocities, speed_factors)
+    ensemble.run(duration)
+    summary = ensemble.summary()
+    return {
+        "run_id": run_ids,
+        "laps": summary["laps"],
+        "lap_time": summary["lap_time"],
+        "peak_speed": summary["max_speed"],
+        "min_speed": summary["min_speed"],
+        "conservation": summary["conservation"],
+        "max_conservation_error": summary["max_conservation_error"],
+    }
+
+
+# Appends finished chunks to a CSV file, or to a directory of Parquet part files
+class SweepWriter:
+    def __init__(self, output, track_names):
+        self.output = output
+        self.columns = ["run_id", "mass", "initial_velocity", "speed_factor",
+                        *(f"track_{name}" for name in track_names), *SUMMARY_COLUMNS]
+        self.parquet = output.endswith(".parquet")
+        if self.parquet:
+            if importlib.util.find_spec("pyarrow") is None:
+                raise SystemExit("Parquet output needs pyarrow; install it or write to a .csv file")
+            os.makedirs(output, exist_ok=True)
+            parts = sorted(name for name in os.listdir(output) if name.endswith(".parquet"))
+            if parts:
+                import pyarrow.parquet as pq
+                self.check_columns(pq.read_schema(os.path.join(output, parts[0])).names)
+            self.file = None
+        else:
+            new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+            if not new_file:
+                with open(output, newline="") as f:
+                    self.check_columns(next(csv.reader(f), []))
+            self.file = open(output, "a", newline="")
+            self.writer = csv.writer(self.file)
+            if new_file:
+                self.writer.writerow(self.columns)
+
+    # A resumed sweep has to write the same columns as the one it continues,
+    # or its rows would land under the wrong headers
+    def check_columns(self, existing):
+        if list(existing) != self.columns:
+            raise SystemExit(f"{self.output} has columns {', '.join(existing)}, but this sweep writes "
+                             f"{', '.join(self.columns)}; resume it with the same --track-param names "
+                             f"or choose another output")
+
+    def write(self, columns):
+        if self.parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.table({name: columns[name] for name in self.columns})
+            first_id = int(columns["run_id"][0])
+            pq.write_table(table, os.path.join(self.output, f"part-{first_id:012d}.parquet"))
+        else:
+            self.writer.writerows(zip(*(columns[name] for name in self.columns)))
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+def run_sweep(runs, tracks, generator, output, duration, workers=None, chunk_size=2048, resume=False,
+              cache_dir=None, progress=sys.stderr):
+    total = len(runs["mass"])
+    done = completed_run_ids(output) if resume else set()
+    if not resume and os.path.exists(output):
+        raise SystemExit(f"{output} already exists; pass --resume to continue it or choose another output")
+
+    # Chunks of pending runs, each on a single track
+    def chunks():
+        run_ids = np.arange(total)
+        pending = np.ones(total, dtype=bool)
+        if done:
+            pending[np.fromiter(done, dtype=int)] = False
+        for index in range(len(tracks)):
+            ids = run_ids[pending & (runs["track_index"] == index)]
+            for start in range(0, len(ids), chunk_size):
+                yield index, ids[start:start + chunk_size]
+
+    track_names = list(tracks[0]) if tracks else []
+    writer = SweepWriter(output, track_names)
+    workers = workers or os.cpu_count()
+    remaining = total - len(done)
+    finished = 0
+    started = last_report = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            in_flight = {}
+            pending_chunks = chunks()
+
+            # Keep only a couple of chunks per worker queued so huge sweeps
+            # never materialize every task up front
+            def submit_more():
+                for index, ids in itertools.islice(pending_chunks, workers * 2 - len(in_flight)):
+                    future = pool.submit(run_chunk, generator, json.dumps(tracks[index], sort_keys=True), cache_dir,
+                                         ids, runs["mass"][ids], runs["initial_velocity"][ids],
+                                         runs["speed_factor"][ids], duration)
+                    in_flight[future] = (index, ids)
+
+            submit_more()
+            while in_flight:
+                completed, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    index, ids = in_flight.pop(future)
+                    columns = future.result()
+                    columns["mass"] = runs["mass"][ids]
+                    columns["initial_velocity"] = runs["initial_velocity"][ids]
+                    columns["speed_factor"] = runs["speed_factor"][ids]
+                    for name in track_names:
+                        columns[f"track_{name}"] = [tracks[index][name]] * len(ids)
+                    writer.write(columns)
+                    finished += len(ids)
+                submit_more()
+
+                now = time.perf_counter()
+                if progress is not None and (now - last_report >= 1.0 or not in_flight):
+                    last_report = now
+                    rate = finished / (now - started)
+                    eta = (remaining - finished) / rate if rate else float("inf")
+                    print(f"{len(done) + finished}/{total} runs  {rate:,.0f} runs/sec  ETA {eta:,.0f}s",
+                          file=progress, flush=True)
+    finally:
+        writer.close()
+    return finished
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Run headless roller coaster simulations over a parameter grid or random samples")
+    parser.add_argument("--mass", default="1:200:20", type=parse_values,
+                        help="masses in kg: start:stop:count, a comma list or one value (default 1:200:20)")
+    parser.add_argument("--velocity", default="0.1:20:20", type=parse_values,
+                        help="initial velocities in m/s, same syntax (default 0.1:20:20)")
+    parser.add_argument("--speed-factor", default="0.03", type=parse_values,
+                        help="speed factors, same syntax (default 0.03)")
+    parser.add_argument("--track", default="sine", help="track generator (default sine)")
+    parser.add_argument("--track-param", action="append", default=[], type=parse_track_param, metavar="NAME=V1,V2",
+                        help="track generator parameter values to sweep; repeat for several parameters")
+    parser.add_argument("--random", type=int, metavar="N",
+                        help="draw N random samples from the ranges instead of a full grid")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for --random (default 0)")
+    parser.add_argument("--duration", type=float, default=60.0,
+                        help="simulated seconds per run (default 60)")
+    parser.add_argument("--output", "-o", default="sweep.csv",
+                        help="output .csv file, or .parquet directory of part files (default sweep.csv)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=2048, help="runs per task (default 2048)")
+    parser.add_argument("--resume", action="store_true", help="skip runs already present in the output")
+    args = parser.parse_args(argv)
+
+    runs, tracks = build_runs(args.mass, args.velocity, args.speed_factor, args.track_param,
+                              samples=args.random, seed=args.seed)
+    started = time.perf_counter()
+    finished = run_sweep(runs, tracks, args.track, args.output, args.duration, workers=args.workers,
+                         chunk_size=args.chunk_size, resume=args.resume, cache_dir=default_cache_dir())
+    elapsed = time.perf_counter() - started
+    print(f"Finished {finished} runs in {elapsed:.1f}s ({finished / elapsed if elapsed else 0:,.0f} runs/sec)",
+          file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import os
+import struct
+
+import numpy as np
+
+# Binary telemetry: one fixed-width record per physics step, appended to a
+# file through an in-memory block so recording costs a row assignment per step
+# and memory stays constant however long the run is. Recordings are read back
+# by memory-mapping the file, so hours of data can be sliced and analysed
+# without loading it.
+
+RECORD_FIELDS = ("time", "position", "velocity", "KE", "PE", "TE")
+RECORD_DTYPE = np.dtype([(name, "<f8") for name in RECORD_FIELDS])
+
+# File header: magic, format version, record size in bytes
+TELEMETRY_MAGIC = b"COASTTEL"
+TELEMETRY_VERSION = 1
+HEADER = struct.Struct("<8sII")
+
+
+class TelemetryRecorder:
+    def __init__(self, path, block_records=4096):
+        self.path = path
+        self.block = np.zeros(block_records, dtype=RECORD_DTYPE)
+        self.pending = 0
+        self.count = 0
+
+        # Append to an existing recording instead of clobbering it
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists:
+            read_header(path)
+        self.file = open(path, "ab")
+        if not exists:
+            self.file.write(HEADER.pack(TELEMETRY_MAGIC, TELEMETRY_VERSION, RECORD_DTYPE.itemsize))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, time, position, velocity, KE, PE, TE):
+        self.block[self.pending] = (time, position, velocity, KE, PE, TE)
+        self.pending += 1
+        self.count += 1
+        if self.pending == len(self.block):
+            self.flush()
+
+    # Record a whole trace, as returned by CoasterSimulation.step
+    def record_trace(self, trace):
+        rows = np.zeros(len(trace["time"]), dtype=RECORD_DTYPE)
+        for name in RECORD_FIELDS:
+            rows[name] = trace[name]
+        self.flush()
+        rows.tofile(self.file)
+        self.count += len(rows)
+
+    def flush(self):
+        if self.pending:
+            self.block[:self.pending].tofile(self.file)
+            self.pending = 0
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path} is too short to be a telemetry recording")
+    magic, version, record_size = HEADER.unpack(header)
+    if magic != TELEMETRY_MAGIC:
+        raise ValueError(f"{path} is not a telemetry recording")
+    if version != TELEMETRY_VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"{path} uses telemetry format {version} with {record_size}-byte records; "
+                         f"expected format {TELEMETRY_VERSION}")
+    return version, record_size
+
+
+# Read-only view of a recording. Columns are memory-mapped arrays, e.g.
+# reader["KE"] or reader.records[1000:2000]. A record cut short by a crash
+# at the end of the file is ignored.
+class TelemetryReader:
+    def __init__(self, path):
+        read_header(path)
+        self.path = path
+        count = (os.path.getsize(path) - HEADER.size) // RECORD_DTYPE.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER.size, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, name):
+        return self.records[name]
+
+    # Index of the first record of each run; the simulation time starts over
+    # whenever the recorded simulation was reset
+    def run_starts(self):
+        restarts = np.flatnonzero(np.diff(self.records["time"]) < 0) + 1
+        return np.concatenate(([0], restarts)) if len(self) else restarts
+
+
+# Steps through a recording one physics step at a time, standing in for the
+# live simulation
+class TelemetryReplay:
+    def __init__(self, reader):
+        self.reader = reader
+        self.rewind()
+
+    def rewind(self):
+        self.index = 0
+        self.current = None
+        self.run_energy = None
+
+    @property
+    def finished(self):
+        return self.index >= len(self.reader)
+
+    # The next record, or None at the end of the recording
+    def next(self):
+        if self.finished:
+            return None
+        record = self.reader.records[self.index]
+        self.index += 1
+        if self.current is None or record["time"] < self.current["time"]:
+            self.run_energy = float(record["TE"])
+        self.current = record
+        return record
+
+    def energies(self):
+        if self.current is None:
+            return 0.0, 0.0, 0.0
+        return float(self.current["KE"]), float(self.current["PE"]), float(self.current["TE"])
+
+    def conservation(self):
+        # Current total energy as a percentage of the first total of this run
+        if self.current is None or not self.run_energy:
+            return 100
+        return float(self.current["TE"]) / self.run_energy * 100
@@ -0,0 +1,352 @@
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+
+# A polyline track parameterized by arc length. Everything that depends only on
+# the geometry (cumulative length, unit tangents, slope and curvature) is
+# computed once here, so positions along the track can be resolved with a
+# binary search and a linear interpolation instead of per-frame trigonometry.
+# Lengths are in the same units as the points (screen pixels).
+class Track:
+    def __init__(self, points):
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+
+        # Drop repeated points so every segment has a usable direction
+        if len(points) > 1:
+            keep = np.ones(len(points), dtype=bool)
+            keep[1:] = np.any(np.diff(points, axis=0) != 0, axis=1)
+            if not keep.all():
+                points = points[keep]
+        if len(points) < 2:
+            raise ValueError("a track needs at least two distinct points")
+
+        self.points = points
+        deltas = np.diff(points, axis=0)
+        self.segment_lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+        self.arc_length = np.concatenate(([0.0], np.cumsum(self.segment_lengths)))
+        self.length = float(self.arc_length[-1])
+
+        # Unit tangent of each segment, in screen coordinates (y grows downwards)
+        self.tangents = deltas / self.segment_lengths[:, None]
+
+        # Rise over run of each segment with height measured upwards
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.slopes = np.where(deltas[:, 0] != 0, -deltas[:, 1] / deltas[:, 0], np.inf)
+
+        # Signed curvature at each point: change of heading over the mean length
+        # of the two segments that meet there (zero at the two ends)
+        headings = np.arctan2(-deltas[:, 1], deltas[:, 0])
+        turn = (np.diff(headings) + np.pi) % (2 * np.pi) - np.pi
+        self.curvature = np.zeros(len(points))
+        self.curvature[1:-1] = turn / (0.5 * (self.segment_lengths[:-1] + self.segment_lengths[1:]))
+
+    def __len__(self):
+        return len(self.points)
+
+    # Segment index and fraction along it for a distance s along the track
+    def locate(self, s):
+        i = int(self.arc_length.searchsorted(s, side="right")) - 1
+        i = max(0, min(i, len(self.segment_lengths) - 1))
+        frac = float((s - self.arc_length[i]) / self.segment_lengths[i])
+        return i, max(0.0, min(1.0, frac))
+
+    # Vectorized locate for an array of distances
+    def locate_many(self, s):
+        i = np.searchsorted(self.arc_length, s, side="right") - 1
+        np.clip(i, 0, len(self.segment_lengths) - 1, out=i)
+        frac = np.clip((s - self.arc_length[i]) / self.segment_lengths[i], 0.0, 1.0)
+        return i, frac
+
+    def point_at(self, s):
+        i, frac = self.locate(s)
+        (x0, y0), (x1, y1) = self.points[i], self.points[i + 1]
+        return x0 + (x1 - x0) * frac, y0 + (y1 - y0) * frac
+
+    # Vectorized point_at: (..., 2) points for an array of distances
+    def points_at_many(self, s):
+        i, frac = self.locate_many(s)
+        return self.points[i] + (self.points[i + 1] - self.points[i]) * frac[..., None]
+
+    def y_at(self, s):
+        i, frac = self.locate(s)
+        y0, y1 = self.points[i, 1], self.points[i + 1, 1]
+        return y0 + (y1 - y0) * frac
+
+    def y_at_many(self, s):
+        i, frac = self.locate_many(s)
+        y = self.points[:, 1]
+        return y[i] + (y[i + 1] - y[i]) * frac
+
+    def tangent_at(self, s):
+        i, _ = self.locate(s)
+        return self.tangents[i]
+
+
+# Douglas-Peucker simplification: the subset of points (always including both
+# ends) within `tolerance` of the original polyline. All pending ranges are
+# split together in each pass, so the work is a few NumPy passes over the
+# points per level of recursion rather than a Python call per kept point.
+# Ranges start out as blocks of `block` points, which keeps the recursion
+# shallow on long tracks at the cost of keeping the block ends.
+def douglas_peucker(points, tolerance, block=1024):
+    points = np.asarray(points, dtype=float)
+    n = len(points)
+    starts = np.arange(0, max(n - 1, 1), block)
+    ends = np.minimum(starts + block, n - 1)
+    keep = np.zeros(n, dtype=bool)
+    keep[starts] = keep[ends] = True
+
+    while True:
+        inner = ends - starts > 1
+        starts, ends = starts[inner], ends[inner]
+        if not len(starts):
+            break
+
+        # Every interior point of every range, tagged with its range
+        counts = ends - starts - 1
+        offsets = np.cumsum(counts) - counts
+        owner = np.repeat(np.arange(len(starts)), counts)
+        index = starts[owner] + 1 + np.arange(counts.sum()) - offsets[owner]
+
+        # Distance from each point to its range's chord
+        a, b = points[starts][owner], points[ends][owner]
+        chord = b - a
+        length_sq = np.einsum("ij,ij->i", chord, chord)
+        t = np.einsum("ij,ij->i", points[index] - a, chord) / np.where(length_sq > 0, length_sq, 1)
+        nearest = a + chord * np.clip(t, 0, 1)[:, None]
+        distance = np.hypot(*(points[index] - nearest).T)
+
+        # Farthest point of each range; split the ranges where it is too far
+        farthest = np.maximum.reduceat(distance, offsets)
+        is_farthest = np.flatnonzero(distance == farthest[owner])
+        first = np.flatnonzero(np.diff(owner[is_farthest], prepend=-1))
+        split = index[is_farthest[first]]
+        over = farthest > tolerance
+        keep[split[over]] = True
+        starts, ends = (np.concatenate((starts[over], split[over])),
+                        np.concatenate((split[over], ends[over])))
+
+    return points[keep]
+
+
+# Successively simplified copies of a polyline: each level is the previous one
+# simplified with twice the tolerance, down to about min_points points, which
+# is far cheaper than simplifying the whole polyline again for every level.
+# The errors add up along the way, so the tolerance recorded for a level is
+# the sum of those used to reach it (under twice the last one): every point of
+# the polyline is within that distance of the level. Returns the levels (the
+# first is the polyline itself) and their tolerances.
+def simplify_levels(points, base_tolerance=0.5, min_points=64):
+    levels = [np.asarray(points, dtype=float)]
+    tolerances = [0.0]
+    extent = float(np.ptp(levels[0], axis=0).max()) if len(levels[0]) else 0.0
+    tolerance = base_tolerance
+    while len(levels[-1]) > min_points and tolerance <= extent:
+        simplified = douglas_peucker(levels[-1], tolerance)
+        if len(simplified) < len(levels[-1]):
+            levels.append(simplified)
+            tolerances.append(tolerances[-1] + tolerance)
+        tolerance *= 2
+    return levels, tolerances
+
+
+# Bump when the stored levels or tolerances change
+LOD_CACHE_VERSION = 2
+
+
+# Levels of detail of a track for drawing. Level 0 is the track itself and
+# the rest come from simplify_levels; with a cache directory they are stored
+# keyed by the points, since simplifying millions of points takes seconds.
+# Every level also has a spatial index: the bounding boxes of consecutive runs
+# of `chunk` points, so the part of a level inside a viewport is found without
+# looking at the points themselves.
+class TrackLOD:
+    def __init__(self, points, base_tolerance=0.5, min_points=64, chunk=128, cache_dir=None):
+        self.chunk = chunk
+        points = np.asarray(points, dtype=float)
+        if cache_dir is None:
+            self.levels, self.tolerances = simplify_levels(points, base_tolerance, min_points)
+        else:
+            self.levels, self.tolerances = self.cached_levels(points, base_tolerance, min_points, cache_dir)
+        self.boxes = [self.chunk_boxes(level) for level in self.levels]
+
+    @staticmethod
+    def cached_levels(points, base_tolerance, min_points, cache_dir):
+        key = _cache_key("lod", {"points": points, "base_tolerance": base_tolerance, "min_points": min_points,
+                                 "version": LOD_CACHE_VERSION})
+        path = os.path.join(cache_dir, f"lod-{key}.npz")
+        if os.path.exists(path):
+            with np.load(path) as data:
+                count = len(data["tolerances"])
+                # Level 0 is the points themselves and isn't stored
+                return [points] + [data[f"level{i}"] for i in range(1, count)], data["tolerances"].tolist()
+
+        levels, tolerances = simplify_levels(points, base_tolerance, min_points)
+        arrays = {f"level{i}": level for i, level in enumerate(levels) if i}
+        _save_atomic(path, lambda f: np.savez(f, tolerances=np.array(tolerances), **arrays))
+        return levels, tolerances
+
+    # (x min, x max, y min, y max) of each chunk; neighbouring chunks share
+    # their end point so no segment falls between two of them
+    def chunk_boxes(self, points):
+        starts = np.arange(0, max(len(points) - 1, 1), self.chunk)
+        boxes = []
+        for axis in (0, 1):
+            values = points[:, axis]
+            low = np.minimum.reduceat(values, starts)
+            high = np.maximum.reduceat(values, starts)
+            # Include the shared end point of every chunk
+            ends = np.minimum(starts + self.chunk, len(points) - 1)
+            boxes += [np.minimum(low, values[ends]), np.maximum(high, values[ends])]
+        return np.array(boxes)
+
+    # Coarsest level whose simplification error is within `tolerance`
+    def level_for(self, tolerance):
+        level = 0
+        for i, level_tolerance in enumerate(self.tolerances):
+            if level_tolerance <= tolerance:
+                level = i
+        return level
+
+    # Pieces of a level that cross the rectangle, as arrays of points
+    def visible(self, level, left, top, right, bottom):
+        points = self.levels[level]
+        x_min, x_max, y_min, y_max = self.boxes[level]
+        inside = (x_max >= left) & (x_min <= right) & (y_max >= top) & (y_min <= bottom)
+        chunks = np.flatnonzero(inside)
+        if not len(chunks):
+            return []
+
+        # Runs of consecutive visible chunks become one polyline each
+        breaks = np.flatnonzero(np.diff(chunks) > 1)
+        run_starts = chunks[np.concatenate(([0], breaks + 1))]
+        run_ends = chunks[np.concatenate((breaks, [len(chunks) - 1]))]
+        return [points[start * self.chunk:min((end + 1) * self.chunk, len(points) - 1) + 1]
+                for start, end in zip(run_starts, run_ends)]
+
+
+# Track generators, by name. Each takes keyword parameters and returns an
+# (n, 2) float array of points in screen coordinates.
+TRACK_GENERATORS = {}
+
+# Bump when a generator's output changes so stale cache files are not reused
+TRACK_CACHE_VERSION = 1
+
+# (amplitude, wavelength divisor, phase) of the sine waves in the default track
+DEFAULT_WAVES = ((80, 150, 0.0), (40, 80, np.pi / 4), (20, 200, np.pi))
+
+
+def track_generator(name):
+    def register(func):
+        TRACK_GENERATORS[name] = func
+        return func
+    return register
+
+
+# Sum of sine waves sampled every `step` pixels, clamped between the top and
+# bottom margins. The defaults reproduce the original 3 px, integer-height track.
+@track_generator("sine")
+def sine_track(width=1200, height=700, length=None, step=3, waves=DEFAULT_WAVES, x_offset=50,
+               top=100, bottom_margin=150, integer=True):
+    if length is None:
+        length = width - 100
+    x = np.arange(0, length, step, dtype=float)
+    y = np.full_like(x, height / 2)
+    for amplitude, divisor, phase in waves:
+        y += amplitude * np.sin(x / divisor + phase)
+    if integer:
+        y = np.floor(y)
+    np.clip(y, top, height - bottom_margin, out=y)
+    return np.column_stack((x + x_offset, y))
+
+
+# Catmull-Rom spline through the control points, with samples_per_segment
+# points between each pair of them
+@track_generator("spline")
+def spline_track(control_points, samples_per_segment=16):
+    control = np.asarray(control_points, dtype=float).reshape(-1, 2)
+    if len(control) < 2:
+        raise ValueError("a spline track needs at least two control points")
+
+    # Repeat the end points so the curve passes through every control point
+    padded = np.vstack((control[:1], control, control[-1:]))
+    p0, p1, p2, p3 = (padded[i:len(padded) - 3 + i, None, :] for i in range(4))
+    t = np.linspace(0, 1, samples_per_segment, endpoint=False)[None, :, None]
+    t2, t3 = t * t, t * t * t
+    curve = 0.5 * (2 * p1 + (p2 - p0) * t + (2 * p0 - 5 * p1 + 4 * p2 - p3) * t2
+                   + (3 * p1 - p0 - 3 * p2 + p3) * t3)
+    return np.vstack((curve.reshape(-1, 2), control[-1:]))
+
+
+# Points given directly or read from a .npy, .csv or whitespace-separated text file
+@track_generator("points")
+def point_list_track(points=None, path=None):
+    if points is None:
+        if path is None:
+            raise ValueError("a point list track needs points or a path")
+        if str(path).endswith(".npy"):
+            points = np.load(path)
+        else:
+            with open(path) as f:
+                delimiter = "," if "," in f.readline() else None
+            points = np.loadtxt(path, delimiter=delimiter, ndmin=2)
+    return np.asarray(points, dtype=float).reshape(-1, 2)
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "roller_coaster", "tracks")
+
+
+def _cache_key(name, params):
+    def encode(value):
+        if isinstance(value, np.ndarray):
+            return {"sha1": hashlib.sha1(np.ascontiguousarray(value).tobytes()).hexdigest(),
+                    "shape": value.shape}
+        return str(value)
+
+    params = dict(params)
+    # A file's contents are part of the key, by way of its size and mtime
+    if params.get("path") is not None:
+        stat = os.stat(params["path"])
+        params["path"] = [os.path.abspath(params["path"]), stat.st_size, stat.st_mtime_ns]
+    blob = json.dumps([TRACK_CACHE_VERSION, name, params], sort_keys=True, default=encode)
+    return hashlib.sha1(blob.encode()).hexdigest()[:20]
+
+
+# Generate a track by generator name. With a cache directory the result is
+# stored as a .npy file keyed by the generator and its parameters, and later
+# calls memory-map that file instead of generating the track again.
+def generate_track(name="sine", cache_dir=None, **params):
+    try:
+        generator = TRACK_GENERATORS[name]
+    except KeyError:
+        raise ValueError(f"unknown track generator {name!r}; choose from {sorted(TRACK_GENERATORS)}")
+
+    if cache_dir is None:
+        return generator(**params)
+
+    path = os.path.join(cache_dir, f"{name}-{_cache_key(name, params)}.npy")
+    if not os.path.exists(path):
+        points = generator(**params)
+        _save_atomic(path, lambda f: np.save(f, points))
+    return np.load(path, mmap_mode="r")
+
+
+# Write a cache file through a temporary file, so a crash never leaves a
+# truncated cache entry behind
+def _save_atomic(path, write):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(path)[1], dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,113 @@
+import numpy as np
+
+# History of a whole run of samples (KE, PE, TE by default) for a zoomable
+# graph. Level k of the pyramid holds the min and max of every series over
+# consecutive blocks of 2**k samples, and is built as samples arrive: each
+# completed pair of blocks at one level adds a block to the next, so an append
+# costs two block updates on average. Every level keeps at most `retention`
+# blocks, dropping the oldest, while the coarser levels keep covering the
+# whole run; memory grows with the log of the run length, and zooming into
+# the distant past shows it at the finest level that still reaches back there.
+class EnergyHistory:
+    def __init__(self, series=3, retention=1 << 16):
+        self.series = series
+        self.retention = retention
+        self.clear()
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+        # Per level: (mins, maxs) ring buffers of shape (series, size), grown
+        # by doubling up to `retention`, and the number of blocks completed
+        self.levels = []
+        self.blocks = []
+
+    def append(self, *values):
+        values = np.asarray(values, dtype=float)
+        self.add_block(0, values, values)
+        self.count += 1
+
+        # Every second block completes a pair, which becomes a block one level up
+        level = 0
+        while self.blocks[level] % 2 == 0:
+            mins, maxs = self.levels[level]
+            size = mins.shape[1]
+            first, second = (self.blocks[level] - 2) % size, (self.blocks[level] - 1) % size
+            self.add_block(level + 1, np.minimum(mins[:, first], mins[:, second]),
+                           np.maximum(maxs[:, first], maxs[:, second]))
+            level += 1
+
+    def add_block(self, level, block_min, block_max):
+        if level == len(self.levels):
+            # Level 0 stores each sample once, as both its min and its max
+            data = np.zeros((self.series, 16))
+            self.levels.append((data, data) if level == 0 else (data, np.zeros((self.series, 16))))
+            self.blocks.append(0)
+
+        mins, maxs = self.levels[level]
+        index = self.blocks[level]
+        size = mins.shape[1]
+        if index == size and size < self.retention:
+            # Nothing has wrapped round yet, so growing is a straight copy
+            size = min(size * 2, self.retention)
+            grown_min = np.zeros((self.series, size))
+            grown_min[:, :index] = mins
+            if level == 0:
+                grown_max = grown_min
+            else:
+                grown_max = np.zeros((self.series, size))
+                grown_max[:, :index] = maxs
+            mins, maxs = self.levels[level] = (grown_min, grown_max)
+
+        mins[:, index % size] = block_min
+        maxs[:, index % size] = block_max
+        self.blocks[level] = index + 1
+
+    # Oldest sample the given level still covers
+    def reach(self, level):
+        return max(0, self.blocks[level] - self.levels[level][0].shape[1]) << level
+
+    # Samples start..stop summarized over `width` pixel columns: the columns
+    # that have data, and the (series, columns) min and max in each. Uses the
+    # coarsest level with no more than one block per column that still
+    # reaches back to `start`, so the cost is proportional to the width.
+    def columns(self, start, stop, width):
+        start, stop = max(0, int(start)), min(int(stop), self.count)
+        if stop <= start or not self.levels:
+            empty = np.zeros((self.series, 0))
+            return np.zeros(0, dtype=int), empty, empty
+
+        per_column = (stop - start) / width
+        level = min(max(0, int(np.log2(per_column))) if per_column >= 1 else 0, len(self.levels) - 1)
+        while level < len(self.levels) - 1 and self.reach(level) > start:
+            level += 1
+
+        # Blocks of that level overlapping the range
+        first = max(start >> level, self.reach(level) >> level)
+        last = max(first, min(-(-stop >> level), self.blocks[level]))
+        mins, maxs = self.levels[level]
+        ring = np.arange(first, last) % mins.shape[1]
+        block_starts = [np.arange(first, last) << level]
+        block_mins, block_maxs = [mins[:, ring]], [maxs[:, ring]]
+
+        # The newest samples, short of a whole block, come from the finer
+        # levels; two more blocks at one level would have made one at the
+        # level above, so each adds at most one
+        tail = last << level
+        for finer in range(level - 1, -1, -1):
+            index = tail >> finer
+            if tail < stop and index < self.blocks[finer]:
+                mins, maxs = self.levels[finer]
+                block_starts.append([tail])
+                block_mins.append(mins[:, [index % mins.shape[1]]])
+                block_maxs.append(maxs[:, [index % mins.shape[1]]])
+                tail += 1 << finer
+
+        # Column of each block by where it starts, then min/max per column
+        block_starts = np.maximum(np.concatenate(block_starts), start)
+        column = np.minimum(((block_starts - start) / per_column).astype(int), width - 1)
+        breaks = np.flatnonzero(np.diff(column, prepend=-1))
+        return (column[breaks], np.minimum.reduceat(np.hstack(block_mins), breaks, axis=1),
+                np.maximum.reduceat(np.hstack(block_maxs), breaks, axis=1))
@@ -0,0 +1,159 @@
+import argparse
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+
+# Offscreen video export. The game runs on the dummy video driver with a fixed
+# clock, and each frame it draws is copied out of the display surface into a
+# bounded queue. Writer threads turn the frames into numbered PNG files, or
+# one raw RGB stream for an external encoder, e.g.
+#   ffmpeg -f rawvideo -pix_fmt rgb24 -s 1200x700 -r 60 -i frames.rgb video.mp4
+# Compression happens in the writers, and zlib releases the GIL while it
+# works, so rendering carries on alongside; it only waits for the writers
+# when the queue is full, which keeps memory bounded.
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+# PNG file of an (h, w, 4) RGBX image, stored as opaque RGBA: keeping the
+# padding byte lets the rows be filtered as flat runs of bytes, which is far
+# cheaper than gathering three channels out of four first. Every row uses the
+# Sub filter (each byte minus the one a pixel to its left), which shrinks the
+# gradients and flat fills the screens are made of.
+def encode_png(rgbx, compression=6):
+    height, width, _ = rgbx.shape
+    pixels = rgbx.reshape(height, width * 4)
+    rows = np.empty((height, 1 + width * 4), dtype=np.uint8)
+    rows[:, 0] = 1
+    rows[:, 1:5] = pixels[:, :4]
+    np.subtract(pixels[:, 4:], pixels[:, :-4], out=rows[:, 5:])
+    # Alpha of 255 in the first pixel of a row and no change after it
+    rows[:, 4] = 255
+    rows[:, 8::4] = 0
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+    return (PNG_SIGNATURE + _png_chunk(b"IHDR", header)
+            + _png_chunk(b"IDAT", zlib.compress(rows.tobytes(), compression)) + _png_chunk(b"IEND", b""))
+
+
+# Output format for a path: a raw stream for .rgb/.raw files or "-" (stdout),
+# otherwise a directory of PNG files
+def export_format(path):
+    return "raw" if path == "-" or path.lower().endswith((".rgb", ".raw")) else "png"
+
+
+class FrameExporter:
+    def __init__(self, path, size, format=None, workers=None, queue_frames=32, compression=6):
+        self.path = path
+        self.size = size
+        self.format = format or export_format(path)
+        self.compression = compression
+        self.queue = queue.Queue(maxsize=queue_frames)
+        self.frames = 0
+        self.waited = 0.0  # Seconds rendering spent blocked on a full queue
+        self.started = self.finished = None
+        self.error = None
+
+        if self.format == "png":
+            os.makedirs(path, exist_ok=True)
+            self.stream = None
+            workers = workers or os.cpu_count() or 1
+        else:
+            # One writer keeps the stream in frame order
+            self.stream = sys.stdout.buffer if path == "-" else open(path, "wb")
+            workers = 1
+        self.workers = [threading.Thread(target=self.write_frames, daemon=True) for _ in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    # Queue the surface's current contents; called from the render loop
+    def submit(self, surface):
+        if self.error is not None:
+            raise self.error
+        import pygame
+
+        if self.started is None:
+            self.started = time.perf_counter()
+        data = pygame.image.tobytes(surface, "RGBX")
+        start = time.perf_counter()
+        self.queue.put((self.frames, data))
+        self.waited += time.perf_counter() - start
+        self.frames += 1
+
+    def write_frames(self):
+        width, height = self.size
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue  # Keep draining so the render loop never blocks for good
+            index, data = item
+            try:
+                rgbx = np.frombuffer(data, dtype=np.uint8).reshape(height, width, 4)
+                if self.stream is not None:
+                    self.stream.write(rgbx[:, :, :3].tobytes())
+                else:
+                    with open(os.path.join(self.path, f"frame_{index:06d}.png"), "wb") as f:
+                        f.write(encode_png(rgbx, self.compression))
+            except Exception as error:
+                self.error = error
+
+    # Wait for every queued frame to be written
+    def close(self):
+        if self.finished is not None:
+            return
+        for _ in self.workers:
+            self.queue.put(None)
+        for worker in self.workers:
+            worker.join()
+        if self.stream is not None:
+            self.stream.flush()
+            if self.stream is not sys.stdout.buffer:
+                self.stream.close()
+        self.finished = time.perf_counter()
+        if self.error is not None:
+            raise self.error
+
+    # Frames written per second from the first frame until the last was on disk
+    @property
+    def frames_per_sec(self):
+        elapsed = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        return self.frames / elapsed if elapsed > 0 else 0.0
+
+
+# Render the simulation screen headlessly and write every frame
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render the simulation offscreen and write every frame as PNG files or raw RGB")
+    parser.add_argument("output", help="directory for frame_NNNNNN.png files, or a .rgb/.raw file "
+                                       "(or - for stdout) for a raw rgb24 stream")
+    parser.add_argument("--frames", type=int, default=600, help="frames to render (default 600)")
+    parser.add_argument("--workers", type=int, help="PNG writer threads (default: one per core)")
+    parser.add_argument("--compression", type=int, default=6, choices=range(10), metavar="0-9",
+                        help="PNG zlib level (default 6)")
+    args, game_args = parser.parse_known_args(argv)
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+    import roller_coaster_game
+
+    # The game reports the sustained rate on stderr when the export finishes
+    roller_coaster_game.main(["--export", args.output, "--frames", str(args.frames),
+                              "--export-compression", str(args.compression),
+                              *(["--export-workers", str(args.workers)] if args.workers else []),
+                              *game_args])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import csv
+import json
+import time
+from collections import deque
+
+import numpy as np
+import pygame
+
+
+# Per-phase frame timing. Each call to mark(name) charges the time since the
+# previous mark (or since begin_frame) to that phase, so instrumenting a
+# function is one line after each section rather than a wrapper around it.
+# Timings feed rolling windows for the overlay and, optionally, a CSV or
+# JSON-lines log with one record per frame. `phases` fixes the display order
+# and the CSV columns; unlisted phases still show in the overlay and JSON log.
+class FrameProfiler:
+    def __init__(self, phases=(), window=120, log_path=None):
+        self.window = window
+        self.show_overlay = False
+        # Phase name -> deque of recent durations in ms
+        self.phases = {phase: deque(maxlen=window) for phase in phases}
+        self.frame_times = deque(maxlen=window)
+        self.frame_number = 0
+        self.current = {}
+        self.frame_start = self.last_mark = 0.0
+
+        self.log_file = None
+        self.log_writer = None
+        if log_path:
+            self.log_file = open(log_path, "w", newline="")
+            self.log_format = "json" if log_path.endswith((".json", ".jsonl")) else "csv"
+            if self.log_format == "csv":
+                self.log_writer = csv.DictWriter(self.log_file, ["frame", *phases, "total_ms"],
+                                                 extrasaction="ignore", restval=0)
+                self.log_writer.writeheader()
+
+        # Overlay surface, re-rendered a few times a second rather than every frame
+        self.overlay = None
+        self.overlay_frame = -1
+        self.overlay_interval = 15
+
+    @property
+    def enabled(self):
+        return self.show_overlay or self.log_file is not None
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        self.overlay = None
+        # Don't charge the time since some long-gone frame to the next mark
+        self.frame_start = 0.0
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.current = {}
+        self.frame_start = self.last_mark = time.perf_counter()
+
+    def mark(self, phase):
+        if not self.enabled or not self.frame_start:
+            return
+        now = time.perf_counter()
+        self.current[phase] = self.current.get(phase, 0.0) + (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def end_frame(self):
+        if not self.enabled or not self.frame_start:
+            return
+        total = (time.perf_counter() - self.frame_start) * 1000
+        for phase, duration in self.current.items():
+            if phase not in self.phases:
+                self.phases[phase] = deque(maxlen=self.window)
+            self.phases[phase].append(duration)
+        self.frame_times.append(total)
+        if self.log_file is not None:
+            self.write_log(total)
+        self.frame_number += 1
+
+    def write_log(self, total):
+        record = {"frame": self.frame_number}
+        record.update((phase, round(duration, 4)) for phase, duration in self.current.items())
+        record["total_ms"] = round(total, 4)
+        if self.log_format == "json":
+            self.log_file.write(json.dumps(record) + "\n")
+        else:
+            self.log_writer.writerow(record)
+
+    # Rolling mean and percentiles (in ms) for every phase and the whole frame
+    def summary(self):
+        stats = {}
+        for phase, samples in list(self.phases.items()) + [("frame", self.frame_times)]:
+            if not samples:
+                continue
+            values = np.fromiter(samples, dtype=float)
+            p50, p95, p99 = np.percentile(values, (50, 95, 99))
+            stats[phase] = {"mean": float(values.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99)}
+        return stats
+
+    def draw_overlay(self, surface, font_obj, pos=(10, 10)):
+        if not self.show_overlay:
+            return None
+
+        if self.overlay is None or self.frame_number - self.overlay_frame >= self.overlay_interval:
+            self.overlay_frame = self.frame_number
+            rows = [("phase (ms)", "mean", "p95", "p99")]
+            for phase, stats in self.summary().items():
+                rows.append((phase, f"{stats['mean']:.2f}", f"{stats['p95']:.2f}", f"{stats['p99']:.2f}"))
+
+            # Render cell by cell so columns line up with proportional fonts too
+            cells = [[font_obj.render(text, True, (255, 255, 255)) for text in row] for row in rows]
+            widths = [max(row[i].get_width() for row in cells) + 12 for i in range(4)]
+            line_height = font_obj.get_linesize()
+            self.overlay = pygame.Surface((sum(widths) + 8, line_height * len(cells) + 12), pygame.SRCALPHA)
+            self.overlay.fill((0, 0, 0, 180))
+            for row_index, row in enumerate(cells):
+                x = 8
+                for col_index, text in enumerate(row):
+                    # Numbers are right-aligned, phase names left-aligned
+                    offset = 0 if col_index == 0 else widths[col_index] - 12 - text.get_width()
+                    self.overlay.blit(text, (x + offset, 6 + row_index * line_height))
+                    x += widths[col_index]
+
+        return surface.blit(self.overlay, pos)
+
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
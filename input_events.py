@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Deterministic input capture and playback. A capture logs every event the
+# main loop handles together with the frame it arrived on; playback feeds the
+# same events back on the same frames, with a fixed clock in place of wall
+# time so the physics advances identically. A recorded session then becomes a
+# repeatable workload for timing the render and physics paths.
+
+EVENT_LOG_VERSION = 1
+
+
+# Plain JSON value for an event attribute, or None for ones that can't be
+# stored (window handles and the like)
+def _encode(value):
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (tuple, list)) and all(isinstance(item, (bool, int, float)) for item in value):
+        return list(value)
+    return None
+
+
+class EventRecorder:
+    def __init__(self, path, fps):
+        self.file = open(path, "w")
+        self.file.write(json.dumps({"version": EVENT_LOG_VERSION, "fps": fps}) + "\n")
+
+    def capture(self, frame, events):
+        import pygame
+
+        for event in events:
+            record = {"frame": frame, "type": pygame.event.event_name(event.type)}
+            for name, value in event.dict.items():
+                value = _encode(value)
+                if value is not None:
+                    record[name] = value
+            self.file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+class EventPlayback:
+    def __init__(self, path):
+        import pygame
+
+        # Event type by the name event_name() gives it
+        names = {pygame.event.event_name(value): value for name, value in vars(pygame).items()
+                 if name.isupper() and isinstance(value, int)}
+        with open(path) as f:
+            header = json.loads(f.readline())
+            if header.get("version") != EVENT_LOG_VERSION:
+                raise ValueError(f"{path} is not an event log of version {EVENT_LOG_VERSION}")
+            self.fps = header["fps"]
+
+            # frame -> events, in the order they were captured
+            self.frames = {}
+            for line in f:
+                record = json.loads(line)
+                frame = record.pop("frame")
+                event_type = names[record.pop("type")]
+                attributes = {name: tuple(value) if isinstance(value, list) else value
+                              for name, value in record.items()}
+                self.frames.setdefault(frame, []).append(pygame.event.Event(event_type, attributes))
+        self.last_frame = max(self.frames, default=0)
+        self.frame = 0
+
+    @property
+    def finished(self):
+        return self.frame > self.last_frame
+
+    def events(self, frame):
+        self.frame = frame
+        return self.frames.get(frame, [])
+
+
+# Stands in for pygame.time.Clock during playback: every frame lasts exactly
+# 1/fps seconds of "time" and nothing sleeps, so playback runs flat out
+class FixedClock:
+    def __init__(self, fps):
+        self.frame_time = 1 / fps
+        self.ticks = 0
+
+    def tick(self, framerate=0):
+        self.ticks += 1
+        return int(self.frame_time * 1000)
+
+    def now(self):
+        return self.ticks * self.frame_time
+
+
+# Play an event log back headlessly and report how long it took
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a captured input session headlessly and time it")
+    parser.add_argument("events", help="event log written with roller_coaster_game.py --record-events")
+    parser.add_argument("--output", "-o", metavar="PATH", help="also write the timings as JSON to PATH")
+    args, game_args = parser.parse_known_args(argv)
+
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import roller_coaster_game
+
+    start = time.perf_counter()
+    frames = roller_coaster_game.main(["--play-events", args.events, *game_args])
+    elapsed = time.perf_counter() - start
+
+    result = {"events": args.events, "frames": frames, "seconds": elapsed,
+              "frames_per_sec": frames / elapsed if elapsed else 0.0,
+              "mean_frame_ms": elapsed / frames * 1000 if frames else 0.0}
+    print(f"{frames} frames in {elapsed:.2f}s ({result['frames_per_sec']:.1f} frames/sec, "
+          f"{result['mean_frame_ms']:.2f} ms/frame)")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,759 +1,1913 @@
-import pygame
-import sys
-import math
-
-# Initialize pygame
-pygame.init()
-
-# Constants
-WIDTH, HEIGHT = 1200, 700
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-RED = (220, 50, 50)  # KE - more vibrant
-BLUE = (50, 100, 220)  # PE - more vibrant
-GREEN = (50, 180, 50)  # TE - more vibrant
-GRAY = (200, 200, 200)
-LIGHT_GRAY = (240, 240, 240)
-DARK_GRAY = (100, 100, 100)
-ORANGE = (255, 140, 0)
-PURPLE = (148, 0, 211)
-
-# Enhanced UI Colors
-UI_PRIMARY = (64, 123, 255)
-UI_SUCCESS = (76, 175, 80)
-UI_WARNING = (255, 152, 0)
-UI_ERROR = (244, 67, 54)
-UI_SURFACE = (250, 250, 250)
-UI_CARD = (255, 255, 255)
-UI_SHADOW = (0, 0, 0, 30)
-UI_TEXT_PRIMARY = (33, 37, 41)
-UI_TEXT_SECONDARY = (108, 117, 125)
-UI_ACCENT = (156, 39, 176)
-
-g = 9.81  # more precise gravity value
-
-# Screen setup
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("🎢 Roller Coaster Physics Simulator - Interactive Learning Tool")
-font = pygame.font.SysFont("Segoe UI", 18)
-title_font = pygame.font.SysFont("Segoe UI", 28, bold=True)
-small_font = pygame.font.SysFont("Segoe UI", 14)
-large_font = pygame.font.SysFont("Segoe UI", 24, bold=True)
-
-# Simulation variables
-mass = 50.0
-initial_velocity = 8.0
-current_velocity = initial_velocity
-paused = True
-speed_factor = 0.03
-show_vectors = False
-show_grid = True
-
-
-# Create a more interesting track with multiple hills and loops
-def create_track():
-    points = []
-    for x in range(0, WIDTH - 100, 3):
-        # Multiple sine waves for varied terrain
-        y1 = 80 * math.sin(x / 150)
-        y2 = 40 * math.sin(x / 80 + math.pi / 4)
-        y3 = 20 * math.sin(x / 200 + math.pi)
-        y = int(HEIGHT / 2 + y1 + y2 + y3)
-        # Ensure track stays within bounds
-        y = max(100, min(HEIGHT - 150, y))
-        points.append((x + 50, y))
-    return points
-
-
-track_points = create_track()
-cart_pos = 0.0
-
-
-# Helper function to draw rounded rectangles
-def draw_rounded_rect(surface, color, rect, radius=10, shadow=False):
-    if shadow:
-        shadow_rect = pygame.Rect(rect.x + 3, rect.y + 3, rect.width, rect.height)
-        shadow_surf = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
-        pygame.draw.rect(shadow_surf, UI_SHADOW, (0, 0, rect.width, rect.height), border_radius=radius)
-        surface.blit(shadow_surf, shadow_rect)
-
-    pygame.draw.rect(surface, color, rect, border_radius=radius)
-
-
-# Input validation and formatting
-def validate_float_input(text, min_val=0.1, max_val=1000):
-    try:
-        value = float(text)
-        return max(min_val, min(max_val, value))
-    except:
-        return None
-
-
-# Enhanced UI elements with modern design
-class ModernInputBox:
-    def __init__(self, x, y, w, h, label, initial_value, min_val=0.1, max_val=1000, unit=""):
-        self.rect = pygame.Rect(x, y, w, h)
-        self.label = label
-        self.text = str(initial_value)
-        self.active = False
-        self.min_val = min_val
-        self.max_val = max_val
-        self.unit = unit
-        self.hover = False
-        self.focus_animation = 0
-
-    def handle_event(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            was_active = self.active
-            self.active = self.rect.collidepoint(event.pos)
-            if self.active and not was_active:
-                self.focus_animation = 0
-
-        if event.type == pygame.MOUSEMOTION:
-            self.hover = self.rect.collidepoint(event.pos)
-
-        if event.type == pygame.KEYDOWN and self.active:
-            if event.key == pygame.K_RETURN or event.key == pygame.K_TAB:
-                value = validate_float_input(self.text, self.min_val, self.max_val)
-                if value is not None:
-                    self.text = f"{value:.1f}"
-                self.active = False
-                return True
-            elif event.key == pygame.K_BACKSPACE:
-                self.text = self.text[:-1]
-            else:
-                if event.unicode.replace('.', '').replace('-', '').isdigit() or event.unicode == '.':
-                    if len(self.text) < 8:
-                        self.text += event.unicode
-        return False
-
-    def update(self):
-        if self.active and self.focus_animation < 10:
-            self.focus_animation += 1
-        elif not self.active and self.focus_animation > 0:
-            self.focus_animation -= 1
-
-    def draw(self, surface):
-        self.update()
-
-        # Draw shadow
-        draw_rounded_rect(surface, UI_CARD, self.rect, 8, shadow=True)
-
-        # Draw main input box
-        border_color = UI_PRIMARY if self.active else (LIGHT_GRAY if self.hover else GRAY)
-        draw_rounded_rect(surface, UI_CARD, self.rect, 8)
-        pygame.draw.rect(surface, border_color, self.rect, 2, border_radius=8)
-
-        # Animated focus indicator
-        if self.focus_animation > 0:
-            focus_intensity = self.focus_animation / 10.0
-            focus_color = (*UI_PRIMARY, int(50 * focus_intensity))
-            focus_surf = pygame.Surface((self.rect.width + 4, self.rect.height + 4), pygame.SRCALPHA)
-            pygame.draw.rect(focus_surf, focus_color, (0, 0, self.rect.width + 4, self.rect.height + 4),
-                             border_radius=10)
-            surface.blit(focus_surf, (self.rect.x - 2, self.rect.y - 2))
-
-        # Draw label
-        label_color = UI_PRIMARY if self.active else UI_TEXT_SECONDARY
-        label_surf = small_font.render(self.label, True, label_color)
-        surface.blit(label_surf, (self.rect.x, self.rect.y - 22))
-
-        # Draw text with unit
-        display_text = f"{self.text} {self.unit}".strip()
-        text_color = UI_TEXT_PRIMARY if self.text else UI_TEXT_SECONDARY
-        text_surf = font.render(display_text, True, text_color)
-        text_rect = text_surf.get_rect(center=(self.rect.centerx, self.rect.centery))
-        surface.blit(text_surf, text_rect)
-
-        # Draw cursor if active
-        if self.active and pygame.time.get_ticks() % 1000 < 500:
-            cursor_x = text_rect.right - len(self.unit) * 8 if self.unit else text_rect.right
-            pygame.draw.line(surface, UI_PRIMARY,
-                             (cursor_x + 2, self.rect.centery - 8),
-                             (cursor_x + 2, self.rect.centery + 8), 2)
-
-    def get_value(self):
-        value = validate_float_input(self.text, self.min_val, self.max_val)
-        return value if value is not None else float(self.text) if self.text else 0.1
-
-
-class ModernSlider:
-    def __init__(self, x, y, w, h, min_val, max_val, initial_val, label, format_string="{:.3f}"):
-        self.rect = pygame.Rect(x, y, w, h)
-        self.min_val = min_val
-        self.max_val = max_val
-        self.val = initial_val
-        self.label = label
-        self.dragging = False
-        self.hover = False
-        self.format_string = format_string
-
-    def handle_event(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if self.rect.collidepoint(event.pos):
-                self.dragging = True
-                self.update_value(event.pos[0])
-        elif event.type == pygame.MOUSEBUTTONUP:
-            self.dragging = False
-        elif event.type == pygame.MOUSEMOTION:
-            self.hover = self.rect.collidepoint(event.pos)
-            if self.dragging:
-                self.update_value(event.pos[0])
-
-    def update_value(self, mouse_x):
-        relative_x = mouse_x - self.rect.x
-        relative_x = max(0, min(self.rect.width, relative_x))
-        self.val = self.min_val + (relative_x / self.rect.width) * (self.max_val - self.min_val)
-
-    def draw(self, surface):
-        # Draw label with value
-        label_text = f"{self.label}: {self.format_string.format(self.val)}"
-        label_surf = small_font.render(label_text, True, UI_TEXT_PRIMARY)
-        surface.blit(label_surf, (self.rect.x, self.rect.y - 22))
-
-        # Draw track shadow
-        track_shadow = pygame.Rect(self.rect.x + 2, self.rect.y + 2, self.rect.width, self.rect.height)
-        draw_rounded_rect(surface, UI_SHADOW, track_shadow, self.rect.height // 2)
-
-        # Draw slider track
-        draw_rounded_rect(surface, LIGHT_GRAY, self.rect, self.rect.height // 2)
-
-        # Draw active track (filled portion)
-        filled_width = int((self.val - self.min_val) / (self.max_val - self.min_val) * self.rect.width)
-        if filled_width > 0:
-            filled_rect = pygame.Rect(self.rect.x, self.rect.y, filled_width, self.rect.height)
-            draw_rounded_rect(surface, UI_PRIMARY, filled_rect, self.rect.height // 2)
-
-        # Draw slider handle
-        handle_x = self.rect.x + (self.val - self.min_val) / (self.max_val - self.min_val) * self.rect.width
-        handle_size = 20 if self.hover or self.dragging else 16
-        handle_rect = pygame.Rect(handle_x - handle_size // 2, self.rect.centery - handle_size // 2, handle_size,
-                                  handle_size)
-
-        # Handle shadow
-        shadow_rect = pygame.Rect(handle_rect.x + 2, handle_rect.y + 2, handle_rect.width, handle_rect.height)
-        draw_rounded_rect(surface, UI_SHADOW, shadow_rect, handle_size // 2)
-
-        # Handle
-        draw_rounded_rect(surface, WHITE, handle_rect, handle_size // 2)
-        pygame.draw.rect(surface, UI_PRIMARY, handle_rect, 2, border_radius=handle_size // 2)
-
-
-class ModernButton:
-    def __init__(self, x, y, w, h, text, style="primary", icon=""):
-        self.rect = pygame.Rect(x, y, w, h)
-        self.text = text
-        self.icon = icon
-        self.hover = False
-        self.pressed = False
-        self.style = style
-        self.hover_scale = 1.0
-
-        # Style colors
-        self.colors = {
-            "primary": {"bg": UI_PRIMARY, "text": WHITE, "hover": (44, 103, 235)},
-            "success": {"bg": UI_SUCCESS, "text": WHITE, "hover": (56, 155, 60)},
-            "warning": {"bg": UI_WARNING, "text": WHITE, "hover": (235, 132, 0)},
-            "danger": {"bg": UI_ERROR, "text": WHITE, "hover": (224, 47, 34)},
-            "secondary": {"bg": LIGHT_GRAY, "text": UI_TEXT_PRIMARY, "hover": GRAY},
-            "accent": {"bg": UI_ACCENT, "text": WHITE, "hover": (136, 19, 156)}
-        }
-
-    def handle_event(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if self.rect.collidepoint(event.pos):
-                self.pressed = True
-        elif event.type == pygame.MOUSEBUTTONUP:
-            if self.pressed and self.rect.collidepoint(event.pos):
-                self.pressed = False
-                return True
-            self.pressed = False
-        elif event.type == pygame.MOUSEMOTION:
-            self.hover = self.rect.collidepoint(event.pos)
-        return False
-
-    def update(self):
-        target_scale = 1.05 if self.hover else 1.0
-        self.hover_scale += (target_scale - self.hover_scale) * 0.2
-
-    def draw(self, surface):
-        self.update()
-
-        # Calculate scaled rect
-        scale_offset = int((self.rect.width * (self.hover_scale - 1)) / 2)
-        scaled_rect = pygame.Rect(
-            self.rect.x - scale_offset,
-            self.rect.y - scale_offset,
-            self.rect.width + scale_offset * 2,
-            self.rect.height + scale_offset * 2
-        )
-
-        # Draw shadow
-        draw_rounded_rect(surface, UI_CARD, scaled_rect, 8, shadow=True)
-
-        # Choose colors based on state and style
-        color_set = self.colors.get(self.style, self.colors["primary"])
-        bg_color = color_set["hover"] if self.hover else color_set["bg"]
-        text_color = color_set["text"]
-
-        # Draw button
-        draw_rounded_rect(surface, bg_color, scaled_rect, 8)
-
-        # Draw text with icon
-        display_text = f"{self.icon} {self.text}".strip()
-        text_surf = font.render(display_text, True, text_color)
-        text_rect = text_surf.get_rect(center=scaled_rect.center)
-        surface.blit(text_surf, text_rect)
-
-    def is_clicked(self, pos):
-        return self.rect.collidepoint(pos)
-
-
-# Create modern UI elements
-mass_input = ModernInputBox(920, 80, 140, 40, "Mass", mass, 1, 200, "kg")
-velocity_input = ModernInputBox(920, 150, 140, 40, "Initial Velocity", initial_velocity, 0.1, 20, "m/s")
-speed_slider = ModernSlider(50, 550, 350, 20, 0.005, 0.1, speed_factor, "Animation Speed")
-
-# Create modern buttons
-start_btn = ModernButton(750, 580, 80, 45, "Start", "success", "▶")
-pause_btn = ModernButton(840, 580, 80, 45, "Pause", "warning", "⏸")
-reset_btn = ModernButton(930, 580, 80, 45, "Reset", "danger", "🔄")
-menu_btn = ModernButton(1020, 580, 100, 45, "Menu", "secondary", "📋")
-vectors_btn = ModernButton(920, 240, 140, 35, "Vectors", "secondary", "🎯")
-grid_btn = ModernButton(920, 285, 140, 35, "Grid", "secondary", "⚏")
-
-# Menu buttons
-menu_start_btn = ModernButton(WIDTH // 2 - 150, 250, 300, 60, "Start Simulation", "success", "🎢")
-menu_explain_btn = ModernButton(WIDTH // 2 - 150, 330, 300, 60, "Physics Guide", "primary", "📚")
-menu_exit_btn = ModernButton(WIDTH // 2 - 150, 410, 300, 60, "Exit", "danger", "❌")
-
-
-# Energy calculation and tracking
-def calculate_energies(cart_x, cart_y, velocity):
-    height = HEIGHT - cart_y
-    PE = mass * g * (height / 50)  # Scale factor for reasonable values
-    KE = 0.5 * mass * velocity * velocity
-    return KE, PE, KE + PE
-
-
-def reset_simulation():
-    global cart_pos, current_velocity, paused, graph_data_KE, graph_data_PE, graph_data_TE, E_total
-    cart_pos = 0.0
-    current_velocity = velocity_input.get_value()
-    paused = True
-
-    # Calculate initial total energy
-    x0, y0 = track_points[0]
-    _, PE0, _ = calculate_energies(x0, y0, current_velocity)
-    KE0 = 0.5 * mass * current_velocity * current_velocity
-    E_total = KE0 + PE0
-
-    # Clear graph data
-    graph_data_KE.clear()
-    graph_data_PE.clear()
-    graph_data_TE.clear()
-
-
-# Graph data storage
-graph_data_KE = []
-graph_data_PE = []
-graph_data_TE = []
-max_graph_points = 300
-E_total = 0
-
-# States
-current_state = "menu"  # "menu", "simulation", "explanation"
-
-
-def draw_grid():
-    if not show_grid:
-        return
-
-    # Softer grid lines
-    for x in range(0, WIDTH, 50):
-        pygame.draw.line(screen, (240, 240, 240), (x, 0), (x, HEIGHT), 1)
-
-    for y in range(0, HEIGHT, 50):
-        pygame.draw.line(screen, (240, 240, 240), (0, y), (WIDTH, y), 1)
-
-
-def draw_text(text, x, y, color=UI_TEXT_PRIMARY, font_obj=font, center=False):
-    surface = font_obj.render(text, True, color)
-    if center:
-        rect = surface.get_rect(center=(x, y))
-        screen.blit(surface, rect)
-    else:
-        screen.blit(surface, (x, y))
-
-
-def show_menu():
-    # Gradient background
-    for y in range(HEIGHT):
-        color_factor = y / HEIGHT
-        r = int(245 + color_factor * 10)
-        g = int(245 + color_factor * 10)
-        b = int(250 + color_factor * 5)
-        pygame.draw.line(screen, (r, g, b), (0, y), (WIDTH, y))
-
-    # Main title card
-    title_card = pygame.Rect(WIDTH // 2 - 300, 80, 600, 120)
-    draw_rounded_rect(screen, UI_CARD, title_card, 15, shadow=True)
-
-    # Title
-    draw_text("🎢 Roller Coaster Physics", WIDTH // 2, 130, UI_PRIMARY, large_font, True)
-    draw_text("Interactive Energy Conservation Simulator", WIDTH // 2, 160, UI_TEXT_SECONDARY, font, True)
-
-    # Menu buttons
-    menu_start_btn.draw(screen)
-    menu_explain_btn.draw(screen)
-    menu_exit_btn.draw(screen)
-
-    # Feature highlights
-    features = [
-        "🔴 Real-time Kinetic Energy tracking",
-        "🔵 Potential Energy visualization",
-        "📊 Interactive energy graphs",
-        "🎯 Physics vector display"
-    ]
-
-    feature_y = 520
-    for i, feature in enumerate(features):
-        x_pos = WIDTH // 2 - 200 + (i % 2) * 200
-        y_pos = feature_y + (i // 2) * 25
-        draw_text(feature, x_pos, y_pos, UI_TEXT_SECONDARY, small_font)
-
-
-def show_explanation():
-    # Gradient background
-    for y in range(HEIGHT):
-        color_factor = y / HEIGHT
-        r = int(250 + color_factor * 5)
-        g = int(250 + color_factor * 5)
-        b = int(255)
-        pygame.draw.line(screen, (r, g, b), (0, y), (WIDTH, y))
-
-    # Main content card
-    content_card = pygame.Rect(50, 50, WIDTH - 100, HEIGHT - 120)
-    draw_rounded_rect(screen, UI_CARD, content_card, 15, shadow=True)
-
-    draw_text("📚 Physics Concepts Guide", WIDTH // 2, 80, UI_PRIMARY, title_font, True)
-
-    # Organized sections
-    sections = [
-        {
-            "title": "🔴 Kinetic Energy (KE)",
-            "formula": "KE = ½mv²",
-            "points": ["Energy of motion", "Increases with speed", "Higher when going downhill"]
-        },
-        {
-            "title": "🔵 Potential Energy (PE)",
-            "formula": "PE = mgh",
-            "points": ["Energy of position", "Increases with height", "Higher at peaks"]
-        },
-        {
-            "title": "🟢 Energy Conservation",
-            "formula": "Total Energy = KE + PE",
-            "points": ["Total energy stays constant", "Energy transforms between KE and PE",
-                       "No energy is lost or gained"]
-        }
-    ]
-
-    y_pos = 130
-    for section in sections:
-        # Section header
-        draw_text(section["title"], 80, y_pos, UI_TEXT_PRIMARY, font)
-        draw_text(section["formula"], 350, y_pos, UI_ACCENT, font)
-        y_pos += 30
-
-        # Section points
-        for point in section["points"]:
-            draw_text(f"• {point}", 100, y_pos, UI_TEXT_SECONDARY, small_font)
-            y_pos += 20
-        y_pos += 15
-
-    # Interactive tip
-    tip_rect = pygame.Rect(80, HEIGHT - 100, WIDTH - 160, 40)
-    draw_rounded_rect(screen, (230, 247, 255), tip_rect, 8)
-    draw_text("💡 Tip: Watch the real-time graph to see energy transformation!",
-              WIDTH // 2, tip_rect.centery, UI_PRIMARY, font, True)
-
-    # Return instruction
-    draw_text("Click anywhere to return to menu", WIDTH // 2, HEIGHT - 30, UI_TEXT_SECONDARY, small_font, True)
-
-
-def draw_energy_graph():
-    # Modern card design
-    graph_card = pygame.Rect(30, 30, 340, 170)
-    draw_rounded_rect(screen, UI_CARD, graph_card, 12, shadow=True)
-
-    # Header
-    draw_text("📊 Energy Analysis", 50, 40, UI_TEXT_PRIMARY, font)
-
-    graph_rect = pygame.Rect(50, 70, 300, 130)
-    pygame.draw.rect(screen, UI_SURFACE, graph_rect, border_radius=8)
-
-    if len(graph_data_KE) < 2:
-        draw_text("Simulation data will appear here", graph_rect.centerx, graph_rect.centery,
-                  UI_TEXT_SECONDARY, small_font, True)
-        return
-
-    # Find max value for scaling
-    all_data = graph_data_KE + graph_data_PE + graph_data_TE
-    if not all_data:
-        return
-
-    max_val = max(all_data)
-    if max_val <= 0:
-        return
-
-    scale_y = 120 / max_val
-    scale_x = 290 / max_graph_points
-
-    # Draw graph lines with smoother appearance
-    for i in range(1, len(graph_data_KE)):
-        # KE line (red)
-        pygame.draw.line(screen, RED,
-                         (55 + (i - 1) * scale_x, graph_rect.bottom - 10 - graph_data_KE[i - 1] * scale_y),
-                         (55 + i * scale_x, graph_rect.bottom - 10 - graph_data_KE[i] * scale_y), 3)
-
-        # PE line (blue)
-        pygame.draw.line(screen, BLUE,
-                         (55 + (i - 1) * scale_x, graph_rect.bottom - 10 - graph_data_PE[i - 1] * scale_y),
-                         (55 + i * scale_x, graph_rect.bottom - 10 - graph_data_PE[i] * scale_y), 3)
-
-        # TE line (green)
-        pygame.draw.line(screen, GREEN,
-                         (55 + (i - 1) * scale_x, graph_rect.bottom - 10 - graph_data_TE[i - 1] * scale_y),
-                         (55 + i * scale_x, graph_rect.bottom - 10 - graph_data_TE[i] * scale_y), 3)
-
-    # Modern legend with colored boxes
-    legend_items = [("KE", RED), ("PE", BLUE), ("TE", GREEN)]
-    legend_x = 55
-    for label, color in legend_items:
-        pygame.draw.rect(screen, color, (legend_x, 10, 12, 12), border_radius=2)
-        draw_text(label, legend_x + 18, 6, UI_TEXT_PRIMARY, small_font)
-        legend_x += 50
-
-
-def draw_velocity_vectors(cart_x, cart_y, velocity):
-    if not show_vectors or velocity <= 0:
-        return
-
-    # Calculate direction based on track slope
-    idx = max(0, min(int(cart_pos), len(track_points) - 2))
-    if idx < len(track_points) - 1:
-        dx = track_points[idx + 1][0] - track_points[idx][0]
-        dy = track_points[idx + 1][1] - track_points[idx][1]
-        length = math.sqrt(dx * dx + dy * dy)
-        if length > 0:
-            dx, dy = dx / length, dy / length
-
-        # Scale vector by velocity
-        vector_length = velocity * 12
-        end_x = cart_x + dx * vector_length
-        end_y = cart_y + dy * vector_length
-
-        # Enhanced vector with gradient
-        pygame.draw.line(screen, ORANGE, (cart_x, cart_y), (end_x, end_y), 4)
-        pygame.draw.circle(screen, (255, 200, 0), (int(end_x), int(end_y)), 6)
-        pygame.draw.circle(screen, ORANGE, (int(end_x), int(end_y)), 6, 2)
-
-
-def show_simulation():
-    global cart_pos, current_velocity, paused, mass, E_total
-
-    # Modern gradient background
-    for y in range(HEIGHT):
-        color_factor = y / HEIGHT
-        r = int(248 + color_factor * 7)
-        g = int(250 + color_factor * 5)
-        b = int(252 + color_factor * 3)
-        pygame.draw.line(screen, (r, g, b), (0, y), (WIDTH, y))
-
-    draw_grid()
-
-    # Update mass from input
-    mass = mass_input.get_value()
-    speed_factor = speed_slider.val
-
-    # Enhanced track drawing
-    if len(track_points) > 1:
-        # Track shadow
-        shadow_points = [(x + 3, y + 3) for x, y in track_points]
-        pygame.draw.lines(screen, (180, 180, 180), False, shadow_points, 10)
-        # Main track
-        pygame.draw.lines(screen, (60, 60, 60), False, track_points, 8)
-        # Track highlights
-        pygame.draw.lines(screen, (120, 120, 120), False, track_points, 4)
-
-    # Get cart position and draw enhanced cart
-    if track_points:
-        idx = max(0, min(int(cart_pos), len(track_points) - 1))
-        cart_x, cart_y = track_points[idx]
-
-        # Calculate energies
-        KE, PE, TE = calculate_energies(cart_x, cart_y, current_velocity)
-
-        # Enhanced cart with modern styling
-        cart_size = 22
-        # Cart shadow
-        pygame.draw.ellipse(screen, (100, 100, 100, 100),
-                            (cart_x - cart_size // 2 + 3, cart_y - cart_size // 2 + 3, cart_size, cart_size))
-        # Main cart
-        pygame.draw.ellipse(screen, UI_ERROR, (cart_x - cart_size // 2, cart_y - cart_size // 2, cart_size, cart_size))
-        # Cart highlight
-        pygame.draw.ellipse(screen, (255, 200, 200),
-                            (cart_x - cart_size // 2 + 2, cart_y - cart_size // 2 + 2, cart_size // 2, cart_size // 3))
-        # Cart outline
-        pygame.draw.ellipse(screen, BLACK, (cart_x - cart_size // 2, cart_y - cart_size // 2, cart_size, cart_size), 2)
-
-        # Draw velocity vectors
-        draw_velocity_vectors(cart_x, cart_y, current_velocity)
-
-        # Modern energy display panel
-        panel_rect = pygame.Rect(400, 20, 480, 140)
-        draw_rounded_rect(screen, UI_CARD, panel_rect, 12, shadow=True)
-
-        # Panel header
-        draw_text("📊 Real-Time Energy Analysis", 420, 40, UI_PRIMARY, font)
-
-        # Create a grid layout for data
-        draw_text(f"Mass: {mass:.1f} kg", 420, 70, UI_TEXT_PRIMARY, font)
-        draw_text(f"Velocity: {current_velocity:.2f} m/s", 420, 95, UI_TEXT_PRIMARY, font)
-
-        # Energy values with color coding
-        draw_text(f"🔴 Kinetic Energy: {KE:.1f} J", 620, 70, RED, font)
-        draw_text(f"🔵 Potential Energy: {PE:.1f} J", 620, 95, BLUE, font)
-        draw_text(f"🟢 Total Energy: {TE:.1f} J", 420, 120, GREEN, font)
-        conservation_pct = (TE / E_total * 100) if E_total > 0 else 100
-        conservation_color = UI_SUCCESS if conservation_pct > 98 else UI_WARNING
-        draw_text(f"⚖️ Conservation: {conservation_pct:.1f}%", 620, 120, conservation_color, font)
-
-    # Right panel for controls
-    control_panel = pygame.Rect(900, 10, 280, 270)
-    draw_rounded_rect(screen, UI_CARD, control_panel, 12, shadow=True)
-
-    # Panel header
-    draw_text("🎛️ Simulation Controls", 920, 30, UI_PRIMARY, font)
-
-    # UI Elements with better spacing
-    mass_input.draw(screen)
-    velocity_input.draw(screen)
-    # vectors_btn.draw(screen)
-    # grid_btn.draw(screen)
-
-    # Status indicator with modern design
-    status_card = pygame.Rect(920, 210, 140, 60)
-    status_color = UI_SUCCESS if not paused else UI_WARNING
-    draw_rounded_rect(screen, status_color, status_card, 8)
-
-    status_icon = "🟢" if not paused else "🟡"
-    status_text = "RUNNING" if not paused else "PAUSED"
-    draw_text(status_icon, status_card.centerx, status_card.centery - 8, WHITE, font, True)
-    draw_text(status_text, status_card.centerx, status_card.centery + 8, WHITE, small_font, True)
-
-    # Bottom control bar
-    control_bar = pygame.Rect(0, HEIGHT - 70, WIDTH, 70)
-    draw_rounded_rect(screen, UI_CARD, control_bar, 0, shadow=True)
-
-    # Control buttons
-    start_btn.draw(screen)
-    pause_btn.draw(screen)
-    reset_btn.draw(screen)
-    menu_btn.draw(screen)
-
-    # Speed slider
-    speed_slider.draw(screen)
-
-    # Graph
-    draw_energy_graph()
-
-    # Update simulation
-    if not paused and track_points and not any([mass_input.active, velocity_input.active]):
-        old_pos = cart_pos
-        cart_pos += current_velocity * speed_factor
-
-        if cart_pos >= len(track_points) - 1:
-            cart_pos = 0.0
-
-        # Physics calculation with energy conservation
-        idx = max(0, min(int(cart_pos), len(track_points) - 1))
-        cart_x, cart_y = track_points[idx]
-        KE, PE, TE = calculate_energies(cart_x, cart_y, current_velocity)
-
-        # Update velocity based on energy conservation
-        available_KE = max(0.01, E_total - PE)  # Minimum KE to prevent stopping
-        current_velocity = math.sqrt(2 * available_KE / mass)
-
-        # Store data for graph
-        if int(old_pos) != int(cart_pos):  # Only store when position changes significantly
-            graph_data_KE.append(KE)
-            graph_data_PE.append(PE)
-            graph_data_TE.append(TE)
-
-            if len(graph_data_KE) > max_graph_points:
-                graph_data_KE.pop(0)
-                graph_data_PE.pop(0)
-                graph_data_TE.pop(0)
-
-
-# Initialize simulation
-reset_simulation()
-
-# Main game loop
-clock = pygame.time.Clock()
-running = True
-
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-
-        # Handle UI events
-        if current_state == "simulation":
-            mass_input.handle_event(event)
-            velocity_input.handle_event(event)
-            speed_slider.handle_event(event)
-
-            # Handle button events
-            if start_btn.handle_event(event):
-                paused = False
-            elif pause_btn.handle_event(event):
-                paused = True
-            elif reset_btn.handle_event(event):
-                reset_simulation()
-            elif menu_btn.handle_event(event):
-                current_state = "menu"
-            elif vectors_btn.handle_event(event):
-                show_vectors = not show_vectors
-                vectors_btn.text = "Hide Vectors" if show_vectors else "Show Vectors"
-            elif grid_btn.handle_event(event):
-                show_grid = not show_grid
-                grid_btn.text = "Hide Grid" if show_grid else "Show Grid"
-
-        elif current_state == "menu":
-            if menu_start_btn.handle_event(event):
-                current_state = "simulation"
-                reset_simulation()
-            elif menu_explain_btn.handle_event(event):
-                current_state = "explanation"
-            elif menu_exit_btn.handle_event(event):
-                running = False
-
-        elif current_state == "explanation":
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                current_state = "menu"
-
-    # Render current state
-    if current_state == "menu":
-        show_menu()
-    elif current_state == "simulation":
-        show_simulation()
-    elif current_state == "explanation":
-        show_explanation()
-
-    pygame.display.flip()
-    clock.tick(60)  # 60 FPS for smooth animation
-
-pygame.quit()
-sys.exit()
+import sys
+import os
+import math
+import json
+import time
+import argparse
+from collections import OrderedDict
+from functools import lru_cache
+
+# Keep pygame's import banner off stdout, which --export - writes frames to
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+
+from coaster_sim import CoasterSimulation, CoasterTrain, PHYSICS_DT, TrackDynamics, create_track  # noqa: E402
+from coaster_telemetry import TelemetryReader, TelemetryRecorder, TelemetryReplay  # noqa: E402
+from coaster_track import Track, TrackLOD, default_cache_dir, generate_track  # noqa: E402
+from energy_history import EnergyHistory  # noqa: E402
+from frame_export import FrameExporter  # noqa: E402
+from frame_profiler import FrameProfiler  # noqa: E402
+from input_events import EventPlayback, EventRecorder, FixedClock  # noqa: E402
+
+# Constants
+WIDTH, HEIGHT = 1200, 700
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+RED = (220, 50, 50)  # KE - more vibrant
+BLUE = (50, 100, 220)  # PE - more vibrant
+GREEN = (50, 180, 50)  # TE - more vibrant
+GRAY = (200, 200, 200)
+LIGHT_GRAY = (240, 240, 240)
+DARK_GRAY = (100, 100, 100)
+ORANGE = (255, 140, 0)
+PURPLE = (148, 0, 211)
+
+# Enhanced UI Colors
+UI_PRIMARY = (64, 123, 255)
+UI_SUCCESS = (76, 175, 80)
+UI_WARNING = (255, 152, 0)
+UI_ERROR = (244, 67, 54)
+UI_SURFACE = (250, 250, 250)
+UI_CARD = (255, 255, 255)
+UI_SHADOW = (0, 0, 0, 30)
+UI_TEXT_PRIMARY = (33, 37, 41)
+UI_TEXT_SECONDARY = (108, 117, 125)
+UI_ACCENT = (156, 39, 176)
+
+# Screen and fonts, set up by init() rather than on import. `screen` is the
+# canvas everything is drawn on, and `display` the window it is shown in.
+screen = display = None
+font = title_font = small_font = large_font = None
+
+# Simulation variables
+mass = 50.0
+initial_velocity = 8.0
+paused = True
+speed_factor = 0.03
+show_vectors = False
+show_grid = True
+
+
+# The track and everything built from it are set up by init(), so importing
+# this module stays cheap
+track_points = None
+track_version = 0  # Bumped whenever track_points is replaced
+# Simplified copies of the track with a spatial index, for drawing
+track_lod = None
+
+# The headless physics core; the UI only draws its state and feeds it input
+simulation = None
+
+# Optional telemetry: every physics step is appended to `recorder`, and with
+# `replay` set the cart follows a recording instead of live physics
+recorder = None
+replay = None
+# With --export, every frame drawn is also handed to this FrameExporter
+exporter = None
+
+# Other carts sharing the track, for a busy park: a CoasterTrain of
+# independent riders or coupled trains, advanced alongside the simulation
+park = None
+park_previous_positions = None
+
+CART_SIZE = 22
+CAR_SPACING = 26  # Pixels of track between the cars of a train
+
+
+# Resolved font files are kept between runs: SysFont scans every installed
+# font on its first call, which dominates startup when the font is missing.
+# {"name|bold|italic": [font path, fake bold, fake italic]}, or for a font
+# that wasn't found [null, fake bold, fake italic, font directory fingerprint],
+# which is looked up again once the font directories change.
+FONT_CACHE_PATH = os.path.join(os.path.dirname(default_cache_dir()), "fonts.json")
+
+# Where fonts get installed, including the directories under these
+if sys.platform == "win32":
+    FONT_DIRS = [os.path.join(os.environ.get("WINDIR", r"C:\Windows"), "Fonts")]
+    if os.environ.get("LOCALAPPDATA"):
+        FONT_DIRS.append(os.path.join(os.environ["LOCALAPPDATA"], "Microsoft", "Windows", "Fonts"))
+elif sys.platform == "darwin":
+    FONT_DIRS = ["/Library/Fonts", "/System/Library/Fonts", os.path.expanduser("~/Library/Fonts")]
+else:
+    FONT_DIRS = ["/usr/share/fonts", "/usr/local/share/fonts", os.path.expanduser("~/.fonts"),
+                 os.path.join(os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "fonts")]
+
+
+def load_font_cache():
+    try:
+        with open(FONT_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_font_cache(cache):
+    try:
+        os.makedirs(os.path.dirname(FONT_CACHE_PATH), exist_ok=True)
+        with open(FONT_CACHE_PATH, "w") as f:
+            json.dump(cache, f, indent=1)
+    except OSError:
+        pass  # The cache only saves time; running without it is fine
+
+
+# How many font directories there are and the newest change to any of them.
+# Installing or removing a font changes the directory it is in, so this
+# changes too; it is worked out once per run.
+@lru_cache(maxsize=1)
+def font_dirs_fingerprint():
+    count = newest = 0
+    for top in FONT_DIRS:
+        for directory, _, _ in os.walk(top):
+            try:
+                newest = max(newest, os.stat(directory).st_mtime_ns)
+            except OSError:
+                continue
+            count += 1
+    return f"{count}:{newest}"
+
+
+def font_entry_valid(entry):
+    if entry is None:
+        return False
+    if entry[0] is None:
+        return len(entry) > 3 and entry[3] == font_dirs_fingerprint()
+    return os.path.exists(entry[0])
+
+
+# Same font SysFont would pick, without the system scan when it is cached
+def load_font(name, size, bold=False, italic=False, cache=None):
+    cache = load_font_cache() if cache is None else cache
+    key = f"{name}|{bold}|{italic}"
+    entry = cache.get(key)
+    if not font_entry_valid(entry):
+        def resolve(path, _size, fake_bold, fake_italic):
+            entry[:] = [path, fake_bold, fake_italic]
+        entry = []
+        pygame.font.SysFont(name, size, bold, italic, constructor=resolve)
+        if entry[0] is None:
+            entry.append(font_dirs_fingerprint())
+        cache[key] = entry
+        save_font_cache(cache)
+
+    path, fake_bold, fake_italic = entry[:3]
+    font_obj = pygame.font.Font(path, size)
+    font_obj.set_bold(fake_bold)
+    font_obj.set_italic(fake_italic)
+    return font_obj
+
+
+# Everything is laid out in layout units on a WIDTH x HEIGHT design. The
+# design is fitted to the window at `view_rect`, keeping its aspect ratio,
+# and drawn on a canvas with `ui_scale` pixels per unit: the fit times the
+# render scale. A canvas smaller or larger than the view is scaled to it as
+# the frame is presented; at render scale 1 in a WIDTH x HEIGHT window the
+# canvas is the window itself.
+render_scale = 1.0
+ui_scale = 1.0
+view_rect = pygame.Rect(0, 0, WIDTH, HEIGHT)
+smooth_scaling = False
+
+
+# Layout units to canvas pixels
+def px(value):
+    return value * ui_scale if ui_scale != 1 else value
+
+
+def to_canvas(pos):
+    return (pos[0] * ui_scale, pos[1] * ui_scale) if ui_scale != 1 else pos
+
+
+# Canvas rect of a layout rect; rects that meet in the layout still meet
+def canvas_rect(rect):
+    rect = pygame.Rect(rect)
+    if ui_scale == 1:
+        return rect
+    left, top = round(rect.left * ui_scale), round(rect.top * ui_scale)
+    return pygame.Rect(left, top, round(rect.right * ui_scale) - left, round(rect.bottom * ui_scale) - top)
+
+
+# Line width in canvas pixels, at least one
+def line_width(width):
+    return max(1, round(width * ui_scale)) if ui_scale != 1 else width
+
+
+def font_size(size):
+    return max(1, round(size * ui_scale))
+
+
+# Window pixels per canvas pixel across and down. The canvas and the view
+# are rounded to whole pixels separately, so the two can differ slightly.
+def present_scale():
+    return view_rect.width / screen.get_width(), view_rect.height / screen.get_height()
+
+
+# Window pixels per layout unit across and down, as the canvas is presented
+def window_scale():
+    scale_x, scale_y = present_scale()
+    return ui_scale * scale_x, ui_scale * scale_y
+
+
+# Window pixels to layout units, for pointer input
+def window_to_layout(pos):
+    if view_rect == (0, 0, WIDTH, HEIGHT):
+        return pos
+    scale_x, scale_y = window_scale()
+    return math.floor((pos[0] - view_rect.x) / scale_x), math.floor((pos[1] - view_rect.y) / scale_y)
+
+
+# Open the window, fit the layout to it, load the fonts at the canvas scale
+# and set up `track`, or the default track if none is set yet. Only the
+# display and font modules are started; nothing here uses audio, joysticks or
+# the other subsystems.
+def init(window_size=None, scale=1.0, smooth=False, track=None):
+    global screen, display, font, title_font, small_font, large_font
+    global render_scale, ui_scale, view_rect, smooth_scaling
+    if screen is not None:
+        return
+    pygame.display.init()
+    pygame.font.init()
+    display = pygame.display.set_mode(window_size or (WIDTH, HEIGHT))
+    pygame.display.set_caption("🎢 Roller Coaster Physics Simulator - Interactive Learning Tool")
+
+    window = display.get_rect()
+    fit = min(window.width / WIDTH, window.height / HEIGHT)
+    view_rect = pygame.Rect(0, 0, round(WIDTH * fit), round(HEIGHT * fit))
+    view_rect.center = window.center
+    render_scale, ui_scale, smooth_scaling = scale, fit * scale, smooth
+    canvas_size = (round(WIDTH * ui_scale), round(HEIGHT * ui_scale))
+    screen = display if view_rect == window and canvas_size == window.size else pygame.Surface(canvas_size).convert()
+
+    fonts = load_font_cache()
+    font = load_font("Segoe UI", font_size(18), cache=fonts)
+    title_font = load_font("Segoe UI", font_size(28), bold=True, cache=fonts)
+    small_font = load_font("Segoe UI", font_size(14), cache=fonts)
+    large_font = load_font("Segoe UI", font_size(24), bold=True, cache=fonts)
+
+    if track is not None or track_points is None:
+        set_track(track if track is not None else create_track(WIDTH, HEIGHT))
+
+
+# Copy the canvas to the window, scaling it to the view, and return the
+# window areas that changed: all of it, or the given canvas rects
+def present_canvas(rects=None):
+    if screen is display:
+        return rects
+    scale = pygame.transform.smoothscale if smooth_scaling else pygame.transform.scale
+    if rects is None:
+        scale(screen, view_rect.size, display.subsurface(view_rect))
+        return None
+
+    scale_x, scale_y = present_scale()
+    canvas = screen.get_rect()
+    updated = []
+    for rect in rects:
+        rect = rect.clip(canvas)
+        if not rect.width or not rect.height:
+            continue
+        # Rounding outwards can reach a pixel past the view at its far edges
+        left, top = math.floor(rect.left * scale_x), math.floor(rect.top * scale_y)
+        target = pygame.Rect(view_rect.x + left, view_rect.y + top,
+                             math.ceil(rect.right * scale_x) - left, math.ceil(rect.bottom * scale_y) - top)
+        target = target.clip(view_rect)
+        scale(screen.subsurface(rect), target.size, display.subsurface(target))
+        updated.append(target)
+    return updated
+
+
+def set_track(points):
+    global track_points, track_version, track_lod, simulation
+    track_points = points
+    track_version += 1
+    track_lod = TrackLOD(points, cache_dir=default_cache_dir())
+    camera.set_bounds(points)
+    if simulation is None:
+        simulation = CoasterSimulation(Track(points), mass, initial_velocity, speed_factor, ground_y=HEIGHT,
+                                       tabulated=True)
+    else:
+        simulation.set_track(Track(points))
+    if park is not None:
+        build_park(len(park), park.cars)
+
+
+# Fill the track with `trains` trains of `cars` cars each, spread evenly along
+# it, with random masses and starting speeds that are the same every run
+def build_park(trains, cars=1, seed=0):
+    global park, park_previous_positions
+    rng = np.random.default_rng(seed)
+    track = simulation.track
+    park = CoasterTrain(track, rng.uniform(40, 120, trains) * cars, rng.uniform(6, 12, trains), cars=cars,
+                        spacing=CAR_SPACING, speed_factor=simulation.speed_factor, ground_y=HEIGHT,
+                        start_positions=np.arange(trains) * track.length / trains)
+    park_previous_positions = park.positions.copy()
+
+
+# Helper function to draw rounded rectangles
+def draw_rounded_rect(surface, color, rect, radius=10, shadow=False):
+    rect, radius = canvas_rect(rect), round(px(radius))
+    if shadow:
+        offset = round(px(3))
+        shadow_rect = pygame.Rect(rect.x + offset, rect.y + offset, rect.width, rect.height)
+        surface.blit(sprite_cache.get(("shadow", rect.width, rect.height, radius), render_shadow), shadow_rect)
+
+    pygame.draw.rect(surface, color, rect, border_radius=radius)
+
+
+# pygame.draw.rect for a layout rect
+def draw_rect(surface, color, rect, width=0, radius=0):
+    pygame.draw.rect(surface, color, canvas_rect(rect), line_width(width) if width else 0,
+                     border_radius=round(px(radius)))
+
+
+def render_shadow(key):
+    _, width, height, radius = key
+    shadow_surf = pygame.Surface((width, height), pygame.SRCALPHA)
+    pygame.draw.rect(shadow_surf, UI_SHADOW, (0, 0, width, height), border_radius=radius)
+    return shadow_surf
+
+
+# Bounded LRU cache of rendered text surfaces
+class TextCache:
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        # Last rendered value per readout field, kept out of the LRU so that
+        # constantly changing numbers do not evict the static labels
+        self.fields = {}
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, text, font_obj, color, antialias=True):
+        key = (text, font_obj, tuple(color), antialias)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = font_obj.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def render_field(self, field, text, font_obj, color, antialias=True):
+        key = (text, font_obj, tuple(color), antialias)
+        cached = self.fields.get(field)
+        if cached is not None and cached[0] == key:
+            self.hits += 1
+            return cached[1]
+
+        self.misses += 1
+        surface = font_obj.render(text, antialias, color)
+        self.fields[field] = (key, surface)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+        self.fields.clear()
+
+    def stats(self):
+        return {"size": len(self.surfaces), "max_size": self.max_size, "fields": len(self.fields),
+                "hits": self.hits, "misses": self.misses}
+
+
+text_cache = TextCache()
+
+
+# Bounded LRU cache of pre-rendered surfaces: widget sprites keyed by
+# (widget, visual state) and drop shadows keyed by size. render(key) builds a
+# surface on a miss.
+class SpriteCache:
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, render):
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = render(key)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+    def stats(self):
+        return {"size": len(self.surfaces), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+sprite_cache = SpriteCache()
+
+
+# Widgets draw themselves once per visual state into a transparent sprite the
+# size of bounds(), then blit that sprite every frame until the state changes.
+# Subclasses provide visual_state(), bounds() and render(sprite, rect, state),
+# where rect is the widget rect relative to the sprite, in layout units.
+class CachedWidget:
+    drawn_state = None
+    changed = True
+
+    def update(self):
+        pass
+
+    # Whether update() will still change the widget's looks without new input
+    def animating(self):
+        return False
+
+    def draw(self, surface):
+        self.update()
+        state = self.visual_state()
+        self.changed = state != self.drawn_state
+        self.drawn_state = state
+
+        origin = self.bounds()
+        surface.blit(sprite_cache.get((self, state), self.render_sprite), canvas_rect(origin))
+
+    def render_sprite(self, key):
+        _, state = key
+        origin = self.bounds()
+        sprite = pygame.Surface(canvas_rect(origin).size, pygame.SRCALPHA)
+        self.render(sprite, self.rect.move(-origin.x, -origin.y), state)
+        return sprite
+
+
+# Collects the screen regions that changed this frame so that only those are
+# pushed to the display. When disabled, or after a full invalidation, the whole
+# frame is flipped as usual.
+class DirtyRegions:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.rects = []
+        self.full_redraw = True
+
+    # A layout rect
+    def add(self, rect):
+        if self.enabled:
+            # Leave room for shadows and antialiased edges
+            margin = math.ceil(px(3)) * 2
+            self.rects.append(canvas_rect(rect).inflate(margin, margin))
+
+    # A rect already in canvas pixels
+    def add_canvas(self, rect):
+        if self.enabled:
+            self.rects.append(pygame.Rect(rect).inflate(6, 6))
+
+    def add_widgets(self, *widgets):
+        for widget in widgets:
+            if widget.changed:
+                self.add(widget.bounds())
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def present(self):
+        if not self.enabled or self.full_redraw:
+            present_canvas()
+            pygame.display.flip()
+        elif self.rects:
+            pygame.display.update(present_canvas(self.rects))
+        self.rects = []
+        self.full_redraw = False
+
+
+dirty_regions = DirtyRegions()
+
+# Event types the main loop handles; everything else is kept out of the queue.
+# TEXTINPUT stays, since pygame fills in KEYDOWN's unicode from it.
+HANDLED_EVENTS = [pygame.QUIT, pygame.KEYDOWN, pygame.TEXTINPUT, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP,
+                  pygame.MOUSEMOTION, pygame.MOUSEWHEEL, pygame.WINDOWEXPOSED]
+POINTER_EVENTS = (pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEMOTION)
+
+
+# Routes input to the widgets of one screen. Pointer events go to the widgets
+# whose rect is under the pointer, found through a coarse grid of hit regions,
+# and to the ones already engaged (hovered, pressed, dragging or focused),
+# which have to see the pointer leave or the button come up elsewhere. Keys
+# and the mouse wheel only go to engaged widgets. A widget that is neither
+# under the pointer nor engaged would ignore the event anyway.
+class EventDispatcher:
+    def __init__(self, widgets, cell_size=64):
+        self.widgets = list(widgets)
+        self.cell_size = cell_size
+        self.cells = {}
+        for widget in widgets:
+            rect = widget.rect
+            for cell_x in range(rect.left // cell_size, (rect.right - 1) // cell_size + 1):
+                for cell_y in range(rect.top // cell_size, (rect.bottom - 1) // cell_size + 1):
+                    self.cells.setdefault((cell_x, cell_y), []).append(widget)
+        self.engaged = [widget for widget in widgets if widget.engaged()]
+
+    def widgets_at(self, pos):
+        cell = (pos[0] // self.cell_size, pos[1] // self.cell_size)
+        return [widget for widget in self.cells.get(cell, ()) if widget.rect.collidepoint(pos)]
+
+    # Widgets whose handle_event returned True for this event
+    def dispatch(self, event):
+        if event.type in POINTER_EVENTS:
+            targets = self.engaged + [widget for widget in self.widgets_at(event.pos) if widget not in self.engaged]
+        elif event.type in (pygame.KEYDOWN, pygame.MOUSEWHEEL):
+            targets = self.engaged
+        else:
+            return []
+
+        activated = [widget for widget in targets if widget.handle_event(event)]
+        self.engaged = [widget for widget in targets if widget.engaged()]
+        return activated
+
+
+# Collapse each run of consecutive MOUSEMOTION events into one at the final
+# position, moved by the whole run; a fast mouse queues dozens per frame and
+# only where it ended up matters
+def coalesce_motion(events):
+    merged = []
+    for event in events:
+        if event.type == pygame.MOUSEMOTION and merged and merged[-1].type == pygame.MOUSEMOTION:
+            rel = merged[-1].dict.get("rel", (0, 0))
+            moved = event.dict.get("rel", (0, 0))
+            merged[-1] = pygame.event.Event(pygame.MOUSEMOTION, event.dict, rel=(rel[0] + moved[0], rel[1] + moved[1]))
+        else:
+            merged.append(event)
+    return merged
+
+
+# Pointer events come in window pixels; the widgets and everything else work
+# in layout units
+def to_layout(event):
+    if event.type not in POINTER_EVENTS or view_rect == (0, 0, WIDTH, HEIGHT):
+        return event
+    scale_x, scale_y = window_scale()
+    attributes = dict(event.dict, pos=window_to_layout(event.pos))
+    if "rel" in attributes:
+        attributes["rel"] = (round(event.rel[0] / scale_x), round(event.rel[1] / scale_y))
+    return pygame.event.Event(event.type, attributes)
+
+
+# Per-phase frame timings; the overlay is toggled with F3
+PROFILE_PHASES = ("events", "background", "physics", "cart", "energy_panel", "widgets", "graph", "overlay", "present",
+                  "export")
+profiler = FrameProfiler(PROFILE_PHASES)
+
+
+# Input validation and formatting
+def validate_float_input(text, min_val=0.1, max_val=1000):
+    try:
+        value = float(text)
+        return max(min_val, min(max_val, value))
+    except:
+        return None
+
+
+# Enhanced UI elements with modern design
+class ModernInputBox(CachedWidget):
+    def __init__(self, x, y, w, h, label, initial_value, min_val=0.1, max_val=1000, unit=""):
+        self.rect = pygame.Rect(x, y, w, h)
+        self.label = label
+        self.text = str(initial_value)
+        self.active = False
+        self.min_val = min_val
+        self.max_val = max_val
+        self.unit = unit
+        self.hover = False
+        self.focus_animation = 0
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            was_active = self.active
+            self.active = self.rect.collidepoint(event.pos)
+            if self.active and not was_active:
+                self.focus_animation = 0
+
+        if event.type == pygame.MOUSEMOTION:
+            self.hover = self.rect.collidepoint(event.pos)
+
+        if event.type == pygame.KEYDOWN and self.active:
+            if event.key == pygame.K_RETURN or event.key == pygame.K_TAB:
+                value = validate_float_input(self.text, self.min_val, self.max_val)
+                if value is not None:
+                    self.text = f"{value:.1f}"
+                self.active = False
+                return True
+            elif event.key == pygame.K_BACKSPACE:
+                self.text = self.text[:-1]
+            else:
+                if event.unicode.replace('.', '').replace('-', '').isdigit() or event.unicode == '.':
+                    if len(self.text) < 8:
+                        self.text += event.unicode
+        return False
+
+    def engaged(self):
+        return self.active or self.hover
+
+    def animating(self):
+        return self.focus_animation != (10 if self.active else 0)
+
+    def update(self):
+        if self.active and self.focus_animation < 10:
+            self.focus_animation += 1
+        elif not self.active and self.focus_animation > 0:
+            self.focus_animation -= 1
+
+    def visual_state(self):
+        cursor_visible = self.active and pygame.time.get_ticks() % 1000 < 500
+        return self.active, self.hover, self.focus_animation, self.text, cursor_visible
+
+    def bounds(self):
+        # Includes the focus ring, the shadow and the label above the box
+        return pygame.Rect(self.rect.x - 2, self.rect.y - 22, self.rect.width + 5, self.rect.height + 25)
+
+    def render(self, surface, rect, state):
+        active, hover, focus_animation, text, cursor_visible = state
+
+        # Draw shadow
+        draw_rounded_rect(surface, UI_CARD, rect, 8, shadow=True)
+
+        # Draw main input box
+        border_color = UI_PRIMARY if active else (LIGHT_GRAY if hover else GRAY)
+        draw_rounded_rect(surface, UI_CARD, rect, 8)
+        draw_rect(surface, border_color, rect, 2, 8)
+
+        # Animated focus indicator
+        if focus_animation > 0:
+            focus_intensity = focus_animation / 10.0
+            focus_color = (*UI_PRIMARY, int(50 * focus_intensity))
+            focus_rect = canvas_rect(rect.inflate(4, 4))
+            focus_surf = pygame.Surface(focus_rect.size, pygame.SRCALPHA)
+            pygame.draw.rect(focus_surf, focus_color, focus_surf.get_rect(), border_radius=round(px(10)))
+            surface.blit(focus_surf, focus_rect)
+
+        # Draw label
+        label_color = UI_PRIMARY if active else UI_TEXT_SECONDARY
+        label_surf = text_cache.render(self.label, small_font, label_color)
+        surface.blit(label_surf, to_canvas((rect.x, rect.y - 22)))
+
+        # Draw text with unit
+        display_text = f"{text} {self.unit}".strip()
+        text_color = UI_TEXT_PRIMARY if text else UI_TEXT_SECONDARY
+        text_surf = text_cache.render(display_text, font, text_color)
+        text_rect = text_surf.get_rect(center=to_canvas(rect.center))
+        surface.blit(text_surf, text_rect)
+
+        # Draw cursor if active
+        if cursor_visible:
+            cursor_x = text_rect.right - len(self.unit) * px(8) if self.unit else text_rect.right
+            pygame.draw.line(surface, UI_PRIMARY,
+                             (cursor_x + px(2), px(rect.centery - 8)),
+                             (cursor_x + px(2), px(rect.centery + 8)), line_width(2))
+
+    def get_value(self):
+        value = validate_float_input(self.text, self.min_val, self.max_val)
+        return value if value is not None else float(self.text) if self.text else 0.1
+
+
+class ModernSlider(CachedWidget):
+    def __init__(self, x, y, w, h, min_val, max_val, initial_val, label, format_string="{:.3f}"):
+        self.rect = pygame.Rect(x, y, w, h)
+        self.min_val = min_val
+        self.max_val = max_val
+        self.val = initial_val
+        self.label = label
+        self.dragging = False
+        self.hover = False
+        self.format_string = format_string
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.rect.collidepoint(event.pos):
+                self.dragging = True
+                self.update_value(event.pos[0])
+        elif event.type == pygame.MOUSEBUTTONUP:
+            self.dragging = False
+        elif event.type == pygame.MOUSEMOTION:
+            self.hover = self.rect.collidepoint(event.pos)
+            if self.dragging:
+                self.update_value(event.pos[0])
+
+    def engaged(self):
+        return self.dragging or self.hover
+
+    def update_value(self, mouse_x):
+        relative_x = mouse_x - self.rect.x
+        relative_x = max(0, min(self.rect.width, relative_x))
+        self.val = self.min_val + (relative_x / self.rect.width) * (self.max_val - self.min_val)
+
+    def visual_state(self):
+        # Everything the sprite depends on, at the resolution it is drawn at
+        fraction = (self.val - self.min_val) / (self.max_val - self.min_val)
+        label_text = f"{self.label}: {self.format_string.format(self.val)}"
+        return label_text, int(fraction * self.rect.width), self.hover or self.dragging
+
+    def bounds(self):
+        # Includes the label above the track and the enlarged handle at either end
+        return pygame.Rect(self.rect.x - 12, self.rect.y - 22, self.rect.width + 24, self.rect.height + 36)
+
+    def render(self, surface, rect, state):
+        label_text, filled_width, highlighted = state
+
+        # Draw label with value
+        label_surf = text_cache.render_field(self, label_text, small_font, UI_TEXT_PRIMARY)
+        surface.blit(label_surf, to_canvas((rect.x, rect.y - 22)))
+
+        # Shadows are drawn solid, as they always were on the (alpha-less) display
+        shadow_color = UI_SHADOW[:3]
+
+        # Draw track shadow
+        track_shadow = pygame.Rect(rect.x + 2, rect.y + 2, rect.width, rect.height)
+        draw_rounded_rect(surface, shadow_color, track_shadow, rect.height // 2)
+
+        # Draw slider track
+        draw_rounded_rect(surface, LIGHT_GRAY, rect, rect.height // 2)
+
+        # Draw active track (filled portion)
+        if filled_width > 0:
+            filled_rect = pygame.Rect(rect.x, rect.y, filled_width, rect.height)
+            draw_rounded_rect(surface, UI_PRIMARY, filled_rect, rect.height // 2)
+
+        # Draw slider handle
+        handle_x = rect.x + filled_width
+        handle_size = 20 if highlighted else 16
+        handle_rect = pygame.Rect(handle_x - handle_size // 2, rect.centery - handle_size // 2, handle_size,
+                                  handle_size)
+
+        # Handle shadow
+        shadow_rect = pygame.Rect(handle_rect.x + 2, handle_rect.y + 2, handle_rect.width, handle_rect.height)
+        draw_rounded_rect(surface, shadow_color, shadow_rect, handle_size // 2)
+
+        # Handle
+        draw_rounded_rect(surface, WHITE, handle_rect, handle_size // 2)
+        draw_rect(surface, UI_PRIMARY, handle_rect, 2, handle_size // 2)
+
+
+# Scrubs the cart through the current lap. Only the tabulated motion can be
+# sought, so the slider ignores input while it isn't shown.
+class TimelineSlider(ModernSlider):
+    def handle_event(self, event):
+        if timeline_enabled():
+            super().handle_event(event)
+
+
+def timeline_enabled():
+    return replay is None and simulation.seekable and len(track_points) > 1
+
+
+class ModernButton(CachedWidget):
+    def __init__(self, x, y, w, h, text, style="primary", icon=""):
+        self.rect = pygame.Rect(x, y, w, h)
+        self.text = text
+        self.icon = icon
+        self.hover = False
+        self.pressed = False
+        self.style = style
+        self.hover_scale = 1.0
+
+        # Style colors
+        self.colors = {
+            "primary": {"bg": UI_PRIMARY, "text": WHITE, "hover": (44, 103, 235)},
+            "success": {"bg": UI_SUCCESS, "text": WHITE, "hover": (56, 155, 60)},
+            "warning": {"bg": UI_WARNING, "text": WHITE, "hover": (235, 132, 0)},
+            "danger": {"bg": UI_ERROR, "text": WHITE, "hover": (224, 47, 34)},
+            "secondary": {"bg": LIGHT_GRAY, "text": UI_TEXT_PRIMARY, "hover": GRAY},
+            "accent": {"bg": UI_ACCENT, "text": WHITE, "hover": (136, 19, 156)}
+        }
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            if self.rect.collidepoint(event.pos):
+                self.pressed = True
+        elif event.type == pygame.MOUSEBUTTONUP:
+            if self.pressed and self.rect.collidepoint(event.pos):
+                self.pressed = False
+                return True
+            self.pressed = False
+        elif event.type == pygame.MOUSEMOTION:
+            self.hover = self.rect.collidepoint(event.pos)
+        return False
+
+    def engaged(self):
+        return self.pressed or self.hover
+
+    def target_scale(self):
+        return 1.05 if self.hover else 1.0
+
+    def animating(self):
+        return self.hover_scale != self.target_scale()
+
+    def update(self):
+        target_scale = self.target_scale()
+        self.hover_scale += (target_scale - self.hover_scale) * 0.2
+        # Settle once what's left would take seconds to creep through
+        if abs(target_scale - self.hover_scale) < 0.001:
+            self.hover_scale = target_scale
+
+    def scale_offset(self):
+        return int((self.rect.width * (self.hover_scale - 1)) / 2)
+
+    def visual_state(self):
+        # The hover animation only shows in whole pixels of growth
+        return self.hover, self.scale_offset(), self.style, self.text, self.icon
+
+    def bounds(self):
+        # Largest hover-scaled rect plus its shadow
+        grow = int(self.rect.width * 0.05) + 2
+        return self.rect.inflate(grow * 2 + 3, grow * 2 + 3)
+
+    def render(self, surface, rect, state):
+        hover, scale_offset, style, text, icon = state
+
+        # Calculate scaled rect
+        scaled_rect = pygame.Rect(
+            rect.x - scale_offset,
+            rect.y - scale_offset,
+            rect.width + scale_offset * 2,
+            rect.height + scale_offset * 2
+        )
+
+        # Draw shadow
+        draw_rounded_rect(surface, UI_CARD, scaled_rect, 8, shadow=True)
+
+        # Choose colors based on state and style
+        color_set = self.colors.get(style, self.colors["primary"])
+        bg_color = color_set["hover"] if hover else color_set["bg"]
+        text_color = color_set["text"]
+
+        # Draw button
+        draw_rounded_rect(surface, bg_color, scaled_rect, 8)
+
+        # Draw text with icon
+        display_text = f"{icon} {text}".strip()
+        text_surf = text_cache.render(display_text, font, text_color)
+        text_rect = text_surf.get_rect(center=to_canvas(scaled_rect.center))
+        surface.blit(text_surf, text_rect)
+
+    def is_clicked(self, pos):
+        return self.rect.collidepoint(pos)
+
+
+# UI elements, created the first time their screen is needed
+mass_input = velocity_input = speed_slider = timeline_slider = None
+start_btn = pause_btn = reset_btn = menu_btn = vectors_btn = grid_btn = None
+menu_start_btn = menu_explain_btn = menu_exit_btn = None
+
+
+def build_simulation_widgets():
+    global mass_input, velocity_input, speed_slider, timeline_slider
+    global start_btn, pause_btn, reset_btn, menu_btn, vectors_btn, grid_btn
+    # Create modern UI elements
+    mass_input = ModernInputBox(920, 80, 140, 40, "Mass", mass, 1, 200, "kg")
+    velocity_input = ModernInputBox(920, 150, 140, 40, "Initial Velocity", initial_velocity, 0.1, 20, "m/s")
+    speed_slider = ModernSlider(50, 550, 350, 20, 0.005, 0.1, speed_factor, "Animation Speed")
+    timeline_slider = TimelineSlider(440, 550, 280, 20, 0.0, 1.0, 0.0, "Lap Time", "{:.1f} s")
+
+    # Create modern buttons
+    start_btn = ModernButton(750, 580, 80, 45, "Start", "success", "▶")
+    pause_btn = ModernButton(840, 580, 80, 45, "Pause", "warning", "⏸")
+    reset_btn = ModernButton(930, 580, 80, 45, "Reset", "danger", "🔄")
+    menu_btn = ModernButton(1020, 580, 100, 45, "Menu", "secondary", "📋")
+    vectors_btn = ModernButton(920, 240, 140, 35, "Vectors", "secondary", "🎯")
+    grid_btn = ModernButton(920, 285, 140, 35, "Grid", "secondary", "⚏")
+
+    # Widgets that take input; vectors_btn and grid_btn aren't drawn, so they don't
+    return [mass_input, velocity_input, speed_slider, timeline_slider, start_btn, pause_btn, reset_btn, menu_btn,
+            graph_view]
+
+
+def build_menu_widgets():
+    global menu_start_btn, menu_explain_btn, menu_exit_btn
+    # Menu buttons
+    menu_start_btn = ModernButton(WIDTH // 2 - 150, 250, 300, 60, "Start Simulation", "success", "🎢")
+    menu_explain_btn = ModernButton(WIDTH // 2 - 150, 330, 300, 60, "Physics Guide", "primary", "📚")
+    menu_exit_btn = ModernButton(WIDTH // 2 - 150, 410, 300, 60, "Exit", "danger", "❌")
+    return [menu_start_btn, menu_explain_btn, menu_exit_btn]
+
+
+# Widget builders by screen; each returns the widgets that take input
+SCREEN_BUILDERS = {"menu": build_menu_widgets, "simulation": build_simulation_widgets}
+# Input routing for every screen built so far
+dispatchers = {}
+
+
+def ensure_screen(screen_name):
+    if screen_name not in dispatchers:
+        builder = SCREEN_BUILDERS.get(screen_name)
+        dispatchers[screen_name] = EventDispatcher(builder() if builder is not None else [])
+
+
+def reset_simulation():
+    global paused
+    ensure_screen("simulation")
+    simulation.mass = mass_input.get_value()
+    simulation.reset(initial_velocity=velocity_input.get_value())
+    if replay is not None:
+        replay.rewind()
+    if park is not None:
+        park.reset()
+        park_previous_positions[:] = park.positions
+    paused = True
+
+    # Clear graph data
+    graph_data.clear()
+    graph_view.reset()
+
+
+# Graph data storage: the whole run, however long it gets
+graph_data = EnergyHistory()
+
+# Plot area of the energy graph, inside its card
+GRAPH_PLOT = pygame.Rect(55, 70, 290, 130)
+GRAPH_MIN_SPAN = 16  # Fewest samples the graph zooms in to
+
+
+# What the energy graph shows: the `span` samples ending at sample `end`, or
+# ending at the newest sample while `end` is None. The mouse wheel over the
+# graph zooms in or out about the pointer and dragging pans; panning up to
+# the newest sample follows the run again.
+class EnergyGraphView:
+    def __init__(self, rect, span):
+        self.rect = pygame.Rect(rect)
+        self.default_span = self.span = span
+        self.end = None
+        self.drag_x = None
+        self.pointer_x = self.rect.right
+        self.hover = False
+
+    def engaged(self):
+        return self.hover or self.drag_x is not None
+
+    def animating(self):
+        return False
+
+    def reset(self):
+        self.span = self.default_span
+        self.end = None
+
+    def window(self):
+        count = len(graph_data)
+        end = count if self.end is None else min(int(self.end), count)
+        return max(0, end - self.span), end
+
+    def move_to(self, end):
+        count = len(graph_data)
+        self.end = None if end >= count else max(end, min(self.span, count))
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEMOTION:
+            self.hover = self.rect.collidepoint(event.pos)
+            self.pointer_x = event.pos[0]
+            if self.drag_x is not None:
+                _, end = self.window()
+                self.move_to(end - (event.pos[0] - self.drag_x) * self.span / self.rect.width)
+                self.drag_x = event.pos[0]
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            if self.rect.collidepoint(event.pos):
+                self.drag_x = event.pos[0]
+        elif event.type == pygame.MOUSEBUTTONUP:
+            self.drag_x = None
+        elif event.type == pygame.MOUSEWHEEL and self.hover:
+            # Keep the sample under the pointer where it is
+            start, _ = self.window()
+            fraction = (self.pointer_x - self.rect.left) / self.rect.width
+            anchor = start + fraction * self.span
+            self.span = int(min(max(self.span / ZOOM_STEP ** event.y, GRAPH_MIN_SPAN),
+                                max(len(graph_data), self.default_span)))
+            self.move_to(anchor + (1 - fraction) * self.span)
+            return True
+        return False
+
+
+graph_view = EnergyGraphView(GRAPH_PLOT, GRAPH_PLOT.width)
+
+# States
+current_state = "menu"  # "menu", "simulation", "explanation"
+
+
+# Background gradients per screen: (top color, change in color from top to bottom)
+BACKGROUND_GRADIENTS = {
+    "menu": ((245, 245, 250), (10, 10, 5)),
+    "explanation": ((250, 250, 255), (5, 5, 0)),
+    "simulation": ((248, 250, 252), (7, 5, 3)),
+}
+
+# Composited static backgrounds, one per screen: {screen name: (cache key, surface)}
+background_cache = {}
+
+
+def draw_gradient(surface, top_color, color_delta):
+    width, height = surface.get_size()
+    for y in range(height):
+        color_factor = y / height
+        color = tuple(int(c + color_factor * d) for c, d in zip(top_color, color_delta))
+        pygame.draw.line(surface, color, (0, y), (width, y))
+
+
+def draw_grid(surface):
+    if not show_grid:
+        return
+
+    width, height = surface.get_size()
+
+    # Softer grid lines, every 50 layout units
+    for x in range(0, WIDTH, 50):
+        pygame.draw.line(surface, (240, 240, 240), (px(x), 0), (px(x), height), 1)
+
+    for y in range(0, HEIGHT, 50):
+        pygame.draw.line(surface, (240, 240, 240), (0, px(y)), (width, px(y)), 1)
+
+
+# Zoom limits, and how far past the ends of the track the view may scroll
+MIN_ZOOM, MAX_ZOOM = 1 / 1024, 8.0
+CAMERA_MARGIN = 50
+ZOOM_STEP = 1.25  # Per mouse wheel notch or +/- key press
+
+# Most a simplified track may stray from the real one, in screen pixels
+LOD_TOLERANCE = 0.5
+
+
+# Maps track coordinates to the screen. While the whole track fits in the
+# window at zoom 1 the view stays put, as it always has; a longer track
+# scrolls to keep the cart in the middle, and zooming in follows the cart
+# vertically too.
+class Camera:
+    def __init__(self):
+        self.x = self.y = 0.0
+        self.zoom = 1.0
+        self.bounds = (0.0, 0.0, WIDTH, HEIGHT)
+
+    def set_bounds(self, points):
+        points = np.asarray(points, dtype=float)
+        (left, top), (right, bottom) = points.min(axis=0), points.max(axis=0)
+        self.bounds = (left, top, right, bottom)
+
+    def zoom_by(self, factor):
+        self.zoom = min(max(self.zoom * factor, MIN_ZOOM), MAX_ZOOM)
+
+    def follow(self, x, y):
+        left, top, right, bottom = self.bounds
+        if self.zoom == 1 and left >= 0 and right <= WIDTH:
+            self.x = self.y = 0.0
+            return
+
+        view_width, view_height = WIDTH / self.zoom, HEIGHT / self.zoom
+        low, high = left - CAMERA_MARGIN, right + CAMERA_MARGIN - view_width
+        if low > high:
+            # The whole track is in view: keep it centred
+            self.x = (left + right - view_width) / 2
+        else:
+            self.x = min(max(x - view_width / 2, low), high)
+        if self.zoom > 1:
+            self.y = y - view_height / 2
+        else:
+            self.y = (HEIGHT - view_height) / 2
+
+    # Top-left corner of the view in whole screen pixels, so the cached
+    # background and everything drawn over it line up exactly
+    def origin(self):
+        return round(self.x * self.zoom), round(self.y * self.zoom)
+
+    def key(self):
+        return self.origin() + (self.zoom,)
+
+    def to_screen(self, x, y):
+        origin_x, origin_y = self.origin()
+        return x * self.zoom - origin_x, y * self.zoom - origin_y
+
+    # Visible part of the track, in track coordinates
+    def view(self, margin=0):
+        origin_x, origin_y = self.origin()
+        return ((origin_x - margin) / self.zoom, (origin_y - margin) / self.zoom,
+                (origin_x + WIDTH + margin) / self.zoom, (origin_y + HEIGHT + margin) / self.zoom)
+
+
+camera = Camera()
+
+
+# Returns the canvas area drawn on, including the line width and shadow
+def draw_track(surface):
+    if len(track_points) < 2:
+        return pygame.Rect(0, 0, 0, 0)
+
+    # Only the chunks of the track in view, simplified to about a canvas
+    # pixel, so the cost stays the same however long the track is; the margin
+    # covers the line width and the shadow offset
+    level = track_lod.level_for(LOD_TOLERANCE / (camera.zoom * ui_scale))
+    origin = np.array(camera.origin())
+    areas = []
+    for piece in track_lod.visible(level, *camera.view(margin=10)):
+        points = (piece * camera.zoom - origin) * ui_scale
+        # Track shadow
+        pygame.draw.lines(surface, (180, 180, 180), False, (points + px(3)).tolist(), line_width(10))
+        # Main track
+        pygame.draw.lines(surface, (60, 60, 60), False, points.tolist(), line_width(8))
+        # Track highlights
+        pygame.draw.lines(surface, (120, 120, 120), False, points.tolist(), line_width(4))
+
+        (left, top), (right, bottom) = points.min(axis=0), points.max(axis=0)
+        areas.append(pygame.Rect(math.floor(left), math.floor(top),
+                                 math.ceil(right - left) + 1, math.ceil(bottom - top) + 1))
+    if not areas:
+        return pygame.Rect(0, 0, 0, 0)
+
+    # The shadow is offset down and right of the lines
+    margin = line_width(10)
+    area = areas[0].unionall(areas[1:]).inflate(margin * 2, margin * 2)
+    area.size = (area.width + math.ceil(px(3)), area.height + math.ceil(px(3)))
+    return area
+
+
+def get_background(screen_name):
+    # The simulation background is the gradient and grid, which only change
+    # with the grid setting, with the part of the track in view drawn on top;
+    # that has to be redrawn whenever the track or the camera changes.
+    size = screen.get_size()
+    if screen_name == "simulation":
+        key = (size, show_grid, track_version, camera.key())
+    else:
+        key = (size,)
+
+    cached = background_cache.get(screen_name)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    track_area = None
+    if screen_name == "simulation":
+        base_key = (size, show_grid)
+        base = background_cache.get("simulation_base")
+        if base is None or base[0] != base_key:
+            base = (base_key, pygame.Surface(size).convert())
+            draw_gradient(base[1], *BACKGROUND_GRADIENTS[screen_name])
+            draw_grid(base[1])
+            background_cache["simulation_base"] = base
+        background = cached[1] if cached is not None and cached[1].get_size() == size else base[1].copy()
+        background.blit(base[1], (0, 0))
+        track_area = draw_track(background)
+    else:
+        background = pygame.Surface(size).convert()
+        draw_gradient(background, *BACKGROUND_GRADIENTS[screen_name])
+
+    # When only the camera moved, only the track's old and new pixels
+    # changed; anything else repaints the whole background
+    if track_area is not None and cached is not None and cached[0][:-1] == key[:-1]:
+        for area in (cached[2], track_area):
+            if area:
+                dirty_regions.add_canvas(area)
+    else:
+        dirty_regions.invalidate()
+    background_cache[screen_name] = (key, background, track_area)
+    return background
+
+
+def draw_text(text, x, y, color=UI_TEXT_PRIMARY, font_obj=None, center=False):
+    surface = text_cache.render(text, font_obj or font, color)
+    if center:
+        rect = surface.get_rect(center=to_canvas((x, y)))
+        screen.blit(surface, rect)
+    else:
+        screen.blit(surface, to_canvas((x, y)))
+
+
+# Draw a "label value" readout: the static label comes from the LRU cache and
+# only the value part is re-rendered, and only when it changes
+def draw_readout(label, value, x, y, color=UI_TEXT_PRIMARY, font_obj=None):
+    font_obj = font_obj or font
+    x, y = to_canvas((x, y))
+    label_surf = text_cache.render(label, font_obj, color)
+    screen.blit(label_surf, (x, y))
+    value_surf = text_cache.render_field(label, value, font_obj, color)
+    screen.blit(value_surf, (x + label_surf.get_width(), y))
+
+
+def show_menu():
+    ensure_screen("menu")
+
+    # Gradient background
+    screen.blit(get_background("menu"), (0, 0))
+    profiler.mark("background")
+
+    # Main title card
+    title_card = pygame.Rect(WIDTH // 2 - 300, 80, 600, 120)
+    draw_rounded_rect(screen, UI_CARD, title_card, 15, shadow=True)
+
+    # Title
+    draw_text("🎢 Roller Coaster Physics", WIDTH // 2, 130, UI_PRIMARY, large_font, True)
+    draw_text("Interactive Energy Conservation Simulator", WIDTH // 2, 160, UI_TEXT_SECONDARY, font, True)
+
+    # Menu buttons
+    menu_start_btn.draw(screen)
+    menu_explain_btn.draw(screen)
+    menu_exit_btn.draw(screen)
+    dirty_regions.add_widgets(menu_start_btn, menu_explain_btn, menu_exit_btn)
+
+    # Feature highlights
+    features = [
+        "🔴 Real-time Kinetic Energy tracking",
+        "🔵 Potential Energy visualization",
+        "📊 Interactive energy graphs",
+        "🎯 Physics vector display"
+    ]
+
+    feature_y = 520
+    for i, feature in enumerate(features):
+        x_pos = WIDTH // 2 - 200 + (i % 2) * 200
+        y_pos = feature_y + (i // 2) * 25
+        draw_text(feature, x_pos, y_pos, UI_TEXT_SECONDARY, small_font)
+    profiler.mark("widgets")
+
+
+def show_explanation():
+    # Gradient background
+    screen.blit(get_background("explanation"), (0, 0))
+    profiler.mark("background")
+
+    # Main content card
+    content_card = pygame.Rect(50, 50, WIDTH - 100, HEIGHT - 120)
+    draw_rounded_rect(screen, UI_CARD, content_card, 15, shadow=True)
+
+    draw_text("📚 Physics Concepts Guide", WIDTH // 2, 80, UI_PRIMARY, title_font, True)
+
+    # Organized sections
+    sections = [
+        {
+            "title": "🔴 Kinetic Energy (KE)",
+            "formula": "KE = ½mv²",
+            "points": ["Energy of motion", "Increases with speed", "Higher when going downhill"]
+        },
+        {
+            "title": "🔵 Potential Energy (PE)",
+            "formula": "PE = mgh",
+            "points": ["Energy of position", "Increases with height", "Higher at peaks"]
+        },
+        {
+            "title": "🟢 Energy Conservation",
+            "formula": "Total Energy = KE + PE",
+            "points": ["Total energy stays constant", "Energy transforms between KE and PE",
+                       "No energy is lost or gained"]
+        }
+    ]
+
+    y_pos = 130
+    for section in sections:
+        # Section header
+        draw_text(section["title"], 80, y_pos, UI_TEXT_PRIMARY, font)
+        draw_text(section["formula"], 350, y_pos, UI_ACCENT, font)
+        y_pos += 30
+
+        # Section points
+        for point in section["points"]:
+            draw_text(f"• {point}", 100, y_pos, UI_TEXT_SECONDARY, small_font)
+            y_pos += 20
+        y_pos += 15
+
+    # Interactive tip
+    tip_rect = pygame.Rect(80, HEIGHT - 100, WIDTH - 160, 40)
+    draw_rounded_rect(screen, (230, 247, 255), tip_rect, 8)
+    draw_text("💡 Tip: Watch the real-time graph to see energy transformation!",
+              WIDTH // 2, tip_rect.centery, UI_PRIMARY, font, True)
+
+    # Return instruction
+    draw_text("Click anywhere to return to menu", WIDTH // 2, HEIGHT - 30, UI_TEXT_SECONDARY, small_font, True)
+    profiler.mark("widgets")
+
+
+# Area covered by the graph legend, drawn above the graph card
+GRAPH_LEGEND_RECT = pygame.Rect(55, 6, 150, 18)
+
+
+def draw_energy_graph():
+    # Modern card design
+    graph_card = pygame.Rect(30, 30, 340, 170)
+    draw_rounded_rect(screen, UI_CARD, graph_card, 12, shadow=True)
+    dirty_regions.add(graph_card)
+    dirty_regions.add(GRAPH_LEGEND_RECT)
+
+    # Header
+    draw_text("📊 Energy Analysis", 50, 40, UI_TEXT_PRIMARY, font)
+
+    graph_rect = pygame.Rect(50, 70, 300, 130)
+    draw_rect(screen, UI_SURFACE, graph_rect, radius=8)
+
+    if len(graph_data) < 2:
+        draw_text("Simulation data will appear here", graph_rect.centerx, graph_rect.centery,
+                  UI_TEXT_SECONDARY, small_font, True)
+        return
+
+    # Min and max of each series per pixel column of the part of the run in
+    # view, however many samples that is
+    start, end = graph_view.window()
+    width = max(1, round(GRAPH_PLOT.width * (end - start) / graph_view.span))
+    columns, mins, maxs = graph_data.columns(start, end, width)
+    if graph_view.end is not None or graph_view.span != graph_view.default_span:
+        draw_text(f"{start:,}-{end:,} of {len(graph_data):,}", 190, 44, UI_TEXT_SECONDARY, small_font)
+
+    # Max of the window for scaling
+    max_val = float(maxs.max()) if maxs.size else 0.0
+    if max_val <= 0 or len(columns) < 2:
+        return
+
+    scale_y = 120 / max_val
+    xs = GRAPH_PLOT.left + columns * (GRAPH_PLOT.width * (end - start) / graph_view.span / width)
+    tops = graph_rect.bottom - 10 - maxs * scale_y
+    bottoms = graph_rect.bottom - 10 - mins * scale_y
+    colors = (RED, BLUE, GREEN)
+
+    # Where several samples share a column, the band between their min and
+    # max is filled in a lighter shade first, so no series hides another: one
+    # thin line zig-zagging down and up through every column
+    if not np.array_equal(mins, maxs):
+        band_xs = np.repeat(xs, 2)
+        for index, color in enumerate(colors):
+            band_ys = np.column_stack((tops[index], bottoms[index]))
+            band_ys[1::2] = band_ys[1::2, ::-1]
+            band = np.column_stack((band_xs, band_ys.ravel()))
+            pygame.draw.lines(screen, tuple(c + (255 - c) * 3 // 5 for c in color), False,
+                              px(band).tolist(), line_width(2))
+
+    # One polyline per series along the max, and along the min where that differs
+    for index, color in enumerate(colors):
+        pygame.draw.lines(screen, color, False, px(np.column_stack((xs, tops[index]))).tolist(), line_width(3))
+        if not np.array_equal(mins[index], maxs[index]):
+            pygame.draw.lines(screen, color, False, px(np.column_stack((xs, bottoms[index]))).tolist(),
+                              line_width(3))
+
+    # Modern legend with colored boxes
+    legend_items = [("KE", RED), ("PE", BLUE), ("TE", GREEN)]
+    legend_x = 55
+    for label, color in legend_items:
+        draw_rect(screen, color, (legend_x, 10, 12, 12), radius=2)
+        draw_text(label, legend_x + 18, 6, UI_TEXT_PRIMARY, small_font)
+        legend_x += 50
+
+
+# Cart sprite: body in `color` with a `highlight`, an outline and a shadow
+def render_cart(key):
+    _, color, highlight = key
+    size, offset, inset = round(px(CART_SIZE)), round(px(3)), round(px(2))
+    sprite = pygame.Surface((size + offset, size + offset), pygame.SRCALPHA)
+    # Cart shadow; solid, as it has always come out on the screen
+    pygame.draw.ellipse(sprite, (100, 100, 100), (offset, offset, size, size))
+    # Main cart
+    pygame.draw.ellipse(sprite, color, (0, 0, size, size))
+    # Cart highlight
+    pygame.draw.ellipse(sprite, highlight, (inset, inset, size // 2, size // 3))
+    # Cart outline
+    pygame.draw.ellipse(sprite, BLACK, (0, 0, size, size), line_width(2))
+    return sprite
+
+
+# Every car of the park in view, in one batch of blits; returns the area they cover
+def draw_park():
+    # Between the last two physics states, like the simulated cart
+    alpha = physics_accumulator / PHYSICS_DT
+    previous, positions = park_previous_positions, park.positions
+    positions = np.where(previous <= positions, previous + (positions - previous) * alpha, positions)
+
+    # Sprite corners in canvas pixels
+    sprite = sprite_cache.get(("cart", UI_PRIMARY, (200, 215, 255)), render_cart)
+    sprite_width, sprite_height = sprite.get_size()
+    points = simulation.track.points_at_many(park.car_positions(positions)).reshape(-1, 2)
+    corners = (points * camera.zoom - camera.origin()) * ui_scale - round(px(CART_SIZE)) // 2
+    in_view = ((corners > (-sprite_width, -sprite_height)) & (corners < screen.get_size())).all(axis=1)
+    corners = corners[in_view]
+    if not len(corners):
+        return None
+
+    # Blits truncate float positions, so do the same here for the dirty area
+    corners = corners.astype(int)
+    screen.blits([(sprite, corner) for corner in corners.tolist()], doreturn=False)
+    (left, top), (right, bottom) = corners.min(axis=0), corners.max(axis=0)
+    return pygame.Rect(int(left), int(top), int(right - left) + sprite_width, int(bottom - top) + sprite_height)
+
+
+def draw_velocity_vectors(cart_x, cart_y, velocity):
+    if not show_vectors or velocity <= 0:
+        return None
+
+    # Direction from the track's precomputed unit tangent
+    dx, dy = simulation.tangent()
+
+    # Scale vector by velocity
+    vector_length = velocity * px(12)
+    end_x = cart_x + dx * vector_length
+    end_y = cart_y + dy * vector_length
+
+    # Enhanced vector with gradient
+    radius = round(px(6))
+    pygame.draw.line(screen, ORANGE, (cart_x, cart_y), (end_x, end_y), line_width(4))
+    pygame.draw.circle(screen, (255, 200, 0), (int(end_x), int(end_y)), radius)
+    pygame.draw.circle(screen, ORANGE, (int(end_x), int(end_y)), radius, line_width(2))
+
+    # Area covered by the arrow in canvas pixels, for dirty-rectangle updates
+    return pygame.Rect(min(cart_x, end_x), min(cart_y, end_y),
+                       abs(end_x - cart_x), abs(end_y - cart_y)).inflate(radius * 2 + 4, radius * 2 + 4)
+
+
+def show_simulation():
+    global last_cart_rect
+    ensure_screen("simulation")
+
+    # Update mass and speed from the controls; a replay plays back as recorded
+    if replay is None:
+        simulation.mass = mass_input.get_value()
+        simulation.speed_factor = speed_slider.val
+    if park is not None:
+        park.set_speed_factor(simulation.speed_factor)
+
+    # Advance the physics in fixed steps for the time that passed since last frame
+    update_physics()
+
+    # Dragging the timeline moves the cart; otherwise the timeline follows it
+    if timeline_enabled():
+        timeline_slider.max_val = simulation.current_timetable().lap_time
+        if timeline_slider.dragging:
+            simulation.seek_lap_time(timeline_slider.val)
+        else:
+            timeline_slider.val = simulation.lap_clock
+    profiler.mark("physics")
+
+    # Draw the cart between the last two physics states, with the view following it
+    if len(track_points) > 1:
+        cart_position = interpolated_cart_position()
+        camera.follow(*cart_position)
+
+    # Modern gradient background with the grid and track pre-rendered on top
+    screen.blit(get_background("simulation"), (0, 0))
+    profiler.mark("background")
+
+    # Get cart position and draw enhanced cart
+    if len(track_points) > 1:
+        # Calculate energies
+        KE, PE, TE = simulation.energies() if replay is None else replay.energies()
+
+        # The carts are drawn straight in canvas pixels
+        cart_x, cart_y = to_canvas(camera.to_screen(*cart_position))
+
+        # The rest of the park first, so the simulated cart stays on top
+        park_rect = draw_park() if park is not None else None
+
+        # Enhanced cart with modern styling, from a pre-rendered sprite
+        cart_size = round(px(CART_SIZE))
+        cart_sprite = sprite_cache.get(("cart", UI_ERROR, (255, 200, 200)), render_cart)
+        screen.blit(cart_sprite, (cart_x - cart_size // 2, cart_y - cart_size // 2))
+
+        # Draw velocity vectors
+        vector_rect = draw_velocity_vectors(cart_x, cart_y, simulation.velocity)
+
+        # The carts' old and new bounding boxes all need repainting
+        cart_rect = pygame.Rect((cart_x - cart_size // 2, cart_y - cart_size // 2), cart_sprite.get_size())
+        if vector_rect is not None:
+            cart_rect.union_ip(vector_rect)
+        if park_rect is not None:
+            cart_rect.union_ip(park_rect)
+        if last_cart_rect is not None:
+            dirty_regions.add_canvas(last_cart_rect)
+        dirty_regions.add_canvas(cart_rect)
+        last_cart_rect = cart_rect
+        profiler.mark("cart")
+
+        # Modern energy display panel
+        panel_rect = pygame.Rect(400, 20, 480, 140)
+        draw_rounded_rect(screen, UI_CARD, panel_rect, 12, shadow=True)
+        dirty_regions.add(panel_rect)
+
+        # Panel header
+        draw_text("📊 Real-Time Energy Analysis", 420, 40, UI_PRIMARY, font)
+
+        # Create a grid layout for data
+        draw_text(f"Mass: {simulation.mass:.1f} kg", 420, 70, UI_TEXT_PRIMARY, font)
+        draw_readout("Velocity: ", f"{simulation.velocity:.2f} m/s", 420, 95, UI_TEXT_PRIMARY, font)
+
+        # Energy values with color coding
+        draw_readout("🔴 Kinetic Energy: ", f"{KE:.1f} J", 620, 70, RED, font)
+        draw_readout("🔵 Potential Energy: ", f"{PE:.1f} J", 620, 95, BLUE, font)
+        draw_readout("🟢 Total Energy: ", f"{TE:.1f} J", 420, 120, GREEN, font)
+        conservation_pct = simulation.conservation() if replay is None else replay.conservation()
+        conservation_color = UI_SUCCESS if conservation_pct > 98 else UI_WARNING
+        draw_readout("⚖️ Conservation: ", f"{conservation_pct:.1f}%", 620, 120, conservation_color, font)
+        profiler.mark("energy_panel")
+
+    # Right panel for controls
+    control_panel = pygame.Rect(900, 10, 280, 270)
+    draw_rounded_rect(screen, UI_CARD, control_panel, 12, shadow=True)
+
+    # Panel header
+    draw_text("🎛️ Simulation Controls", 920, 30, UI_PRIMARY, font)
+
+    # UI Elements with better spacing
+    mass_input.draw(screen)
+    velocity_input.draw(screen)
+    # vectors_btn.draw(screen)
+    # grid_btn.draw(screen)
+
+    # Status indicator with modern design
+    status_card = pygame.Rect(920, 210, 140, 60)
+    status_color = UI_SUCCESS if not paused else UI_WARNING
+    draw_rounded_rect(screen, status_color, status_card, 8)
+
+    status_icon = "🟢" if not paused else "🟡"
+    status_text = "RUNNING" if not paused else "PAUSED"
+    draw_text(status_icon, status_card.centerx, status_card.centery - 8, WHITE, font, True)
+    draw_text(status_text, status_card.centerx, status_card.centery + 8, WHITE, small_font, True)
+    dirty_regions.add(status_card)
+
+    # Bottom control bar
+    control_bar = pygame.Rect(0, HEIGHT - 70, WIDTH, 70)
+    draw_rounded_rect(screen, UI_CARD, control_bar, 0, shadow=True)
+
+    # Control buttons
+    start_btn.draw(screen)
+    pause_btn.draw(screen)
+    reset_btn.draw(screen)
+    menu_btn.draw(screen)
+
+    # Speed slider
+    speed_slider.draw(screen)
+    if timeline_enabled():
+        timeline_slider.draw(screen)
+        dirty_regions.add_widgets(timeline_slider)
+
+    dirty_regions.add_widgets(mass_input, velocity_input, start_btn, pause_btn, reset_btn, menu_btn, speed_slider)
+    profiler.mark("widgets")
+
+    # Graph
+    draw_energy_graph()
+    profiler.mark("graph")
+
+
+# Cap on catch-up steps per frame, so a long stall slows the simulation down
+# instead of freezing the window while physics catches up
+MAX_PHYSICS_STEPS = 8
+
+physics_accumulator = 0.0
+last_physics_time = None
+
+# Source of time for the physics; event playback swaps in a fixed clock
+physics_clock = time.perf_counter
+
+
+def update_physics():
+    global physics_accumulator, last_physics_time
+    now = physics_clock()
+    elapsed = 0.0 if last_physics_time is None else now - last_physics_time
+    last_physics_time = now
+
+    if paused or len(track_points) < 2 or any([mass_input.active, velocity_input.active]):
+        physics_accumulator = 0.0
+        simulation.previous_position = simulation.position
+        if park is not None:
+            park_previous_positions[:] = park.positions
+        return
+
+    physics_accumulator += elapsed
+    steps = 0
+    while physics_accumulator >= PHYSICS_DT and steps < MAX_PHYSICS_STEPS:
+        step_physics()
+        physics_accumulator -= PHYSICS_DT
+        steps += 1
+
+    if steps == MAX_PHYSICS_STEPS:
+        physics_accumulator = min(physics_accumulator, PHYSICS_DT)
+
+
+def interpolated_cart_position():
+    # Blend between the previous and current physics state by how far we are
+    # into the next step; a lap wrap-around is drawn at the new position
+    alpha = physics_accumulator / PHYSICS_DT
+    previous, pos = simulation.previous_position, simulation.position
+    if previous <= pos:
+        pos = previous + (pos - previous) * alpha
+    return simulation.point(pos)
+
+
+def step_physics():
+    if park is not None:
+        park_previous_positions[:] = park.positions
+        park.advance()
+
+    old_segment = simulation.segment
+    if replay is not None:
+        if not replay_step():
+            return
+        KE, PE, TE = replay.energies()
+    else:
+        KE, PE, TE = simulation.advance()
+        if recorder is not None:
+            recorder.record(simulation.time, simulation.position, simulation.velocity, KE, PE, TE)
+
+    # Store data for graph
+    if old_segment != simulation.segment:  # Only store when the cart reaches a new track segment
+        graph_data.append(KE, PE, TE)
+
+
+# Move the cart to the next recorded state; pauses at the end of the recording
+def replay_step():
+    global paused
+    record = replay.next()
+    if record is None:
+        paused = True
+        return False
+    simulation.previous_position = simulation.position
+    simulation.position = float(record["position"])
+    simulation.velocity = float(record["velocity"])
+    simulation.time = float(record["time"])
+    simulation.segment, _ = simulation.track.locate(simulation.position)
+    return True
+
+
+# Screen area the cart (and its velocity vector) covered last frame
+last_cart_rect = None
+
+# Longest the loop sleeps on a static screen before drawing it again anyway
+IDLE_TIMEOUT_MS = 1000
+
+
+# How long, in ms, the current screen stays exactly as drawn without new
+# input; 0 while anything moves on its own: the simulation running, a widget
+# animating, or an input box's cursor about to blink
+def idle_timeout():
+    if current_state == "simulation" and not paused:
+        return 0
+    ensure_screen(current_state)
+    widgets = dispatchers[current_state].widgets
+    if any(widget.animating() for widget in widgets):
+        return 0
+    timeout = IDLE_TIMEOUT_MS
+    if any(isinstance(widget, ModernInputBox) and widget.active for widget in widgets):
+        # The cursor blinks every half second
+        timeout = min(timeout, 500 - pygame.time.get_ticks() % 500)
+    return timeout
+
+
+def parse_size(spec):
+    try:
+        width, height = (int(value) for value in spec.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"sizes look like 1920x1080, got {spec!r}")
+    return width, height
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Roller Coaster Physics Simulator")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="push only the changed screen regions to the display each frame")
+    parser.add_argument("--fps", type=int, default=60,
+                        help="render frame rate; the physics always runs at a fixed rate")
+    parser.add_argument("--window-size", type=parse_size, metavar="WxH",
+                        help=f"window size; the {WIDTH}x{HEIGHT} layout is scaled to fit it (default {WIDTH}x{HEIGHT})")
+    parser.add_argument("--render-scale", type=float, default=1.0, metavar="F",
+                        help="draw at F times the window resolution and scale the frame to the window: below 1 "
+                             "trades sharpness for speed (default 1)")
+    parser.add_argument("--smooth-scaling", action="store_true",
+                        help="filter the frame when scaling it to the window instead of repeating pixels")
+    parser.add_argument("--mass", type=float, default=mass, metavar="KG",
+                        help=f"starting mass (default {mass:g})")
+    parser.add_argument("--velocity", type=float, default=initial_velocity, metavar="M/S",
+                        help=f"starting initial velocity (default {initial_velocity:g})")
+    parser.add_argument("--speed", type=float, default=speed_factor, metavar="FACTOR",
+                        help=f"starting animation speed (default {speed_factor:g})")
+    parser.add_argument("--frames", type=int, metavar="N", help="exit after drawing N frames")
+    parser.add_argument("--track-file", metavar="PATH",
+                        help="load the track from a .npy, .csv or text file of x, y points")
+    parser.add_argument("--track-length", type=float, metavar="PX",
+                        help="use a generated sine track PX pixels long; the view follows the cart")
+    parser.add_argument("--carts", type=int, default=0, metavar="N",
+                        help="add N more carts (or trains, with --train-cars) to the track")
+    parser.add_argument("--train-cars", type=int, default=1, metavar="K",
+                        help="couple the --carts into trains of K cars each (default 1)")
+    parser.add_argument("--profile", action="store_true", help="show the frame profiler overlay (toggle with F3)")
+    parser.add_argument("--profile-log", metavar="PATH",
+                        help="write per-phase frame timings to PATH (.csv, or .json for JSON lines)")
+    telemetry = parser.add_mutually_exclusive_group()
+    telemetry.add_argument("--record", metavar="PATH",
+                           help="append time, position, velocity and energies of every physics step to PATH")
+    telemetry.add_argument("--replay", metavar="PATH",
+                           help="drive the simulation screen from a recording made with --record")
+    parser.add_argument("--dynamics", action="store_true",
+                        help="integrate the cart's equations of motion with an adaptive RK45 solver "
+                             "instead of the energy-conservation update")
+    parser.add_argument("--stepped", action="store_true",
+                        help="step the energy-conservation update every physics step instead of reading the "
+                             "motion off tables precomputed for the track")
+    parser.add_argument("--friction", type=float, default=0.0, metavar="MU",
+                        help="rolling friction coefficient for --dynamics (default 0)")
+    parser.add_argument("--drag", type=float, default=0.0, metavar="K",
+                        help="air drag for --dynamics, as force = K * v^2 in kg/m (default 0)")
+    events = parser.add_mutually_exclusive_group()
+    events.add_argument("--record-events", metavar="PATH",
+                        help="log every input event with its frame number to PATH")
+    events.add_argument("--play-events", metavar="PATH",
+                        help="feed a --record-events log back on the same frames with a fixed clock "
+                             "instead of live input, then exit")
+    parser.add_argument("--export", metavar="PATH",
+                        help="start the simulation straight away on a fixed clock and write every frame to PATH: "
+                             "a directory of PNG files, or a .rgb/.raw file (- for stdout) of raw rgb24 frames")
+    parser.add_argument("--export-workers", type=int, metavar="N",
+                        help="PNG writer threads for --export (default: one per core)")
+    parser.add_argument("--export-compression", type=int, default=6, choices=range(10), metavar="0-9",
+                        help="PNG zlib level for --export (default 6)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global paused, current_state, show_vectors, show_grid, profiler, recorder, replay, exporter, physics_clock
+    global last_physics_time, mass, initial_velocity, speed_factor
+    args = parse_args(argv)
+    # Starting values for the controls, which are built with them
+    mass, initial_velocity, speed_factor = args.mass, args.velocity, args.speed
+    track = None
+    if args.track_file:
+        track = generate_track("points", cache_dir=default_cache_dir(), path=args.track_file)
+    elif args.track_length:
+        track = generate_track("sine", cache_dir=default_cache_dir(), width=WIDTH, height=HEIGHT,
+                               length=args.track_length)
+    init(args.window_size, args.render_scale, args.smooth_scaling, track=track)
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed(HANDLED_EVENTS)
+    dirty_regions.enabled = args.dirty_rects
+    profiler = FrameProfiler(PROFILE_PHASES, log_path=args.profile_log)
+    profiler.show_overlay = args.profile
+    simulation.tabulated = not args.stepped
+    if args.dynamics or args.friction or args.drag:
+        simulation.dynamics = TrackDynamics(simulation.track, friction=args.friction, drag=args.drag)
+    if track is not None:
+        reset_simulation()
+    if args.carts:
+        build_park(args.carts, args.train_cars)
+    if args.record:
+        recorder = TelemetryRecorder(args.record)
+    if args.replay:
+        # Replays go straight to the simulation screen and start playing
+        replay = TelemetryReplay(TelemetryReader(args.replay))
+        reset_simulation()
+        current_state = "simulation"
+        paused = False
+    if args.export:
+        exporter = FrameExporter(args.export, display.get_size(), workers=args.export_workers,
+                                 compression=args.export_compression)
+        if not (args.play_events or args.replay):
+            # Exports record the running simulation unless input is played back
+            reset_simulation()
+            current_state = "simulation"
+            paused = False
+
+    # Input capture, or playback on a fixed clock at the captured frame rate.
+    # Exports also run on a fixed clock, so each frame is 1/fps of simulation.
+    event_recorder = EventRecorder(args.record_events, args.fps) if args.record_events else None
+    playback = EventPlayback(args.play_events) if args.play_events else None
+    if playback is not None or exporter is not None:
+        clock = FixedClock(playback.fps if playback is not None else args.fps)
+        physics_clock = clock.now
+    else:
+        clock = pygame.time.Clock()
+
+    # Main game loop
+    running = True
+    drawn_state = None
+    frame = 0
+    pending_events = []  # The event that ended an idle wait
+
+    while running:
+        profiler.begin_frame()
+        if playback is not None:
+            # Live input is dropped, apart from closing the window
+            events = playback.events(frame) + pygame.event.get(pygame.QUIT)
+            pygame.event.clear()
+        else:
+            events = [to_layout(event) for event in pending_events + pygame.event.get()]
+            pending_events = []
+            if event_recorder is not None:
+                event_recorder.capture(frame, events)
+
+        for event in coalesce_motion(events):
+            ensure_screen(current_state)
+            activated = dispatchers[current_state].dispatch(event)
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                profiler.toggle_overlay()
+                dirty_regions.invalidate()
+            elif event.type == pygame.WINDOWEXPOSED:
+                dirty_regions.invalidate()
+
+            # Handle UI events
+            if current_state == "simulation":
+                # Zoom with the mouse wheel (unless it's over the graph) or
+                # +/-, and back to 1:1 with 0, unless a value is being typed in
+                if event.type == pygame.MOUSEWHEEL and not activated:
+                    camera.zoom_by(ZOOM_STEP ** event.y)
+                elif event.type == pygame.KEYDOWN and not (mass_input.active or velocity_input.active):
+                    if event.key in (pygame.K_PLUS, pygame.K_EQUALS, pygame.K_KP_PLUS):
+                        camera.zoom_by(ZOOM_STEP)
+                    elif event.key in (pygame.K_MINUS, pygame.K_KP_MINUS):
+                        camera.zoom_by(1 / ZOOM_STEP)
+                    elif event.key in (pygame.K_0, pygame.K_KP0):
+                        camera.zoom = 1.0
+
+                # Handle button events
+                if start_btn in activated:
+                    paused = False
+                elif pause_btn in activated:
+                    paused = True
+                elif reset_btn in activated:
+                    reset_simulation()
+                elif menu_btn in activated:
+                    current_state = "menu"
+                elif vectors_btn in activated:
+                    show_vectors = not show_vectors
+                    vectors_btn.text = "Hide Vectors" if show_vectors else "Show Vectors"
+                elif grid_btn in activated:
+                    show_grid = not show_grid
+                    grid_btn.text = "Hide Grid" if show_grid else "Show Grid"
+
+            elif current_state == "menu":
+                if menu_start_btn in activated:
+                    current_state = "simulation"
+                    reset_simulation()
+                elif menu_explain_btn in activated:
+                    current_state = "explanation"
+                elif menu_exit_btn in activated:
+                    running = False
+
+            elif current_state == "explanation":
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    current_state = "menu"
+        profiler.mark("events")
+
+        # A screen change repaints everything
+        if current_state != drawn_state:
+            dirty_regions.invalidate()
+            drawn_state = current_state
+
+        # Render current state
+        if current_state == "menu":
+            show_menu()
+        elif current_state == "simulation":
+            show_simulation()
+        elif current_state == "explanation":
+            show_explanation()
+
+        overlay_rect = profiler.draw_overlay(screen, small_font)
+        if overlay_rect is not None:
+            dirty_regions.add_canvas(overlay_rect)
+        profiler.mark("overlay")
+
+        dirty_regions.present()
+        profiler.mark("present")
+        if exporter is not None:
+            exporter.submit(display)
+            profiler.mark("export")
+        profiler.end_frame()
+        clock.tick(args.fps)  # 60 FPS by default for smooth animation
+        frame += 1
+        if playback is not None and playback.finished:
+            running = False
+        if args.frames is not None and frame >= args.frames:
+            running = False
+
+        # When nothing will change until the next input, sleep until it comes
+        # instead of drawing the same frame over and over. Playback never
+        # waits; its input is already there, and an export records every frame.
+        if running and playback is None and exporter is None:
+            timeout = idle_timeout()
+            if timeout:
+                event = pygame.event.wait(timeout)
+                if event.type != pygame.NOEVENT:
+                    pending_events.append(event)
+                # Time spent idle isn't simulation time
+                last_physics_time = None
+
+    profiler.close()
+    if recorder is not None:
+        recorder.close()
+    if event_recorder is not None:
+        event_recorder.close()
+    if exporter is not None:
+        exporter.close()
+        print(f"{exporter.frames} frames to {args.export} in {exporter.finished - exporter.started:.2f}s "
+              f"({exporter.frames_per_sec:.1f} frames/sec sustained, {exporter.waited:.2f}s waiting for writers)",
+              file=sys.stderr)
+    pygame.quit()
+    return frame
+
+
+if __name__ == "__main__":
+    main()
+    sys.exit()
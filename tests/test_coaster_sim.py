@@ -0,0 +1,147 @@
+import numpy as np
+import pytest
+
+from coaster_sim import (PIXELS_PER_METRE, CoasterEnsemble, CoasterSimulation, CoasterTrain, Timetable,
+                         create_track, g)
+from coaster_track import Track
+
+
+@pytest.fixture(scope="module")
+def track():
+    return Track(create_track())
+
+
+# Largest position (px) and relative velocity differences between a stepped
+# run and the timetable over most of a lap
+def stepped_error(track, speed_factor):
+    stepped = CoasterSimulation(track, speed_factor=speed_factor)
+    table = CoasterSimulation(track, tabulated=True).current_timetable()
+    trace = stepped.step(int(0.98 * table.lap_time / stepped.time_step))
+    positions, velocities = [], []
+    for t in trace["time"][::50]:
+        _, _, position, velocity = table.state_at(t)
+        positions.append(position)
+        velocities.append(velocity)
+    return (np.abs(np.array(positions) - trace["position"][::50]).max(),
+            (np.abs(np.array(velocities) - trace["velocity"][::50]) / trace["velocity"][::50]).max())
+
+
+def test_timetable_agrees_with_stepped_simulation(track):
+    coarse = stepped_error(track, 0.03)
+    fine = stepped_error(track, 0.01)
+    assert fine[0] < 0.1 and fine[1] < 1e-3
+    # Stepping is first order, so a third of the step gives about a third of the error
+    assert fine[0] < coarse[0] / 2 and fine[1] < coarse[1] / 2
+
+
+def test_tabulated_simulation_follows_the_timetable_across_laps(track):
+    simulation = CoasterSimulation(track, tabulated=True)
+    table = simulation.current_timetable()
+    steps = int(2.5 * table.lap_time / simulation.time_step)
+    trace = simulation.step(steps)
+    assert simulation.laps == 2
+    for i in range(0, steps, 97):
+        _, _, position, velocity = table.state_at(trace["time"][i])
+        assert trace["position"][i] == pytest.approx(position, abs=1e-6)
+        assert trace["velocity"][i] == pytest.approx(velocity)
+
+
+def test_time_at_inverts_state_at(track):
+    table = Timetable(track, 50.0, CoasterSimulation(track).total_energy)
+    for t in np.linspace(0, table.lap_time, 41)[:-1]:
+        _, _, position, _ = table.state_at(t)
+        assert table.time_at(position) == pytest.approx(t, abs=1e-9)
+
+
+def test_seek_position_reads_back(track):
+    simulation = CoasterSimulation(track, tabulated=True)
+    table = simulation.current_timetable()
+    for s in np.linspace(0, track.length, 23):
+        simulation.seek_position(s)
+        assert simulation.position == pytest.approx(s, abs=1e-6)
+        i, frac = track.locate(s)
+        expected = table.velocity[i] + (table.velocity[i + 1] - table.velocity[i]) * frac
+        assert simulation.velocity == pytest.approx(expected, rel=1e-2)
+        assert simulation.lap_clock == pytest.approx(table.time_at(s))
+
+
+def test_seek_position_to_the_end_stays_there(track):
+    simulation = CoasterSimulation(track, tabulated=True)
+    simulation.seek_position(track.length)
+    assert simulation.position == track.length
+    assert simulation.laps == 0
+    simulation.advance()
+    assert simulation.laps == 1
+    assert simulation.position < track.length / 10
+
+
+def test_seek_time_counts_laps(track):
+    simulation = CoasterSimulation(track, tabulated=True)
+    table = simulation.current_timetable()
+    t = 2.3 * table.lap_time
+    simulation.seek_time(t)
+    _, _, position, velocity = table.state_at(t)
+    assert simulation.laps == 2
+    assert simulation.time == pytest.approx(t)
+    assert simulation.position == pytest.approx(position)
+    assert simulation.velocity == pytest.approx(velocity)
+
+
+def test_ensemble_of_one_matches_the_simulation(track):
+    simulation = CoasterSimulation(track, mass=70.0, initial_velocity=10.0, speed_factor=0.05)
+    ensemble = CoasterEnsemble(track, [70.0], [10.0], speed_factor=0.05)
+    expected = simulation.step(3000)
+    trace = ensemble.step(3000, record_every=1)
+    assert simulation.laps > 1
+    for name in ("time", "position", "velocity", "KE", "PE", "TE"):
+        assert np.allclose(trace[name][:, 0], expected[name], rtol=1e-12, atol=1e-9), name
+    assert ensemble.laps[0] == simulation.laps
+
+
+def test_ensemble_carts_run_independently(track):
+    masses, velocities, speed_factors = [20.0, 50.0, 120.0], [2.0, 8.0, 15.0], [0.01, 0.03, 0.07]
+    ensemble = CoasterEnsemble(track, masses, velocities, speed_factor=speed_factors)
+    ensemble.run(5.0)
+    summary = ensemble.summary()
+    for i, (mass, velocity, speed_factor) in enumerate(zip(masses, velocities, speed_factors)):
+        simulation = CoasterSimulation(track, mass=mass, initial_velocity=velocity, speed_factor=speed_factor)
+        trace = simulation.run(5.0)
+        assert ensemble.time[i] == pytest.approx(simulation.time)
+        assert ensemble.positions[i] == pytest.approx(simulation.position)
+        assert ensemble.velocities[i] == pytest.approx(simulation.velocity)
+        assert summary["laps"][i] == simulation.laps
+        assert summary["max_speed"][i] == pytest.approx(max(velocity, trace["velocity"].max()))
+        assert summary["conservation"][i] == pytest.approx(simulation.conservation(), rel=1e-12)
+
+
+def test_single_car_trains_are_independent_carts(track):
+    starts = [0.0, 300.0, 900.0]
+    ensemble = CoasterEnsemble(track, 50.0, [6.0, 9.0, 12.0], start_positions=starts)
+    train = CoasterTrain(track, 50.0, [6.0, 9.0, 12.0], cars=1, start_positions=starts)
+    ensemble.step(2000)
+    train.step(2000)
+    assert np.array_equal(train.positions, ensemble.positions)
+    assert np.array_equal(train.velocities, ensemble.velocities)
+    assert np.array_equal(train.laps, ensemble.laps)
+
+
+def test_train_cars_keep_their_spacing_and_wrap_behind_the_start(track):
+    train = CoasterTrain(track, 200.0, 10.0, cars=4, spacing=30.0, start_positions=[10.0, 500.0])
+    cars = train.car_positions()
+    assert cars[0] == pytest.approx([10.0, track.length - 20.0, track.length - 50.0, track.length - 80.0])
+    assert cars[1] == pytest.approx([500.0, 470.0, 440.0, 410.0])
+
+    train.step(1500)
+    gaps = (train.car_positions()[:, :-1] - train.car_positions()[:, 1:]) % track.length
+    assert gaps == pytest.approx(np.full((2, 3), 30.0))
+
+
+def test_train_energy_uses_the_mean_height_of_its_cars(track):
+    train = CoasterTrain(track, 200.0, 10.0, cars=3, spacing=40.0, start_positions=[600.0])
+    heights = track.y_at_many(train.car_positions()[0])
+    expected = 200.0 * g * (700 - heights.mean()) / PIXELS_PER_METRE
+    assert train.potential_energy_at(train.positions)[0] == pytest.approx(expected)
+
+    # The update keeps the train's own total energy, as it does for a cart
+    _, _, TE = train.advance()
+    assert TE[0] == pytest.approx(train.total_energy[0], rel=0.02)
@@ -0,0 +1,34 @@
+import csv
+
+import pytest
+
+from coaster_sim import CoasterSimulation
+from coaster_sweep import SweepWriter, load_track, run_chunk
+
+
+def test_resume_needs_the_same_columns(tmp_path):
+    output = str(tmp_path / "sweep.csv")
+    writer = SweepWriter(output, ["length"])
+    writer.write({name: [0] for name in writer.columns})
+    writer.close()
+
+    with pytest.raises(SystemExit, match="track_length"):
+        SweepWriter(output, ["step"])
+
+    writer = SweepWriter(output, ["length"])
+    writer.write({name: [1] for name in writer.columns})
+    writer.close()
+    with open(output, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == writer.columns
+    assert [row[0] for row in rows[1:]] == ["0", "1"]
+
+
+def test_chunk_conservation_matches_a_single_run():
+    params = '{"height": 600, "length": 2000, "width": 1200}'
+    columns = run_chunk("sine", params, None, [0, 1], [30.0, 90.0], [8.0, 12.0], [0.03, 0.03], 10.0)
+    for i, (mass, velocity, speed_factor) in enumerate([(30.0, 8.0, 0.03), (90.0, 12.0, 0.03)]):
+        simulation = CoasterSimulation(load_track("sine", params, None), mass=mass, initial_velocity=velocity,
+                                       speed_factor=speed_factor)
+        simulation.run(10.0)
+        assert columns["conservation"][i] == pytest.approx(simulation.conservation(), rel=1e-12)
@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+from coaster_sim import CoasterSimulation, create_track
+from coaster_telemetry import RECORD_FIELDS, TelemetryReader, TelemetryRecorder, TelemetryReplay
+
+
+def simulated_trace(steps=500):
+    return CoasterSimulation(create_track(), initial_velocity=9.0).step(steps)
+
+
+def test_record_and_read_back(tmp_path):
+    path = str(tmp_path / "run.tel")
+    trace = simulated_trace()
+    # A block smaller than the run, so it is flushed part way through
+    with TelemetryRecorder(path, block_records=64) as recorder:
+        for row in zip(*(trace[name] for name in RECORD_FIELDS)):
+            recorder.record(*row)
+    assert recorder.count == 500
+
+    reader = TelemetryReader(path)
+    assert len(reader) == 500
+    for name in RECORD_FIELDS:
+        assert np.array_equal(reader[name], trace[name])
+
+
+def test_reopening_appends_runs(tmp_path):
+    path = str(tmp_path / "runs.tel")
+    first, second = simulated_trace(300), simulated_trace(200)
+    with TelemetryRecorder(path) as recorder:
+        recorder.record_trace(first)
+    with TelemetryRecorder(path) as recorder:
+        recorder.record_trace(second)
+
+    reader = TelemetryReader(path)
+    assert len(reader) == 500
+    assert reader.run_starts().tolist() == [0, 300]
+    assert np.array_equal(reader["position"][300:], second["position"])
+
+
+def test_a_record_cut_short_is_ignored(tmp_path):
+    path = str(tmp_path / "crashed.tel")
+    with TelemetryRecorder(path) as recorder:
+        recorder.record_trace(simulated_trace(100))
+    with open(path, "ab") as f:
+        f.write(b"\0" * 20)
+    assert len(TelemetryReader(path)) == 100
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "other.tel"
+    path.write_bytes(b"not telemetry at all")
+    with pytest.raises(ValueError):
+        TelemetryReader(str(path))
+
+
+def test_replay_steps_through_the_recording(tmp_path):
+    path = str(tmp_path / "replay.tel")
+    trace = simulated_trace(50)
+    with TelemetryRecorder(path) as recorder:
+        recorder.record_trace(trace)
+
+    replay = TelemetryReplay(TelemetryReader(path))
+    assert replay.energies() == (0.0, 0.0, 0.0)
+    for i in range(50):
+        record = replay.next()
+        assert record["position"] == trace["position"][i]
+        assert replay.energies() == (trace["KE"][i], trace["PE"][i], trace["TE"][i])
+        assert replay.conservation() == pytest.approx(trace["TE"][i] / trace["TE"][0] * 100)
+    assert replay.finished and replay.next() is None
+
+    replay.rewind()
+    assert not replay.finished and replay.next()["time"] == trace["time"][0]
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from coaster_track import TrackLOD, douglas_peucker, generate_track, simplify_levels
+
+
+def wandering_track(n=6000, seed=1):
+    # A smooth random walk that doubles back on itself, unlike the sine tracks
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.08, n))
+    steps = np.column_stack((np.cos(heading), np.sin(heading))) * rng.uniform(1, 4, (n, 1))
+    return np.cumsum(steps, axis=0)
+
+
+# Largest distance from a point of the polyline to the chord of the
+# simplified level between the two kept points on either side of it
+def max_deviation(points, simplified):
+    index = {tuple(point): i for i, point in enumerate(points.tolist())}
+    kept = np.array([index[tuple(point)] for point in simplified.tolist()])
+    assert kept[0] == 0 and kept[-1] == len(points) - 1
+    assert (np.diff(kept) > 0).all()
+
+    owner = np.searchsorted(kept, np.arange(len(points)), side="right") - 1
+    owner = np.minimum(owner, len(kept) - 2)
+    a, b = points[kept[owner]], points[kept[owner + 1]]
+    chord = b - a
+    t = np.clip(np.einsum("ij,ij->i", points - a, chord) / np.einsum("ij,ij->i", chord, chord), 0, 1)
+    return np.hypot(*(points - (a + chord * t[:, None])).T).max()
+
+
+@pytest.mark.parametrize("tolerance", [0.5, 3.0, 40.0])
+def test_douglas_peucker_stays_within_tolerance(tolerance):
+    points = wandering_track()
+    simplified = douglas_peucker(points, tolerance, block=512)
+    assert len(simplified) < len(points)
+    assert max_deviation(points, simplified) <= tolerance
+
+
+@pytest.mark.parametrize("points", [wandering_track(), generate_track("sine", length=20000)],
+                         ids=["wandering", "sine"])
+def test_every_level_is_within_its_tolerance_of_the_original(points):
+    levels, tolerances = simplify_levels(points, min_points=16)
+    assert len(levels) > 3
+    assert tolerances == sorted(tolerances)
+    for level, tolerance in zip(levels[1:], tolerances[1:]):
+        assert max_deviation(points, level) <= tolerance
+
+
+def test_chunk_boxes_cover_their_points():
+    lod = TrackLOD(wandering_track(), chunk=50, min_points=16)
+    for points, (x_min, x_max, y_min, y_max) in zip(lod.levels, lod.boxes):
+        for c in range(len(x_min)):
+            chunk = points[c * lod.chunk:min((c + 1) * lod.chunk, len(points) - 1) + 1]
+            assert (chunk[:, 0] >= x_min[c]).all() and (chunk[:, 0] <= x_max[c]).all()
+            assert (chunk[:, 1] >= y_min[c]).all() and (chunk[:, 1] <= y_max[c]).all()
+        # Every segment belongs to some chunk
+        assert len(x_min) * lod.chunk >= len(points) - 1
+
+
+def test_visible_pieces_hold_every_segment_in_view():
+    lod = TrackLOD(wandering_track(), chunk=50, min_points=16)
+    points = lod.levels[1]
+    left, top = points.min(axis=0) + 0.3 * np.ptp(points, axis=0)
+    right, bottom = points.min(axis=0) + 0.6 * np.ptp(points, axis=0)
+
+    inside = ((points[:, 0] >= left) & (points[:, 0] <= right)
+              & (points[:, 1] >= top) & (points[:, 1] <= bottom))
+    shown = {tuple(point) for piece in lod.visible(1, left, top, right, bottom) for point in piece.tolist()}
+    assert inside.any()
+    assert all(tuple(point) in shown for point in points[inside].tolist())
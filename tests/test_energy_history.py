@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from energy_history import EnergyHistory
+
+
+def filled_history(count, retention=1 << 16, seed=0):
+    samples = np.random.default_rng(seed).normal(size=(count, 2))
+    history = EnergyHistory(series=2, retention=retention)
+    for values in samples:
+        history.append(*values)
+    return history, samples.T
+
+
+# Per-column min and max of the samples start..stop, one sample at a time
+def brute_force_columns(samples, start, stop, width):
+    per_column = (stop - start) / width
+    column = np.minimum(((np.arange(start, stop) - start) / per_column).astype(int), width - 1)
+    columns = np.unique(column)
+    mins = np.array([[series[start:stop][column == c].min() for c in columns] for series in samples])
+    maxs = np.array([[series[start:stop][column == c].max() for c in columns] for series in samples])
+    return columns, mins, maxs
+
+
+@pytest.mark.parametrize("start, stop, width", [(0, 300, 300), (17, 250, 400), (0, 4096, 256),
+                                                (1024, 3072, 512), (2048, 2048 + 64 * 37, 37)])
+def test_columns_match_brute_force_where_blocks_fit_columns(start, stop, width):
+    # One sample per column or less, or whole aligned blocks of 2**k samples
+    history, samples = filled_history(5007)
+    columns, mins, maxs = history.columns(start, stop, width)
+    expected = brute_force_columns(samples, start, stop, width)
+    assert np.array_equal(columns, expected[0])
+    assert np.array_equal(mins, expected[1])
+    assert np.array_equal(maxs, expected[2])
+
+
+@pytest.mark.parametrize("retention", [1 << 16, 64], ids=["complete", "evicted"])
+@pytest.mark.parametrize("start, stop, width", [(0, 5007, 300), (123, 4567, 333), (4000, 5007, 301),
+                                                (4400, 4999, 7), (2500, 4100, 999)])
+def test_columns_bound_brute_force_on_uneven_spans(retention, start, stop, width):
+    history, samples = filled_history(5007, retention)
+    columns, mins, maxs = history.columns(start, stop, width)
+    assert (np.diff(columns) > 0).all() and columns[0] >= 0 and columns[-1] < width
+
+    # Blocks hold up to a column's worth of samples, or more where eviction
+    # leaves only coarser levels reaching back to `start`
+    per_column = (stop - start) / width
+    evicted_level = next(level for level in range(len(history.levels)) if history.reach(level) <= start)
+    block = int(max(per_column, 2 ** evicted_level))
+
+    # Each column holds the samples of the blocks starting in it, so it is
+    # within the samples of the column widened by one block either way...
+    for c, column_min, column_max in zip(columns, mins.T, maxs.T):
+        low = max(0, int(start + c * per_column) - block)
+        high = min(len(samples[0]), int(start + (c + 1) * per_column) + block + 1)
+        assert (column_min >= samples[:, low:high].min(axis=1)).all()
+        assert (column_max <= samples[:, low:high].max(axis=1)).all()
+
+    # ...and every sample lies within the column its block starts in
+    for j in range(start, stop):
+        first = np.searchsorted(columns, int((max(start, j - block) - start) / per_column))
+        last = np.searchsorted(columns, min(int((j - start) / per_column), width - 1), side="right")
+        assert (mins[:, first:last].min(axis=1) <= samples[:, j]).all()
+        assert (maxs[:, first:last].max(axis=1) >= samples[:, j]).all()
+
+
+def test_memory_is_bounded_by_retention():
+    history, _ = filled_history(5007, retention=64)
+    assert len(history) == 5007
+    assert all(mins.shape[1] <= 64 for mins, _ in history.levels)
+    assert history.reach(0) == 5007 - 64
+    assert history.reach(len(history.levels) - 1) == 0
+
+
+def test_empty_range():
+    history, _ = filled_history(10)
+    columns, mins, maxs = history.columns(20, 30, 100)
+    assert len(columns) == 0 and mins.shape == (2, 0) and maxs.shape == (2, 0)
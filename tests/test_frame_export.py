@@ -0,0 +1,77 @@
+import io
+import os
+
+import numpy as np
+import pygame
+import pytest
+
+from frame_export import FrameExporter, encode_png, export_format
+
+
+def decode(data):
+    surface = pygame.image.load(io.BytesIO(data), "frame.png")
+    return np.transpose(pygame.surfarray.pixels3d(surface), (1, 0, 2)), surface
+
+
+@pytest.mark.parametrize("width, height", [(1, 1), (1, 7), (5, 3), (64, 48), (333, 17)])
+@pytest.mark.parametrize("compression", [0, 6, 9])
+def test_encode_png_decodes_to_the_same_pixels(width, height, compression):
+    # The fourth byte is padding with any value in it; the PNG is opaque
+    rgbx = np.random.default_rng(width * height).integers(0, 256, (height, width, 4), dtype=np.uint8)
+    pixels, surface = decode(encode_png(rgbx, compression))
+    assert surface.get_size() == (width, height)
+    assert np.array_equal(pixels, rgbx[:, :, :3])
+    assert (pygame.surfarray.pixels_alpha(surface) == 255).all()
+
+
+def test_encode_png_of_a_rendered_surface():
+    surface = pygame.Surface((120, 80))
+    surface.fill((30, 60, 90))
+    pygame.draw.circle(surface, (250, 200, 10), (60, 40), 30)
+    rgbx = np.frombuffer(pygame.image.tobytes(surface, "RGBX"), dtype=np.uint8).reshape(80, 120, 4)
+    pixels, _ = decode(encode_png(rgbx))
+    assert np.array_equal(pixels, np.transpose(pygame.surfarray.array3d(surface), (1, 0, 2)))
+
+
+def test_export_format():
+    assert export_format("frames") == "png"
+    assert export_format("video.RGB") == "raw"
+    assert export_format("video.raw") == "raw"
+    assert export_format("-") == "raw"
+
+
+def frames(count, size=(40, 30)):
+    surfaces = []
+    for i in range(count):
+        surface = pygame.Surface(size)
+        surface.fill((i * 20, 255 - i * 20, 7))
+        surfaces.append(surface)
+    return surfaces
+
+
+def test_exporter_writes_numbered_png_files(tmp_path):
+    path = str(tmp_path / "frames")
+    surfaces = frames(10)
+    exporter = FrameExporter(path, (40, 30), workers=3, queue_frames=2)
+    for surface in surfaces:
+        exporter.submit(surface)
+    exporter.close()
+
+    assert sorted(os.listdir(path)) == [f"frame_{i:06d}.png" for i in range(10)]
+    for i, surface in enumerate(surfaces):
+        loaded = pygame.image.load(os.path.join(path, f"frame_{i:06d}.png"))
+        assert np.array_equal(pygame.surfarray.array3d(loaded), pygame.surfarray.array3d(surface))
+
+
+def test_exporter_writes_a_raw_stream_in_order(tmp_path):
+    path = str(tmp_path / "video.rgb")
+    surfaces = frames(6)
+    exporter = FrameExporter(path, (40, 30), workers=4)
+    for surface in surfaces:
+        exporter.submit(surface)
+    exporter.close()
+
+    assert len(exporter.workers) == 1
+    with open(path, "rb") as f:
+        data = f.read()
+    assert data == b"".join(pygame.image.tobytes(surface, "RGB") for surface in surfaces)
@@ -0,0 +1,111 @@
+import math
+import os
+
+import pygame
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import roller_coaster_game as game  # noqa: E402
+
+# Window sizes and render scales whose canvas and view round differently
+# across and down
+WINDOWS = [((600, 350), 0.25), ((2560, 1440), 0.5), ((3840, 2160), 0.5), ((1366, 768), 1.0),
+           ((1366, 768), 0.7), ((1600, 900), 0.5), ((1000, 1000), 0.3)]
+
+
+def open_window(window_size, scale):
+    game.screen = None
+    game.init(window_size, scale)
+    return game.screen, game.display
+
+
+@pytest.mark.parametrize("window_size, scale", WINDOWS)
+def test_present_canvas_keeps_edge_rects_in_the_view(window_size, scale):
+    screen, display = open_window(window_size, scale)
+    width, height = screen.get_size()
+    display.fill((0, 0, 0))
+    screen.fill((200, 30, 90))
+
+    # Rects touching the right and bottom edges and the far corner, and
+    # ones running off the canvas
+    rects = [pygame.Rect(width - 20, 80, 20, 20), pygame.Rect(0, height - 20, 20, 20),
+             pygame.Rect(width - 7, height - 7, 7, 7), pygame.Rect(width - 5, height - 5, 50, 50),
+             pygame.Rect(0, 80, 20, 20), pygame.Rect(0, 0, width, height)]
+    updated = game.present_canvas(rects)
+    assert len(updated) == len(rects)
+    for target in updated:
+        assert game.view_rect.contains(target)
+        assert display.get_at(target.center)[:3] == (200, 30, 90)
+    # The far corner of the view is reached, but nothing outside it
+    assert display.get_at(game.view_rect.move(-1, -1).bottomright)[:3] == (200, 30, 90)
+    if game.view_rect.right < display.get_width():
+        assert display.get_at((game.view_rect.right, game.view_rect.centery))[:3] == (0, 0, 0)
+
+
+@pytest.mark.parametrize("window_size, scale", WINDOWS)
+def test_window_to_layout_inverts_the_presentation(window_size, scale):
+    open_window(window_size, scale)
+    scale_x, scale_y = game.window_scale()
+    view = game.view_rect
+    # The whole canvas, which is rounded to whole pixels, fills the view
+    assert scale_x * game.screen.get_width() / game.ui_scale == pytest.approx(view.width)
+    assert scale_y * game.screen.get_height() / game.ui_scale == pytest.approx(view.height)
+
+    # The first window pixel of each layout unit's span maps back to it,
+    # where a unit spans at least a pixel
+    for x, y in [(0, 0), (7, 11), (600, 350), (1199, 699), (1000, 690)]:
+        pixel = (math.ceil(view.x + x * scale_x), math.ceil(view.y + y * scale_y))
+        mapped = game.window_to_layout(pixel)
+        assert mapped[0] == x if scale_x > 1 else abs(mapped[0] - x) <= 1 / scale_x
+        assert mapped[1] == y if scale_y > 1 else abs(mapped[1] - y) <= 1 / scale_y
+
+
+def test_button_hit_near_the_bottom_of_a_scaled_window():
+    open_window((1366, 768), 0.7)
+    button = game.ModernButton(100, 640, 200, 50, "Test", game.UI_PRIMARY)
+    scale_x, scale_y = game.window_scale()
+    view = game.view_rect
+    inside = (round(view.x + 200 * scale_x), math.ceil(view.y + 640 * scale_y))
+    outside = (inside[0], math.ceil(view.y + 640 * scale_y) - 1)
+    for pos, hit in [(inside, True), (outside, False)]:
+        event = game.to_layout(pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0)))
+        assert button.rect.collidepoint(event.pos) == hit
+
+
+def test_missing_fonts_are_cached_until_the_font_directories_change(monkeypatch, tmp_path):
+    monkeypatch.setattr(game, "FONT_CACHE_PATH", str(tmp_path / "fonts.json"))
+    monkeypatch.setattr(game, "FONT_DIRS", [str(tmp_path / "fonts")])
+    (tmp_path / "fonts").mkdir()
+    game.font_dirs_fingerprint.cache_clear()
+    pygame.font.init()
+    found = os.path.join(os.path.dirname(pygame.__file__), pygame.font.get_default_font())
+    installed = {}
+    scans = []
+
+    def sys_font(name, size, bold, italic, constructor):
+        scans.append(name)
+        return constructor(installed.get(name), size, bold, italic)
+
+    monkeypatch.setattr(pygame.font, "SysFont", sys_font)
+    # An entry from before misses carried a fingerprint is looked up again
+    cache = {"Missing|False|False": [None, False, False]}
+    game.load_font("Missing", 12, cache=cache)
+    fingerprint = game.font_dirs_fingerprint()
+    assert cache == {"Missing|False|False": [None, False, False, fingerprint]}
+    assert game.load_font_cache() == cache
+    game.load_font("Missing", 12, cache=cache)
+    assert scans == ["Missing"]
+
+    # Installed since: the font directory changed, so it is found on the next
+    # start and kept from then on
+    installed["Missing"] = found
+    (tmp_path / "fonts" / "missing.ttf").write_bytes(b"")
+    os.utime(tmp_path / "fonts", ns=(0, 1))
+    game.font_dirs_fingerprint.cache_clear()
+    game.load_font("Missing", 12, cache=cache)
+    assert scans == ["Missing", "Missing"]
+    assert cache == {"Missing|False|False": [found, False, False]}
+    assert game.load_font_cache() == cache
+    game.font_dirs_fingerprint.cache_clear()
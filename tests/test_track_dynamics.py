@@ -0,0 +1,107 @@
+import math
+from itertools import islice
+
+import numpy as np
+import pytest
+
+from coaster_sim import PIXELS_PER_METRE, TrackDynamics, g
+from coaster_track import Track
+
+
+def mechanical_energy(track, position, velocity):
+    # Per unit mass, with heights measured up from y = 0
+    return 0.5 * velocity * velocity - g * track.y_at(position) / PIXELS_PER_METRE
+
+
+def test_energy_is_conserved_without_drag():
+    # A valley with both ends at the same height, so laps keep the energy too
+    x = np.linspace(0, 600, 121)
+    track = Track(np.column_stack((x, 400 - 150 * np.cos(2 * np.pi * x / 600))))
+    dynamics = TrackDynamics(track)
+    result = dynamics.solve(300.0, 4.0, 10.0, mass=50.0)
+
+    start = mechanical_energy(track, 300.0, 4.0)
+    energies = [mechanical_energy(track, s, v) for s, v in zip(result["position"], result["velocity"])]
+    assert result["time"][-1] == pytest.approx(10.0)
+    assert np.allclose(energies, start, rtol=1e-6, atol=1e-6)
+
+
+def test_tight_tolerance_rejects_steps_and_matches_exact_drag():
+    # On flat track quadratic drag alone gives v = v0 / (1 + k v0 t) and
+    # s = ln(1 + k v0 t) / k, with k = drag / mass
+    track = Track([(0, 300), (100000, 300)])
+    mass, drag, v0, duration = 50.0, 0.8, 20.0, 2.0
+    tight = TrackDynamics(track, drag=drag, rtol=1e-10, atol=1e-10)
+    tight.step_size = tight.max_step
+    position, velocity, laps = tight.advance(0.0, v0, duration, mass)
+
+    k = drag / mass
+    assert tight.rejected > 0
+    assert tight.accepted > 0
+    assert laps == 0
+    assert velocity == pytest.approx(v0 / (1 + k * v0 * duration), rel=1e-8)
+    assert position == pytest.approx(math.log(1 + k * v0 * duration) / k * PIXELS_PER_METRE, rel=1e-8)
+
+    loose = TrackDynamics(track, drag=drag, rtol=1e-3, atol=1e-3)
+    loose.step_size = loose.max_step
+    loose.advance(0.0, v0, duration, mass)
+    assert loose.accepted < tight.accepted
+
+
+def test_advance_wraps_at_the_end_of_the_track():
+    track = Track([(0, 300), (1000, 300)])
+    position, velocity, laps = TrackDynamics(track).advance(900.0, 5.0, 1.0, mass=50.0)
+    assert laps == 1
+    assert position == pytest.approx(150.0)
+    assert velocity == pytest.approx(5.0)
+
+
+def test_advance_turns_round_on_a_climb():
+    track = Track([(0, 400), (1000, 300)])
+    accel = -g * 100 / math.hypot(1000, 100)
+    position, velocity, laps = TrackDynamics(track).advance(200.0, 1.0, 1.5, mass=50.0)
+    assert laps == 0
+    assert velocity == pytest.approx(1.0 + accel * 1.5)
+    assert velocity < 0
+    assert position == pytest.approx(200.0 + (1.5 + 0.5 * accel * 1.5 ** 2) * PIXELS_PER_METRE)
+
+
+def test_advance_bounces_off_the_start():
+    track = Track([(0, 400), (1000, 300)])
+    position, velocity, laps = TrackDynamics(track).advance(10.0, -1.0, 0.5, mass=50.0)
+    assert laps == 0
+    assert velocity > 0
+    assert mechanical_energy(track, position, velocity) == pytest.approx(mechanical_energy(track, 10.0, -1.0))
+
+
+def test_friction_lets_a_cart_at_rest_roll_forward():
+    track = Track([(0, 300), (1000, 400)])
+    length = math.hypot(1000, 100)
+    accel = g * (100 - 0.01 * 1000) / length
+    position, velocity, laps = TrackDynamics(track, friction=0.01).advance(500.0, 0.0, 2.0, mass=50.0)
+    assert velocity == pytest.approx(accel * 2.0)
+    assert position == pytest.approx(500.0 + 0.5 * accel * 2.0 ** 2 * PIXELS_PER_METRE)
+
+
+def test_friction_rolls_back_and_forth_through_a_valley():
+    # Both arms slope at 45 degrees, so friction takes mu g cos(45) of energy
+    # per unit mass for every metre travelled, whichever way the cart goes
+    track = Track([(0, 200), (300, 500), (600, 200)])
+    friction = 0.01
+    result = TrackDynamics(track, friction=friction).solve(0.0, 0.0, 20.0, mass=50.0)
+    positions, velocities = result["position"], result["velocity"]
+
+    reversals = np.count_nonzero(np.diff(np.sign(velocities[velocities != 0])))
+    assert reversals >= 4
+    travelled = np.abs(np.diff(positions)).sum() / PIXELS_PER_METRE
+    lost = mechanical_energy(track, 0.0, 0.0) - mechanical_energy(track, positions[-1], velocities[-1])
+    assert lost == pytest.approx(friction * g * math.sqrt(0.5) * travelled, rel=1e-6)
+
+
+@pytest.mark.parametrize("friction", [0.0, 0.01])
+def test_a_cart_at_rest_in_a_v_stays_put(friction):
+    track = Track([(0, 200), (300, 500), (600, 200)])
+    bottom = float(track.arc_length[1])
+    steps = list(islice(TrackDynamics(track, friction=friction).steps(bottom, 0.0, 3.0, mass=50.0), 1000))
+    assert len(steps) < 1000
+    assert steps[-1] == (3.0, bottom, 0.0, 0)